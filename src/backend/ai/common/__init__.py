@@ -1,6 +1,10 @@
 from enum import Enum
 from typing import List, Optional
 from .public_tool_decorator import public_tool
-from .base_message import BaseChatMessage, ChatRole
+from .concurrent_tool_decorator import concurrent_tool
+from .base_message import BaseChatMessage, ChatRole, ImageDetail
 from .base_tool import BaseTool, BaseToolCall, BaseToolCallWithResult
-from .base_response import BaseChatResponse
\ No newline at end of file
+from .base_response import BaseChatResponse
+from .completion_stream import AsyncCompletionStream
+from .tool_registry import RegisteredTool, get_registered_tool
+from .request_policy import RequestPolicy, Priority, DEFAULT_REQUEST_POLICY
\ No newline at end of file
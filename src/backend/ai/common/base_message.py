@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import List, Optional
+from typing import List, Literal, Optional
 from .base_tool import BaseToolCallWithResult
 
 class ChatRole(Enum):
@@ -7,9 +7,13 @@ class ChatRole(Enum):
     AGENT = 2
     TOOL = 3
 
+# "low" sends a fixed 512px version of each image for a flat token cost, "high" lets the model see detail
+ImageDetail = Literal["auto", "low", "high"]
+
 class BaseChatMessage:
     role: ChatRole
-    png_images: List[bytes]
+    images: List[bytes]
+    image_detail: Optional[ImageDetail]
     message: Optional[str]
     tool_calls: List[BaseToolCallWithResult] = []
     
@@ -17,10 +21,12 @@ class BaseChatMessage:
         self, 
         role: ChatRole, 
         message: Optional[str], 
-        png_images: List[bytes] = [],
-        tool_calls: List[BaseToolCallWithResult] = []
+        images: List[bytes] = [],
+        tool_calls: List[BaseToolCallWithResult] = [],
+        image_detail: Optional[ImageDetail] = None
     ):
         self.role = role
         self.message = message
-        self.png_images = png_images
+        self.images = images
+        self.image_detail = image_detail
         self.tool_calls = tool_calls
\ No newline at end of file
@@ -0,0 +1,48 @@
+import uuid
+from typing import AsyncGenerator, AsyncIterator, List
+from domain.dto.ai import CompletionChunk
+from .base_response import BaseChatResponse
+
+class AsyncCompletionStream:
+    """
+    Wraps an asynchronous completion generator. Async generators cannot return a value, so the
+    final responses are collected into the `responses` list and are available once iteration completes.
+
+    Attributes:
+        responses (List[BaseChatResponse]): The final responses from the AI model, populated when the stream is exhausted
+    """
+    responses: List[BaseChatResponse]
+
+    def __init__(
+        self,
+        generator: AsyncGenerator[CompletionChunk, None],
+        responses: List[BaseChatResponse]
+    ):
+        self.generator = generator
+        self.responses = responses
+
+    def __aiter__(self) -> AsyncIterator[CompletionChunk]:
+        return self.generator
+
+    async def aclose(self) -> None:
+        await self.generator.aclose()
+
+    @staticmethod
+    def from_text(text: str, chars_per_chunk: int = 32) -> "AsyncCompletionStream":
+        """
+        Streams text that is already known, such as a reused answer, as if the model were generating it
+
+        Args:
+            text (str): The text to stream
+            chars_per_chunk (int): The length of each chunk
+
+        Returns:
+            AsyncCompletionStream: The stream, with a single response holding the text
+        """
+        message_id = f"reused-{uuid.uuid4().hex}"
+
+        async def generate() -> AsyncGenerator[CompletionChunk, None]:
+            for i in range(0, len(text), chars_per_chunk):
+                yield CompletionChunk.model_construct(message_id=message_id, text=text[i:i + chars_per_chunk], tools=[])
+
+        return AsyncCompletionStream(generate(), [BaseChatResponse(message=text, tool_calls=[])])
@@ -0,0 +1,18 @@
+from typing import Callable, Type
+from ai.common.base_tool import BaseTool
+
+def concurrent_tool() -> Callable:
+    """
+    A decorator that labels a tool as safe to run alongside other tool calls from the same model turn
+    by adding an 'IS_CONCURRENT' attribute to the class.
+
+    Returns:
+        Callable: The decorated class with the 'IS_CONCURRENT' attribute set to True
+    """
+    
+    def decorator(tool: Type[BaseTool]) -> Type[BaseTool]:
+        tool.IS_CONCURRENT = True
+        
+        return tool
+    
+    return decorator
@@ -0,0 +1,59 @@
+import random
+from typing import Literal, Optional
+
+# Order in which prompts are given the shared OpenAI quota when it runs low: interactive requests from users,
+# course planning, then background course generation
+Priority = Literal["interactive", "planning", "background"]
+
+class RequestPolicy:
+    """
+    Controls how long a prompt may wait on the model and what happens when it is slow or fails
+
+    Attributes:
+        deadline_seconds (Optional[float]): Total time allowed for the prompt, including tool call round trips
+        first_token_timeout_seconds (Optional[float]): Time allowed for a request to produce its first chunk, or
+            None to wait as long as the request takes
+        max_retries (int): Attempts made after a transient failure before the first chunk
+        backoff_base_seconds (float): Upper bound of the delay before the first retry, doubled for each retry after it
+        backoff_max_seconds (float): Upper bound of the delay before any retry
+        hedge_after_seconds (Optional[float]): When set, a duplicate request is sent if the first chunk has not
+            arrived after this long, and whichever request produces a chunk first is used
+    """
+    deadline_seconds: Optional[float]
+    first_token_timeout_seconds: Optional[float]
+    max_retries: int
+    backoff_base_seconds: float
+    backoff_max_seconds: float
+    hedge_after_seconds: Optional[float]
+
+    def __init__(
+        self,
+        deadline_seconds: Optional[float] = None,
+        first_token_timeout_seconds: Optional[float] = None,
+        max_retries: int = 2,
+        backoff_base_seconds: float = 0.5,
+        backoff_max_seconds: float = 8,
+        hedge_after_seconds: Optional[float] = None
+    ) -> None:
+        self.deadline_seconds = deadline_seconds
+        self.first_token_timeout_seconds = first_token_timeout_seconds
+        self.max_retries = max_retries
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.hedge_after_seconds = hedge_after_seconds
+
+    def get_backoff_seconds(self, attempt: int) -> float:
+        """
+        Gets the delay before a retry using full jitter, so clients that failed together do not retry together
+
+        Args:
+            attempt (int): The number of attempts that have failed so far, starting at 1
+
+        Returns:
+            float: The delay in seconds
+        """
+        ceiling = min(self.backoff_max_seconds, self.backoff_base_seconds * 2 ** (attempt - 1))
+
+        return random.uniform(0, ceiling)
+
+DEFAULT_REQUEST_POLICY = RequestPolicy()
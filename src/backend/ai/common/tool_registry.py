@@ -0,0 +1,88 @@
+import copy
+import inspect
+import logging
+import threading
+from typing import Any, Dict, Type, get_type_hints
+from pydantic import TypeAdapter
+from .base_tool import BaseTool
+
+class RegisteredTool:
+    """
+    Everything derived from a tool class that does not change between requests. The schema and
+    result validator are built once, and instances are copied from a prototype rather than
+    constructed, so schema generation in a tool's __init__ only ever runs once.
+
+    Attributes:
+        tool_type (Type[BaseTool]): The tool class
+        name (str): The name the model calls the tool by
+        description (str): The description given to the model
+        schema (dict): The JSON schema of the tool's arguments
+        result_type (Type): The type hint of the tool's "result" property
+        result_adapter (TypeAdapter): Validates tool results against result_type
+        is_public (bool): Whether tool calls are streamed to the client
+        is_concurrent (bool): Whether calls may run alongside other tool calls from the same turn
+        is_async (bool): Whether the tool's process method is a coroutine
+    """
+    tool_type: Type[BaseTool]
+    name: str
+    description: str
+    schema: dict
+    result_type: Type
+    result_adapter: TypeAdapter
+    is_public: bool
+    is_concurrent: bool
+    is_async: bool
+
+    def __init__(self, tool_type: Type[BaseTool]) -> None:
+        # Get the Type annotation of the tool's "result" property
+        result_type = get_type_hints(tool_type).get("result")
+
+        if not result_type:
+            raise ValueError(f"Tool {tool_type.__name__} does not have a 'result' property defined with a type hint")
+
+        self._prototype = tool_type()
+        self.tool_type = tool_type
+        self.name = self._prototype.name
+        self.description = self._prototype.description
+        self.schema = self._prototype.schema
+        self.result_type = result_type
+        self.result_adapter = TypeAdapter(result_type)
+        self.is_public = hasattr(tool_type, "IS_PUBLIC")
+        self.is_concurrent = hasattr(tool_type, "IS_CONCURRENT")
+        self.is_async = inspect.iscoroutinefunction(tool_type.process)
+
+        logging.info(f"{tool_type.__name__} has result type {result_type.__name__}")
+
+    @property
+    def prototype(self) -> BaseTool:
+        return self._prototype
+
+    def create_instance(self) -> BaseTool:
+        return copy.copy(self._prototype)
+
+    def validate_result(self, result: Any) -> Any:
+        return self.result_adapter.validate_python(result)
+
+_registered_tools: Dict[Type[BaseTool], RegisteredTool] = {}
+_registered_tools_lock = threading.Lock()
+
+def get_registered_tool(tool_type: Type[BaseTool]) -> RegisteredTool:
+    """
+    Gets the registry entry for a tool class, building it the first time the tool is used
+
+    Args:
+        tool_type (Type[BaseTool]): The tool class
+
+    Returns:
+        RegisteredTool: The tool's registry entry
+    """
+    registered = _registered_tools.get(tool_type)
+
+    if registered:
+        return registered
+
+    with _registered_tools_lock:
+        if tool_type not in _registered_tools:
+            _registered_tools[tool_type] = RegisteredTool(tool_type)
+
+        return _registered_tools[tool_type]
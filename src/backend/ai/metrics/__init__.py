@@ -0,0 +1,15 @@
+from .metrics_sink import MetricsSink, NullMetricsSink, Labels
+from .in_memory_metrics_sink import InMemoryMetricsSink
+from .metrics import get_metrics_sink, set_metrics_sink
+from .llm_metrics import (
+    RoundTripMetrics,
+    record_round_trip,
+    record_prompt_completed,
+    record_prompt_failed,
+    record_response_cache_lookup,
+    record_answer_reuse_lookup,
+    record_tool_argument_repair,
+    record_routing_decision,
+    record_routing_savings,
+    record_admission
+)
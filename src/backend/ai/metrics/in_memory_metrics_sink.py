@@ -0,0 +1,114 @@
+import bisect
+import threading
+from typing import Dict, List, Optional, Tuple
+from .metrics_sink import Labels, MetricsSink
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+# Upper bounds suited to LLM latencies in seconds, token counts and rates all fall within the same range well enough
+DEFAULT_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000]
+
+class Histogram:
+    def __init__(self, buckets: List[float]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+
+        if index < len(self.counts):
+            self.counts[index] += 1
+
+        self.count += 1
+        self.sum += value
+
+class InMemoryMetricsSink(MetricsSink):
+    """
+    Aggregates counters and histograms in process memory and renders them for a Prometheus scrape
+    """
+    def __init__(self, buckets: Optional[Dict[str, List[float]]] = None) -> None:
+        self._buckets = buckets or {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, labels: Optional[Labels] = None, value: float = 1) -> None:
+        key = _get_label_key(labels)
+
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, labels: Optional[Labels] = None) -> None:
+        key = _get_label_key(labels)
+
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+
+            if key not in series:
+                series[key] = Histogram(self._buckets.get(name, DEFAULT_BUCKETS))
+
+            series[key].observe(value)
+
+    def get_counter(self, name: str, labels: Optional[Labels] = None) -> float:
+        with self._lock:
+            return self._counters.get(name, {}).get(_get_label_key(labels), 0)
+
+    def get_histogram(self, name: str, labels: Optional[Labels] = None) -> Optional[Tuple[int, float]]:
+        """
+        Gets the number of observations and their sum for a histogram series
+        """
+        with self._lock:
+            histogram = self._histograms.get(name, {}).get(_get_label_key(labels))
+
+            if not histogram:
+                return None
+
+            return histogram.count, histogram.sum
+
+    def render(self) -> str:
+        lines: List[str] = []
+
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# TYPE {name} counter")
+
+                for key, value in sorted(series.items()):
+                    lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+
+                for key, histogram in sorted(series.items()):
+                    cumulative = 0
+
+                    for bucket, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(key, ('le', _format_value(bucket)))} {cumulative}")
+
+                    lines.append(f"{name}_bucket{_format_labels(key, ('le', '+Inf'))} {histogram.count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {_format_value(histogram.sum)}")
+                    lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+
+        return "\n".join(lines) + "\n"
+
+def _get_label_key(labels: Optional[Labels]) -> LabelKey:
+    return tuple(sorted((labels or {}).items()))
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [*key, extra] if extra else list(key)
+
+    if not pairs:
+        return ""
+
+    escaped = [
+        f'{name}="{value.replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for name, value in pairs
+    ]
+
+    return "{" + ",".join(escaped) + "}"
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
@@ -0,0 +1,169 @@
+from typing import Optional
+from openai.types import CompletionUsage
+from .metrics import get_metrics_sink
+
+class RoundTripMetrics:
+    """
+    Timings and usage for a single request to the model within a prompt's tool loop
+
+    Attributes:
+        duration_seconds (float): Time from sending the request until the stream was read to the end
+        time_to_first_token_seconds (Optional[float]): Time from sending the request until the first text or tool
+            argument delta, including retries and hedged requests
+        generation_seconds (Optional[float]): Time from the first token until the stream was read to the end
+        usage (Optional[CompletionUsage]): The usage reported in the final chunk of the stream
+    """
+    duration_seconds: float
+    time_to_first_token_seconds: Optional[float]
+    generation_seconds: Optional[float]
+    usage: Optional[CompletionUsage]
+
+    def __init__(
+        self,
+        duration_seconds: float,
+        time_to_first_token_seconds: Optional[float],
+        generation_seconds: Optional[float],
+        usage: Optional[CompletionUsage]
+    ) -> None:
+        self.duration_seconds = duration_seconds
+        self.time_to_first_token_seconds = time_to_first_token_seconds
+        self.generation_seconds = generation_seconds
+        self.usage = usage
+
+def record_round_trip(prompt_name: str, model_name: str, metrics: RoundTripMetrics) -> None:
+    """
+    Reports the metrics of a single request to the model
+
+    Args:
+        prompt_name (str): The name of the prompt class
+        model_name (str): The model the request was sent to
+        metrics (RoundTripMetrics): The measurements for the request
+    """
+    sink = get_metrics_sink()
+    labels = {"prompt": prompt_name, "model": model_name}
+
+    sink.increment("llm_round_trips_total", labels)
+    sink.observe("llm_round_trip_seconds", metrics.duration_seconds, labels)
+
+    if metrics.time_to_first_token_seconds is not None:
+        sink.observe("llm_time_to_first_token_seconds", metrics.time_to_first_token_seconds, labels)
+
+    if not metrics.usage:
+        return
+
+    cached_tokens = 0
+
+    if metrics.usage.prompt_tokens_details and metrics.usage.prompt_tokens_details.cached_tokens:
+        cached_tokens = metrics.usage.prompt_tokens_details.cached_tokens
+
+    sink.increment("llm_prompt_tokens_total", labels, metrics.usage.prompt_tokens)
+    sink.increment("llm_cached_prompt_tokens_total", labels, cached_tokens)
+    sink.increment("llm_completion_tokens_total", labels, metrics.usage.completion_tokens)
+
+    if metrics.generation_seconds and metrics.usage.completion_tokens:
+        sink.observe(
+            "llm_completion_tokens_per_second",
+            metrics.usage.completion_tokens / metrics.generation_seconds,
+            labels
+        )
+
+def record_prompt_completed(prompt_name: str, model_name: str, duration_seconds: float, iterations: int) -> None:
+    """
+    Reports the metrics of a prompt once its tool loop has finished
+
+    Args:
+        prompt_name (str): The name of the prompt class
+        model_name (str): The model the prompt was sent to
+        duration_seconds (float): Time taken by every round trip and tool call of the prompt
+        iterations (int): The number of round trips made to the model
+    """
+    sink = get_metrics_sink()
+    labels = {"prompt": prompt_name, "model": model_name}
+
+    sink.observe("llm_prompt_seconds", duration_seconds, labels)
+    sink.observe("llm_tool_loop_iterations", iterations, labels)
+
+def record_prompt_failed(prompt_name: str, model_name: str, error: BaseException) -> None:
+    """
+    Reports a prompt which ended with an error, such as a timeout or a failed request
+    """
+    get_metrics_sink().increment(
+        "llm_prompt_errors_total",
+        {"prompt": prompt_name, "model": model_name, "error": type(error).__name__}
+    )
+
+def record_response_cache_lookup(prompt_name: str, is_hit: bool) -> None:
+    get_metrics_sink().increment(
+        "llm_response_cache_lookups_total",
+        {"prompt": prompt_name, "result": "hit" if is_hit else "miss"}
+    )
+
+def record_answer_reuse_lookup(prompt_name: str, is_hit: bool, similarity: float) -> None:
+    """
+    Reports a search for a previous answer to a question similar enough to be reused
+
+    Args:
+        prompt_name (str): The name of the prompt class
+        is_hit (bool): Whether an answer was reused
+        similarity (float): The similarity of the closest previous question, 0 when there were none
+    """
+    sink = get_metrics_sink()
+
+    sink.increment("llm_answer_reuse_lookups_total", {"prompt": prompt_name, "result": "hit" if is_hit else "miss"})
+    sink.observe("llm_answer_reuse_similarity", similarity, {"prompt": prompt_name})
+
+def record_tool_argument_repair(prompt_name: str, tool_name: str, kind: str, is_repaired: bool) -> None:
+    """
+    Reports an attempt to repair tool arguments locally instead of asking the model to correct them
+
+    Args:
+        prompt_name (str): The name of the prompt class
+        tool_name (str): The name of the tool that was called
+        kind (str): "json" for malformed JSON, or "schema" for arguments that failed validation
+        is_repaired (bool): Whether the repair succeeded, otherwise the model is asked to correct the call
+    """
+    get_metrics_sink().increment(
+        "llm_tool_argument_repairs_total",
+        {"prompt": prompt_name, "tool": tool_name, "kind": kind, "result": "repaired" if is_repaired else "failed"}
+    )
+
+def record_routing_decision(prompt_name: str, decision: str, duration_seconds: Optional[float] = None) -> None:
+    """
+    Reports which model answered a prompt that is eligible for the smaller model
+
+    Args:
+        prompt_name (str): The name of the prompt class
+        decision (str): "small" when the smaller model's answer was used, "escalated" when the larger model had
+            to answer after it, or "large" when the larger model was chosen up front
+        duration_seconds (Optional[float]): Time taken to produce the answer that was used, including any failed attempt
+    """
+    sink = get_metrics_sink()
+    labels = {"prompt": prompt_name, "decision": decision}
+
+    sink.increment("llm_routing_decisions_total", labels)
+
+    if duration_seconds is not None:
+        sink.observe("llm_routing_seconds", duration_seconds, labels)
+
+def record_admission(priority: str, outcome: str, wait_seconds: float) -> None:
+    """
+    Reports how long a request waited for room in the OpenAI quota shared between processes
+
+    Args:
+        priority (str): The priority of the prompt making the request
+        outcome (str): "admitted", "timed_out" when it was sent after waiting as long as its priority allows,
+            or "unavailable" when Redis could not be reached
+        wait_seconds (float): Time spent waiting
+    """
+    sink = get_metrics_sink()
+    labels = {"priority": priority, "outcome": outcome}
+
+    sink.increment("llm_admissions_total", labels)
+    sink.observe("llm_admission_wait_seconds", wait_seconds, labels)
+
+def record_routing_savings(prompt_name: str, saved_seconds: float) -> None:
+    """
+    Reports the estimated time saved by answering with the smaller model, compared with the larger model's
+    recent latency for the same prompt class. Escalations count as negative savings.
+    """
+    get_metrics_sink().increment("llm_routing_saved_seconds_total", {"prompt": prompt_name}, saved_seconds)
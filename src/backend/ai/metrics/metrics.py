@@ -0,0 +1,23 @@
+from .metrics_sink import MetricsSink
+from .in_memory_metrics_sink import InMemoryMetricsSink
+
+_sink: MetricsSink = InMemoryMetricsSink(
+    buckets={
+        "llm_tool_loop_iterations": [1, 2, 3, 4, 5, 6, 8, 10, 15, 20],
+        "llm_completion_tokens_per_second": [5, 10, 20, 30, 40, 50, 75, 100, 150, 200, 300, 500],
+        "llm_answer_reuse_similarity": [0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.75, 0.8, 0.85, 0.9, 0.95, 1]
+    }
+)
+
+def get_metrics_sink() -> MetricsSink:
+    """
+    Gets the sink that AI pipeline metrics are reported to
+    """
+    return _sink
+
+def set_metrics_sink(sink: MetricsSink) -> None:
+    """
+    Replaces the sink that AI pipeline metrics are reported to, such as with an exporter for another backend
+    """
+    global _sink
+    _sink = sink
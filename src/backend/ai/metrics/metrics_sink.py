@@ -0,0 +1,48 @@
+from typing import Dict, Optional
+
+Labels = Dict[str, str]
+
+class MetricsSink:
+    """
+    Receives measurements from the AI pipeline. Implementations decide how they are aggregated and exported.
+    """
+    def increment(self, name: str, labels: Optional[Labels] = None, value: float = 1) -> None:
+        """
+        Adds to a counter
+
+        Args:
+            name (str): The metric name
+            labels (Optional[Labels]): Labels which identify the series, such as the prompt class
+            value (float): The amount to add
+        """
+        raise NotImplementedError("Method not implemented")
+
+    def observe(self, name: str, value: float, labels: Optional[Labels] = None) -> None:
+        """
+        Records a single measurement of a distribution, such as a latency
+
+        Args:
+            name (str): The metric name
+            value (float): The measured value
+            labels (Optional[Labels]): Labels which identify the series, such as the prompt class
+        """
+        raise NotImplementedError("Method not implemented")
+
+    def render(self) -> str:
+        """
+        Renders the current state of every metric in the Prometheus text exposition format
+        """
+        raise NotImplementedError("Method not implemented")
+
+class NullMetricsSink(MetricsSink):
+    """
+    Discards every measurement
+    """
+    def increment(self, name: str, labels: Optional[Labels] = None, value: float = 1) -> None:
+        pass
+
+    def observe(self, name: str, value: float, labels: Optional[Labels] = None) -> None:
+        pass
+
+    def render(self) -> str:
+        return ""
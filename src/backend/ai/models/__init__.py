@@ -1,8 +1,11 @@
+import json
 import logging
 from typing import Generator, List, Tuple
 from ai.prompts import BasePrompt
-from ai.common import BaseChatMessage, BaseChatResponse, BaseTool
+from ai.common import AsyncCompletionStream, BaseChatMessage, BaseChatResponse, BaseTool
 from domain.dto.ai import CompletionChunk
+from ai.metrics import record_response_cache_lookup
+from config import is_llm_response_cache_enabled
 
 class BaseModel:
     def get_responses(self, prompt: BasePrompt) -> List[BaseChatResponse]:
@@ -15,6 +18,25 @@ class BaseModel:
         Returns:
             List[BaseChatResponse]: The final response from the AI model
         """
+        if prompt.response_cache_ttl and is_llm_response_cache_enabled():
+            from .response_cache import get_cached_responses
+
+            responses, is_cached = get_cached_responses(
+                key=self.get_cache_key(prompt),
+                ttl_seconds=prompt.response_cache_ttl,
+                compute=lambda: self._get_responses(prompt)
+            )
+
+            record_response_cache_lookup(type(prompt).__name__, is_cached)
+
+            if is_cached:
+                self._replay_tool_calls(prompt, responses)
+
+            return responses
+
+        return self._get_responses(prompt)
+
+    def _get_responses(self, prompt: BasePrompt) -> List[BaseChatResponse]:
         generator = self.get_streaming_response(prompt)
 
         while True:
@@ -22,7 +44,37 @@ class BaseModel:
                 next(generator)
             except StopIteration as e:
                 return e.value
-    
+
+    def _replay_tool_calls(self, prompt: BasePrompt, responses: List[BaseChatResponse]) -> None:
+        """
+        Runs the tool calls from cached responses against the prompt so their results are available
+        through get_tool_call, as they would be after a request to the model
+        """
+        for response in responses:
+            for tool_call in response.tool_calls:
+                try:
+                    prompt.process_tool(tool_name=tool_call.name, arguments=json.loads(tool_call.arguments))
+                except Exception as e:
+                    # Calls the model was asked to correct failed the first time around as well
+                    logging.info(f"Skipping cached tool call {tool_call.name}: {e}")
+
+    async def get_responses_async(self, prompt: BasePrompt) -> List[BaseChatResponse]:
+        """
+        Performs a streaming request to the AI model without blocking the event loop and returns the final response
+
+        Args:
+            prompt (BasePrompt): The prompt to send to the AI model
+
+        Returns:
+            List[BaseChatResponse]: The final response from the AI model
+        """
+        stream = self.get_streaming_response_async(prompt)
+
+        async for _ in stream:
+            pass
+
+        return stream.responses
+
     def get_streaming_response(self, prompt: BasePrompt) -> Generator[CompletionChunk, None, List[BaseChatResponse]]:
         """
         Performs a streaming request to the AI model and returns the response as a generator
@@ -37,7 +89,32 @@ class BaseModel:
             List[BaseChatResponse]: The final response from the AI model
         """
         raise NotImplementedError("Method not implemented")
-    
+
+    def get_streaming_response_async(self, prompt: BasePrompt) -> AsyncCompletionStream:
+        """
+        Performs a streaming request to the AI model using non-blocking I/O
+
+        Args:
+            prompt (BasePrompt): The prompt to send to the AI model
+
+        Returns:
+            AsyncCompletionStream: An async iterator of completion chunks. The final response from the
+            AI model is available on its `responses` attribute once iteration has finished.
+        """
+        raise NotImplementedError("Method not implemented")
+
+    def get_cache_key(self, prompt: BasePrompt) -> str:
+        """
+        Produces a stable hash of everything that determines the model's response to a prompt
+
+        Args:
+            prompt (BasePrompt): The prompt to hash
+
+        Returns:
+            str: The cache key for the prompt
+        """
+        raise NotImplementedError("Method not implemented")
+
     def get_message(self, message: BaseChatMessage) -> dict:
         raise NotImplementedError("Method not implemented")
 
@@ -0,0 +1,272 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+from ai.common import Priority
+from ai.metrics import record_admission
+from common.cache import run_script, run_script_async
+from config import get_llm_backend, get_llm_global_rpm_limit, get_llm_global_tpm_limit
+from .resilient_stream import Deadline
+
+logger = logging.getLogger("AdmissionControl")
+
+REQUESTS_KEY = "llm-admission:requests"
+TOKENS_KEY = "llm-admission:tokens"
+
+# Fraction of each bucket a priority must leave untouched, so lower priorities stop drawing on the quota
+# while there is still room for the priorities above them
+RESERVED_FRACTIONS: Dict[Priority, float] = {
+    "interactive": 0,
+    "planning": 0.2,
+    "background": 0.5
+}
+
+# Longest a request waits for capacity before it is sent anyway, or None to wait for as long as it takes.
+# Users are not kept waiting on a quota OpenAI may still have room in.
+MAX_WAIT_SECONDS: Dict[Priority, Optional[float]] = {
+    "interactive": 2,
+    "planning": 10,
+    "background": None
+}
+
+MAX_POLL_SECONDS = 1
+
+_admission_controller = None
+
+# Refills both buckets for the time since they were last used and takes a request and its tokens from them
+# when both have room above the priority's reserve. Otherwise nothing is taken and the wait until there
+# would be room is returned. Redis' clock is used so every process agrees on the time.
+#
+# KEYS: requests bucket, tokens bucket
+# ARGV: requests per minute, tokens per minute, reserved fraction, tokens
+# Returns: {1, 0} when admitted, or {0, milliseconds to wait}
+ACQUIRE_SCRIPT = """
+if redis.replicate_commands then
+    redis.replicate_commands()
+end
+
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local reserved_fraction = tonumber(ARGV[3])
+local costs = {1, tonumber(ARGV[4])}
+local capacities = {tonumber(ARGV[1]), tonumber(ARGV[2])}
+local levels = {}
+local wait = 0
+
+for i, key in ipairs(KEYS) do
+    local capacity = capacities[i]
+
+    if capacity > 0 then
+        local state = redis.call('HMGET', key, 'level', 'updated')
+        local level = tonumber(state[1]) or capacity
+        local updated = tonumber(state[2]) or now
+        local rate = capacity / 60
+        local reserve = capacity * reserved_fraction
+
+        level = math.min(capacity, level + math.max(0, now - updated) * rate)
+        levels[i] = level
+
+        -- Requests larger than the room above the reserve are admitted once that room is free, and go into debt
+        local needed = math.min(costs[i], capacity - reserve)
+        local shortfall = needed - (level - reserve)
+
+        if shortfall > 0 then
+            wait = math.max(wait, shortfall / rate)
+        end
+    end
+end
+
+if wait > 0 then
+    return {0, math.ceil(wait * 1000)}
+end
+
+for i, key in ipairs(KEYS) do
+    if capacities[i] > 0 then
+        redis.call('HSET', key, 'level', levels[i] - costs[i], 'updated', now)
+        redis.call('EXPIRE', key, 120)
+    end
+end
+
+return {1, 0}
+"""
+
+# Returns the difference between the estimated and actual tokens of an admitted request to the tokens bucket
+#
+# KEYS: tokens bucket
+# ARGV: tokens to return, negative when the request used more than estimated
+SETTLE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('HINCRBYFLOAT', KEYS[1], 'level', ARGV[1])
+end
+
+return 0
+"""
+
+class AdmissionController:
+    """
+    Token buckets for requests and tokens per minute, kept in Redis so the quota is shared by the API and
+    the course generator. Each priority leaves part of the buckets for the priorities above it, so
+    background generation slows down before interactive requests start seeing 429s.
+    """
+    rpm_limit: int
+    tpm_limit: int
+
+    def __init__(self, rpm_limit: int, tpm_limit: int) -> None:
+        self.rpm_limit = rpm_limit
+        self.tpm_limit = tpm_limit
+
+    def acquire(self, priority: Priority, estimated_tokens: int, deadline: Deadline) -> bool:
+        """
+        Waits until the shared quota has room for a request at the given priority
+
+        Args:
+            priority (Priority): The priority of the prompt making the request
+            estimated_tokens (int): Tokens the request is expected to use
+            deadline (Deadline): The prompt's deadline, which bounds the wait
+
+        Returns:
+            bool: True when the request was taken from the quota, False when it is sent without waiting any longer
+        """
+        started_at = time.monotonic()
+
+        while True:
+            try:
+                wait_seconds = self._try_acquire(priority, estimated_tokens)
+            except Exception as e:
+                return self._record_unavailable(priority, started_at, e)
+
+            if wait_seconds is None:
+                return self._record(priority, started_at, "admitted")
+
+            sleep_seconds = self._get_sleep_seconds(priority, started_at, wait_seconds, deadline)
+
+            if sleep_seconds is None:
+                return self._record(priority, started_at, "timed_out")
+
+            time.sleep(sleep_seconds)
+
+    async def acquire_async(self, priority: Priority, estimated_tokens: int, deadline: Deadline) -> bool:
+        """
+        Async counterpart of acquire
+        """
+        started_at = time.monotonic()
+
+        while True:
+            try:
+                wait_seconds = await self._try_acquire_async(priority, estimated_tokens)
+            except Exception as e:
+                return self._record_unavailable(priority, started_at, e)
+
+            if wait_seconds is None:
+                return self._record(priority, started_at, "admitted")
+
+            sleep_seconds = self._get_sleep_seconds(priority, started_at, wait_seconds, deadline)
+
+            if sleep_seconds is None:
+                return self._record(priority, started_at, "timed_out")
+
+            await asyncio.sleep(sleep_seconds)
+
+    def settle(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """
+        Corrects the tokens taken for an admitted request once its usage is known
+
+        Args:
+            estimated_tokens (int): The tokens taken when the request was admitted
+            actual_tokens (int): The tokens reported in the request's usage
+        """
+        if not self.tpm_limit or estimated_tokens == actual_tokens:
+            return
+
+        try:
+            run_script(SETTLE_SCRIPT, [TOKENS_KEY], [estimated_tokens - actual_tokens])
+        except Exception as e:
+            logger.warning(f"Failed to settle tokens with admission control: {e}")
+
+    async def settle_async(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """
+        Async counterpart of settle
+        """
+        if not self.tpm_limit or estimated_tokens == actual_tokens:
+            return
+
+        try:
+            await run_script_async(SETTLE_SCRIPT, [TOKENS_KEY], [estimated_tokens - actual_tokens])
+        except Exception as e:
+            logger.warning(f"Failed to settle tokens with admission control: {e}")
+
+    def _try_acquire(self, priority: Priority, estimated_tokens: int) -> Optional[float]:
+        """
+        Returns None when the request was admitted, otherwise the seconds until it could be
+        """
+        admitted, wait_ms = run_script(
+            ACQUIRE_SCRIPT,
+            [REQUESTS_KEY, TOKENS_KEY],
+            [self.rpm_limit, self.tpm_limit, RESERVED_FRACTIONS[priority], estimated_tokens]
+        )
+
+        return None if admitted else int(wait_ms) / 1000
+
+    async def _try_acquire_async(self, priority: Priority, estimated_tokens: int) -> Optional[float]:
+        admitted, wait_ms = await run_script_async(
+            ACQUIRE_SCRIPT,
+            [REQUESTS_KEY, TOKENS_KEY],
+            [self.rpm_limit, self.tpm_limit, RESERVED_FRACTIONS[priority], estimated_tokens]
+        )
+
+        return None if admitted else int(wait_ms) / 1000
+
+    def _get_sleep_seconds(
+        self,
+        priority: Priority,
+        started_at: float,
+        wait_seconds: float,
+        deadline: Deadline
+    ) -> Optional[float]:
+        """
+        Returns how long to sleep before trying again, or None when the request should be sent without waiting longer
+        """
+        # Other processes may take the capacity first, so the bucket is checked again at least every second
+        sleep_seconds = min(wait_seconds, MAX_POLL_SECONDS)
+        limits = [deadline.remaining()]
+        max_wait_seconds = MAX_WAIT_SECONDS[priority]
+
+        if max_wait_seconds is not None:
+            limits.append(max_wait_seconds - (time.monotonic() - started_at))
+
+        remaining = min((limit for limit in limits if limit is not None), default=None)
+
+        if remaining is not None and remaining <= 0:
+            return None
+
+        return sleep_seconds if remaining is None else min(sleep_seconds, remaining)
+
+    def _record(self, priority: Priority, started_at: float, outcome: str) -> bool:
+        record_admission(priority, outcome, time.monotonic() - started_at)
+
+        return outcome == "admitted"
+
+    def _record_unavailable(self, priority: Priority, started_at: float, error: Exception) -> bool:
+        # The quota is enforced by OpenAI regardless, so requests carry on without Redis
+        logger.warning(f"Admission control is unavailable, sending request without it: {error}")
+
+        return self._record(priority, started_at, "unavailable")
+
+def get_admission_controller() -> Optional[AdmissionController]:
+    """
+    Gets the admission controller, or None when no global limits are configured or the LLM backend does not
+    call OpenAI directly
+    """
+    global _admission_controller
+
+    if get_llm_backend() != "openai":
+        return None
+
+    if _admission_controller is None:
+        rpm_limit = get_llm_global_rpm_limit()
+        tpm_limit = get_llm_global_tpm_limit()
+
+        # Limits are read once per process, False records that admission control is disabled
+        _admission_controller = AdmissionController(rpm_limit, tpm_limit) if rpm_limit or tpm_limit else False
+
+    return _admission_controller or None
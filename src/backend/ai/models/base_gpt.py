@@ -1,33 +1,48 @@
+import asyncio
 import logging
 import json
 import base64
+import hashlib
+import time
 
+from concurrent.futures import Future
 from . import BaseModel
 from domain.dto.ai.completion_chunk import CompletionChunk, Tool
-from typing import Generator, List, Literal, cast
-from openai import OpenAI, Stream
+from typing import AsyncGenerator, Dict, Generator, List, Literal, Optional, Type
+from openai import AsyncOpenAI, OpenAI
+from openai.types import CompletionUsage
 from openai.types.chat.chat_completion_assistant_message_param import FunctionCall
 from openai.types.chat import (
     ChatCompletionSystemMessageParam,
-    ChatCompletionAssistantMessageParam, 
-    ChatCompletionUserMessageParam, 
-    ChatCompletionToolMessageParam, 
-    ChatCompletionToolParam, 
+    ChatCompletionAssistantMessageParam,
+    ChatCompletionUserMessageParam,
+    ChatCompletionToolMessageParam,
+    ChatCompletionToolParam,
     ChatCompletionContentPartTextParam,
     ChatCompletionContentPartImageParam,
-    ChatCompletionMessageToolCall, 
+    ChatCompletionMessageToolCall,
     ChatCompletionChunk,
     ChatCompletionMessageParam
 )
 from openai.types.chat.chat_completion_named_tool_choice_param import Function as NamedToolFunction, ChatCompletionNamedToolChoiceParam
 from openai.types.chat.chat_completion_content_part_image_param import ImageURL
 from openai.types.shared import FunctionDefinition
-from config import get_openai_key
 from ai.prompts import BasePrompt
-from ai.common import BaseChatMessage, BaseChatResponse, BaseTool, BaseToolCallWithResult, ChatRole
+from common.conversion.image_preparation import get_image_mime_type
+from ai.metrics import RoundTripMetrics, record_round_trip, record_prompt_completed, record_prompt_failed, record_tool_argument_repair
+from ai.util import estimate_tokens, repair_json
+from .openai_clients import get_openai_client, get_async_openai_client, get_credential_pool, get_credential_client, get_async_credential_client
+from .credential_pool import LeasedStream, AsyncLeasedStream
+from .admission_control import get_admission_controller
+from .prompt_usage import record_usage
+from .tool_executor import get_tool_executor
+from .resilient_stream import Deadline, OpenedStream, open_stream, open_stream_async, close_stream, close_stream_async
+from ai.common import AsyncCompletionStream, BaseChatMessage, BaseChatResponse, BaseTool, BaseToolCallWithResult, ChatRole, RequestPolicy
 
 logger = logging.getLogger("BaseGPT")
 
+_tool_params: Dict[Type[BaseTool], ChatCompletionToolParam] = {}
+
 class ToolCallRecord:
     index: int
     id: str
@@ -35,7 +50,8 @@ class ToolCallRecord:
     arguments: str
     result: str
     errors: bool
-    
+    is_truncated: bool
+
     def __init__(self, index: int, id: str, name: str, arguments: str) -> None:
         self.index = index
         self.id = id
@@ -43,223 +59,695 @@ class ToolCallRecord:
         self.arguments = arguments
         self.result = "Success"
         self.errors = False
+        self.is_truncated = False
+
+class CompletionTurn:
+    """
+    Accumulates the state of a single round trip to the model while its stream is being read.
+    Tool call records are indexed by the call index the API assigns to each delta.
+    """
+    content: str
+    tool_calls_by_index: Dict[int, ToolCallRecord]
+    finish_reason: Optional[Literal['stop', 'length', 'tool_calls', 'content_filter', 'function_call']]
+    usage: Optional[CompletionUsage]
+    started_at: float
+    first_token_at: Optional[float]
+    admitted_tokens: Optional[int]
+
+    def __init__(self, admitted_tokens: Optional[int] = None) -> None:
+        self.content = ""
+        self.tool_calls_by_index = {}
+        self.finish_reason = None
+        self.usage = None
+        self.started_at = time.perf_counter()
+        self.first_token_at = None
+        self.admitted_tokens = admitted_tokens
+
+    @property
+    def tool_calls(self) -> List[ToolCallRecord]:
+        return list(self.tool_calls_by_index.values())
 
 class BaseGPT(BaseModel):
-    client: OpenAI
     model_name: str
-    
+
     def __init__(self, model_name: str) -> None:
-        api_key = get_openai_key()
-        
-        self.client = OpenAI(api_key=api_key)
-        self.model_name = model_name 
-    
+        self.model_name = model_name
+
+    @property
+    def client(self) -> OpenAI:
+        return get_openai_client()
+
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        # Resolved on use since async clients are pooled per event loop
+        return get_async_openai_client()
+
     def get_streaming_response(
-        self, 
+        self,
         prompt: BasePrompt
     ) -> Generator[CompletionChunk, None, List[BaseChatResponse]]:
         responses: List[BaseChatResponse] = []
-        
+
         # Create an initial message list based on the prompt, this may be added to later
+        messages = self._get_initial_messages(prompt)
+        available_tools = self._get_available_tools(prompt)
+
+        policy = prompt.request_policy
+        deadline = Deadline(policy.deadline_seconds)
+        started_at = time.perf_counter()
+        iterations = 0
+        corrections = 0
+
+        try:
+            # Loops until there are no more tool calls to process
+            while True:
+                args = self._get_completion_args(prompt, messages, available_tools)
+
+                # Waits for room in the quota shared with other processes, lower priorities waiting longer
+                turn = CompletionTurn(self._admit(prompt, args, deadline))
+                iterations += 1
+
+                # Waits for the first chunk, retrying or hedging according to the prompt's policy
+                opened = open_stream(
+                    lambda: self._create_stream(args, policy),
+                    policy,
+                    deadline
+                )
+
+                # Iterate through the completion stream
+                # Yield text content as it is received
+                # Collect tool calls as they populate
+                # The stream is read to the end since usage arrives in a final chunk after the finish reason
+                for chunk in self._read_stream(opened, deadline):
+                    completion_chunk = self._process_chunk(prompt, turn, chunk, available_tools)
+
+                    if completion_chunk:
+                        yield completion_chunk
+
+                self._record_round_trip(prompt, turn)
+                self._settle_admission(turn)
+
+                # Execute any tools that were called
+                self._process_tool_calls(prompt, turn.tool_calls)
+
+                responses.append(self._get_turn_response(turn))
+
+                if not self._add_tool_results(prompt, messages, turn):
+                    break
+
+                if self._is_out_of_corrections(prompt, turn, corrections):
+                    break
+
+                corrections += self._has_tool_errors(turn)
+        except Exception as e:
+            record_prompt_failed(type(prompt).__name__, self.model_name, e)
+            raise
+
+        record_prompt_completed(type(prompt).__name__, self.model_name, time.perf_counter() - started_at, iterations)
+
+        return responses
+
+    def get_streaming_response_async(
+        self,
+        prompt: BasePrompt
+    ) -> AsyncCompletionStream:
+        responses: List[BaseChatResponse] = []
+
+        return AsyncCompletionStream(
+            generator=self._get_streaming_response_async(prompt, responses),
+            responses=responses
+        )
+
+    async def _get_streaming_response_async(
+        self,
+        prompt: BasePrompt,
+        responses: List[BaseChatResponse]
+    ) -> AsyncGenerator[CompletionChunk, None]:
+        """
+        Async counterpart of get_streaming_response. Final responses are appended to the provided list
+        since async generators are unable to return a value.
+        """
+        messages = self._get_initial_messages(prompt)
+        available_tools = self._get_available_tools(prompt)
+        policy = prompt.request_policy
+        deadline = Deadline(policy.deadline_seconds)
+        started_at = time.perf_counter()
+        iterations = 0
+        corrections = 0
+
+        try:
+            while True:
+                args = self._get_completion_args(prompt, messages, available_tools)
+                turn = CompletionTurn(await self._admit_async(prompt, args, deadline))
+                iterations += 1
+
+                opened = await open_stream_async(
+                    lambda: self._create_stream_async(args, policy),
+                    policy,
+                    deadline
+                )
+
+                async for chunk in self._read_stream_async(opened, deadline):
+                    completion_chunk = self._process_chunk(prompt, turn, chunk, available_tools)
+
+                    if completion_chunk:
+                        yield completion_chunk
+
+                self._record_round_trip(prompt, turn)
+
+                await self._settle_admission_async(turn)
+
+                await self._process_tool_calls_async(prompt, turn.tool_calls)
+
+                responses.append(self._get_turn_response(turn))
+
+                if not self._add_tool_results(prompt, messages, turn):
+                    break
+
+                if self._is_out_of_corrections(prompt, turn, corrections):
+                    break
+
+                corrections += self._has_tool_errors(turn)
+        except Exception as e:
+            record_prompt_failed(type(prompt).__name__, self.model_name, e)
+            raise
+
+        record_prompt_completed(type(prompt).__name__, self.model_name, time.perf_counter() - started_at, iterations)
+
+    def _create_stream(self, args: dict, policy: RequestPolicy):
+        pool = get_credential_pool()
+
+        if pool is None:
+            return self.client.chat.completions.create(**args, **self._get_request_options(policy))
+
+        # Every attempt takes its own lease, so a retry after a 429 goes to a different key
+        lease = pool.acquire(self._estimate_request_tokens(args))
+
+        try:
+            stream = get_credential_client(lease.credential).chat.completions.create(**args, **self._get_request_options(policy))
+        except BaseException as e:
+            # Rejected requests do not count towards the key's token limit
+            lease.release(tokens=0, error=e)
+            raise
+
+        return LeasedStream(stream, lease)
+
+    async def _create_stream_async(self, args: dict, policy: RequestPolicy):
+        pool = get_credential_pool()
+
+        if pool is None:
+            return await self.async_client.chat.completions.create(**args, **self._get_request_options(policy))
+
+        lease = pool.acquire(self._estimate_request_tokens(args))
+
+        try:
+            stream = await get_async_credential_client(lease.credential).chat.completions.create(**args, **self._get_request_options(policy))
+        except BaseException as e:
+            # Rejected requests do not count towards the key's token limit
+            lease.release(tokens=0, error=e)
+            raise
+
+        return AsyncLeasedStream(stream, lease)
+
+    def _admit(self, prompt: BasePrompt, args: dict, deadline: Deadline) -> Optional[int]:
+        """
+        Waits for room in the shared quota, returning the tokens taken from it or None when nothing was taken
+        """
+        controller = get_admission_controller()
+
+        if controller is None:
+            return None
+
+        estimated_tokens = self._estimate_request_tokens(args)
+
+        return estimated_tokens if controller.acquire(prompt.priority, estimated_tokens, deadline) else None
+
+    async def _admit_async(self, prompt: BasePrompt, args: dict, deadline: Deadline) -> Optional[int]:
+        controller = get_admission_controller()
+
+        if controller is None:
+            return None
+
+        estimated_tokens = self._estimate_request_tokens(args)
+
+        return estimated_tokens if await controller.acquire_async(prompt.priority, estimated_tokens, deadline) else None
+
+    def _settle_admission(self, turn: CompletionTurn) -> None:
+        # Replaces the estimate taken from the shared quota with the tokens the request actually used
+        if turn.admitted_tokens is None or not turn.usage:
+            return
+
+        get_admission_controller().settle(turn.admitted_tokens, turn.usage.total_tokens)
+
+    async def _settle_admission_async(self, turn: CompletionTurn) -> None:
+        if turn.admitted_tokens is None or not turn.usage:
+            return
+
+        await get_admission_controller().settle_async(turn.admitted_tokens, turn.usage.total_tokens)
+
+    def _estimate_request_tokens(self, args: dict) -> int:
+        return estimate_tokens(json.dumps([args["messages"], args.get("tools")], default=str))
+
+    def _get_request_options(self, policy: RequestPolicy) -> dict:
+        # Bounds the wait for each read from the connection, including the wait for the first chunk
+        if policy.first_token_timeout_seconds is None:
+            return {}
+
+        return {"timeout": policy.first_token_timeout_seconds}
+
+    def _read_stream(
+        self,
+        opened: OpenedStream,
+        deadline: Deadline
+    ) -> Generator[ChatCompletionChunk, None, None]:
+        try:
+            if opened.first_chunk is None:
+                return
+
+            yield opened.first_chunk
+
+            for chunk in opened.chunks:
+                deadline.check()
+                yield chunk
+        finally:
+            close_stream(opened.stream)
+
+    async def _read_stream_async(
+        self,
+        opened: OpenedStream,
+        deadline: Deadline
+    ) -> AsyncGenerator[ChatCompletionChunk, None]:
+        try:
+            if opened.first_chunk is None:
+                return
+
+            yield opened.first_chunk
+
+            async for chunk in opened.chunks:
+                deadline.check()
+                yield chunk
+        finally:
+            await close_stream_async(opened.stream)
+
+    def get_batch_request(self, prompt: BasePrompt) -> dict:
+        """
+        Gets the arguments for a single, non-streaming request answering the prompt, for use in a batch.
+        Tool calls are not run, so only prompts answered in one turn are suitable.
+
+        Args:
+            prompt (BasePrompt): The prompt to answer
+
+        Returns:
+            dict: The chat completion arguments
+        """
+        args = self._get_completion_args(prompt, self._get_initial_messages(prompt), self._get_available_tools(prompt))
+        args.pop("stream")
+        args.pop("stream_options")
+
+        return args
+
+    def get_cache_key(self, prompt: BasePrompt) -> str:
+        # The request arguments cover the model name, messages, tool schemas and tool choice
+        args = self._get_completion_args(
+            prompt,
+            self._get_initial_messages(prompt),
+            self._get_available_tools(prompt)
+        )
+
+        serialized = json.dumps(
+            args,
+            sort_keys=True,
+            default=lambda value: value.model_dump(exclude_none=True)
+        )
+
+        return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+    def _get_initial_messages(self, prompt: BasePrompt) -> List[ChatCompletionMessageParam]:
+        # Static context goes first so every request for the same subject shares a cacheable prefix
         messages = [
             msg
-            for message in prompt.messages
+            for message in [*prompt.static_messages, *prompt.messages]
             for msg in self.get_messages(message)
         ]
-        
+
         if prompt.system_prompt:
             messages.insert(0, ChatCompletionSystemMessageParam(role="system", content=prompt.system_prompt))
-        
-        # Create the list of tools
+
+        return messages
+
+    def _get_available_tools(self, prompt: BasePrompt) -> List[ChatCompletionToolParam]:
         if prompt.tool_choice_filter:
-            available_tools = [
+            return [
                 self.get_tool(tool)
                 for tool in prompt.tools
                 if tool.name in prompt.tool_choice_filter
             ]
-        else:    
-            available_tools = [self.get_tool(tool) for tool in prompt.tools]
-        
-        # Loops until there are no more tool calls to process
-        while True:
-            if available_tools:
-                if prompt.forced_tool_name:
-                    tool_choice = ChatCompletionNamedToolChoiceParam(
-                        type="function",
-                        function=NamedToolFunction(
-                            name=prompt.forced_tool_name
-                        )
+
+        return [self.get_tool(tool) for tool in prompt.tools]
+
+    def _get_completion_args(
+        self,
+        prompt: BasePrompt,
+        messages: List[ChatCompletionMessageParam],
+        available_tools: List[ChatCompletionToolParam]
+    ) -> dict:
+        args = {
+            "model": self.model_name,
+            "messages": messages,
+            "stream": True,
+            "stream_options": {"include_usage": True}
+        }
+
+        if available_tools:
+            args["tools"] = available_tools
+
+            if not prompt.tools_enabled:
+                args["tool_choice"] = "none"
+            elif prompt.forced_tool_name:
+                args["tool_choice"] = ChatCompletionNamedToolChoiceParam(
+                    type="function",
+                    function=NamedToolFunction(
+                        name=prompt.forced_tool_name
                     )
-                    
-                    response = cast(Stream[ChatCompletionChunk], self.client.chat.completions.create(
-                        model=self.model_name,
-                        messages=messages,
-                        tools=available_tools,
-                        tool_choice=tool_choice,
-                        stream=True
-                    ))
-                elif prompt.tool_choice_filter:
-                    response = cast(Stream[ChatCompletionChunk], self.client.chat.completions.create(
-                        model=self.model_name,
-                        messages=messages,
-                        tools=available_tools,
-                        tool_choice="required",
-                        stream=True
-                    ))
-                else:    
-                    response = cast(Stream[ChatCompletionChunk], self.client.chat.completions.create(
-                        model=self.model_name,
-                        messages=messages,
-                        tools=available_tools,
-                        stream=True
-                    ))
-            else:
-                response = cast(Stream[ChatCompletionChunk], self.client.chat.completions.create(
-                    model=self.model_name,
-                    messages=messages,
-                    stream=True
-                ))
-            
-            response_content: str = ""
-            tool_call_dict: List[ToolCallRecord] = []
-            finish_reason: Literal['stop', 'length', 'tool_calls', 'content_filter', 'function_call']
-            
-            # Iterate through the completion stream
-            # Yield text content as it is received
-            # Collect tool calls as they populate
-            for chunk in response:
-                tool_calls = chunk.choices[0].delta.tool_calls
-                content = chunk.choices[0].delta.content
-                    
-                if available_tools and tool_calls:
-                    for tool_call in tool_calls:
-                        existing_record = next((record for record in tool_call_dict if record.index == tool_call.index), None)
-                        
-                        if existing_record is None:
-                            if tool_call.function:
-                                t_arguments = tool_call.function.arguments
-                            else:
-                                t_arguments = ""
-                            
-                            tool_call_dict.append(ToolCallRecord(
-                                index=tool_call.index,
-                                id=tool_call.id,
-                                name=tool_call.function.name,
-                                arguments=t_arguments
-                            ))
-                        else:
-                            existing_record.arguments += tool_call.function.arguments
-                         
-                if content:
-                    response_content += content
-                
-                if content or len(tool_call_dict) > 0:
-                    yield CompletionChunk.model_construct(
-                        message_id=chunk.id,
-                        text=content,
-                        tools=[
-                            Tool.model_construct(
-                                name=record.name,
-                                data=record.arguments
-                            )
-                            for record in tool_call_dict
-                            if prompt.is_tool_public(record.name)
-                        ]
+                )
+            elif prompt.tool_choice_filter:
+                args["tool_choice"] = "required"
+
+        return args
+
+    def _process_chunk(
+        self,
+        prompt: BasePrompt,
+        turn: CompletionTurn,
+        chunk: ChatCompletionChunk,
+        available_tools: List[ChatCompletionToolParam]
+    ) -> Optional[CompletionChunk]:
+        """
+        Folds a streamed chunk into the turn state and returns the chunk to surface to the caller, if any
+        """
+        if chunk.usage:
+            turn.usage = chunk.usage
+
+        # The usage chunk has no choices
+        if not chunk.choices:
+            return None
+
+        tool_calls = chunk.choices[0].delta.tool_calls
+        content = chunk.choices[0].delta.content
+        tool_deltas: List[Tool] = []
+
+        if available_tools and tool_calls:
+            for tool_call in tool_calls:
+                record = turn.tool_calls_by_index.get(tool_call.index)
+                fragment = (tool_call.function.arguments if tool_call.function else None) or ""
+
+                if record is None:
+                    record = ToolCallRecord(
+                        index=tool_call.index,
+                        id=tool_call.id,
+                        name=tool_call.function.name,
+                        arguments=""
                     )
-                            
-                if chunk.choices[0].finish_reason:
-                    finish_reason = chunk.choices[0].finish_reason
-                    logger.info(f"Finish reason: {finish_reason}")
-                    break
-            
-            # Execute any tools that were called
-            if len(tool_call_dict) > 0:
-                for record in tool_call_dict:
-                    logging.info(f"Processing tool: {record.name}")
-
-                    # Try to load the JSON - if it fails, return an error to the model for correction
-                    try:
-                        json_dict = json.loads(record.arguments)
-                        record.result = prompt.process_tool(tool_name=record.name, arguments=json_dict)
-                    except json.JSONDecodeError:
-                        logging.error(f"Error decoding JSON: {record.arguments}")
-                        record.result = "Invalid JSON provided to tool"
-                        record.errors = True
-                    except ValueError as e:
-                        logging.error(f"Error processing tool, invalid argument schema: {record.name}: {e}")
-                        record.result = f"""{e}
-Correct the errors in tool arguments and try again.
-"""
-                        record.errors = True
-                    except Exception as e:
-                        logging.error(f"Error processing tool, unhandled error: {record.name}: {e}")
-                        record.result = f"Error: {e}"
-                        record.errors = True
-            
-            responses.append(
-                BaseChatResponse(
-                    message=response_content, 
-                    tool_calls=[
-                        BaseToolCallWithResult(
-                            id=record.id,
-                            name=record.name, 
-                            arguments=record.arguments,
-                            result=record.result
-                        ) for record in tool_call_dict
-                    ]
+
+                    turn.tool_calls_by_index[tool_call.index] = record
+
+                offset = len(record.arguments)
+                record.arguments += fragment
+
+                if prompt.stream_tool_deltas and prompt.is_tool_public(record.name):
+                    tool_deltas.append(
+                        Tool.model_construct(
+                            name=record.name,
+                            is_public=True,
+                            index=record.index,
+                            offset=offset,
+                            data=fragment
+                        )
+                    )
+
+        if content:
+            turn.content += content
+
+        if turn.first_token_at is None and (content or tool_calls):
+            turn.first_token_at = time.perf_counter()
+
+        if chunk.choices[0].finish_reason:
+            turn.finish_reason = chunk.choices[0].finish_reason
+            logger.info(f"Finish reason: {turn.finish_reason}")
+
+            # Only the call being written when the output limit was reached is cut off
+            if turn.finish_reason == "length" and turn.tool_calls_by_index:
+                turn.tool_calls_by_index[max(turn.tool_calls_by_index)].is_truncated = True
+
+        if prompt.stream_tool_deltas:
+            if content or tool_deltas:
+                return CompletionChunk.model_construct(
+                    message_id=chunk.id,
+                    text=content,
+                    tools=tool_deltas
                 )
+        elif content or len(turn.tool_calls_by_index) > 0:
+            return CompletionChunk.model_construct(
+                message_id=chunk.id,
+                text=content,
+                tools=[
+                    Tool.model_construct(
+                        name=record.name,
+                        is_public=True,
+                        data=record.arguments
+                    )
+                    for record in turn.tool_calls
+                    if prompt.is_tool_public(record.name)
+                ]
             )
-            
-            # If the finish reason is tool calls, added to the chat context and repeat the loop
-            if finish_reason == "tool_calls" or len(tool_call_dict) > 0:
-                # Build the response message
-                response_message = ChatCompletionAssistantMessageParam(
-                    role="assistant",
-                    content=response_content,
-                    tool_calls=[
-                        ChatCompletionMessageToolCall(
-                            id=record.id,
-                            type="function",
-                            function=FunctionCall(
-                                name=record.name,
-                                arguments=record.arguments
-                            )
-                        ) for record in tool_call_dict
-                    ]
-                )
-                
-                messages.append(response_message)
-                
-                for record in tool_call_dict:
-                    messages.append(ChatCompletionToolMessageParam(
-                        role="tool", 
-                        tool_call_id=record.id, 
-                        content=record.result
-                    ))
-                    
-                # If the model was forced to call this a tool, break the loop unless there are errors
-                if prompt.forced_tool_name and not any(record.errors for record in tool_call_dict):
-                    break
+
+        return None
+
+    def _record_round_trip(self, prompt: BasePrompt, turn: CompletionTurn) -> None:
+        prompt_name = type(prompt).__name__
+        finished_at = time.perf_counter()
+
+        if turn.usage:
+            record_usage(prompt_name, turn.usage)
+
+        record_round_trip(
+            prompt_name,
+            self.model_name,
+            RoundTripMetrics(
+                duration_seconds=finished_at - turn.started_at,
+                time_to_first_token_seconds=turn.first_token_at - turn.started_at if turn.first_token_at else None,
+                generation_seconds=finished_at - turn.first_token_at if turn.first_token_at else None,
+                usage=turn.usage
+            )
+        )
+
+    def _process_tool_calls(
+        self,
+        prompt: BasePrompt,
+        records: List[ToolCallRecord]
+    ) -> None:
+        # Concurrent tools are started first and run on the shared pool while the rest run in order here
+        futures: Dict[int, Future] = {
+            record.index: get_tool_executor().submit(self._run_tool, prompt, record)
+            for record in records
+            if self._is_concurrent(prompt, record) and len(records) > 1
+        }
+
+        instances = [
+            futures[record.index].result() if record.index in futures else self._run_tool(prompt, record)
+            for record in records
+        ]
+
+        self._record_tool_calls(prompt, instances)
+
+    async def _process_tool_calls_async(
+        self,
+        prompt: BasePrompt,
+        records: List[ToolCallRecord]
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        tasks: Dict[int, asyncio.Future] = {}
+
+        for record in records:
+            if not self._is_concurrent(prompt, record) or len(records) == 1:
+                continue
+
+            if prompt.get_tool_by_name(record.name).is_async:
+                tasks[record.index] = asyncio.ensure_future(self._run_tool_async(prompt, record))
             else:
-                break
-        
-        return responses
-        
+                tasks[record.index] = loop.run_in_executor(get_tool_executor(), self._run_tool, prompt, record)
+
+        instances = [
+            await tasks[record.index] if record.index in tasks else await self._run_tool_async(prompt, record)
+            for record in records
+        ]
+
+        self._record_tool_calls(prompt, instances)
+
+    def _is_concurrent(self, prompt: BasePrompt, record: ToolCallRecord) -> bool:
+        try:
+            return prompt.get_tool_by_name(record.name).is_concurrent
+        except ValueError:
+            return False
+
+    def _record_tool_calls(self, prompt: BasePrompt, instances: List[Optional[BaseTool]]) -> None:
+        # Recorded in call order regardless of which tool finished first
+        for inst in instances:
+            if inst is not None:
+                prompt.record_tool_call(inst)
+
+    def _run_tool(self, prompt: BasePrompt, record: ToolCallRecord) -> Optional[BaseTool]:
+        logging.info(f"Processing tool: {record.name}")
+
+        # Try to load the JSON - if it fails, return an error to the model for correction
+        try:
+            json_dict = self._load_arguments(prompt, record)
+            inst, record.result = prompt.execute_tool(tool_name=record.name, arguments=json_dict)
+
+            return inst
+        except Exception as e:
+            self._set_tool_error(record, e)
+
+        return None
+
+    async def _run_tool_async(self, prompt: BasePrompt, record: ToolCallRecord) -> Optional[BaseTool]:
+        logging.info(f"Processing tool: {record.name}")
+
+        try:
+            json_dict = self._load_arguments(prompt, record)
+            inst, record.result = await prompt.execute_tool_async(tool_name=record.name, arguments=json_dict)
+
+            return inst
+        except Exception as e:
+            self._set_tool_error(record, e)
+
+        return None
+
+    def _load_arguments(self, prompt: BasePrompt, record: ToolCallRecord) -> dict:
+        try:
+            return json.loads(record.arguments)
+        except json.JSONDecodeError:
+            # Closing the brackets of truncated output would pass on whatever part of the arguments was
+            # written, so the model is asked to call the tool again instead
+            if record.is_truncated:
+                raise
+
+            # Trailing commas and similar slips can usually be fixed without asking the model again
+            repaired = repair_json(record.arguments)
+            is_repaired = isinstance(repaired, dict)
+
+            record_tool_argument_repair(type(prompt).__name__, record.name, "json", is_repaired)
+
+            if not is_repaired:
+                raise
+
+            logger.info(f"Repaired malformed JSON arguments for {record.name}")
+
+            # Keeps the conversation and cached responses consistent with the arguments that were used
+            record.arguments = json.dumps(repaired)
+
+            return repaired
+
+    def _set_tool_error(self, record: ToolCallRecord, error: Exception) -> None:
+        record.errors = True
+
+        if isinstance(error, json.JSONDecodeError) and record.is_truncated:
+            logging.error(f"Tool arguments were cut off at the output token limit: {record.name}")
+            record.result = "The arguments were cut off at the output token limit. Call the tool again with shorter arguments."
+        elif isinstance(error, json.JSONDecodeError):
+            logging.error(f"Error decoding JSON: {record.arguments}")
+            record.result = "Invalid JSON provided to tool"
+        elif isinstance(error, ValueError):
+            logging.error(f"Error processing tool, invalid argument schema: {record.name}: {error}")
+            record.result = f"""{error}
+Correct the errors in tool arguments and try again.
+"""
+        else:
+            logging.error(f"Error processing tool, unhandled error: {record.name}: {error}")
+            record.result = f"Error: {error}"
+
+    def _get_turn_response(self, turn: CompletionTurn) -> BaseChatResponse:
+        return BaseChatResponse(
+            message=turn.content,
+            tool_calls=[
+                BaseToolCallWithResult(
+                    id=record.id,
+                    name=record.name,
+                    arguments=record.arguments,
+                    result=record.result
+                ) for record in turn.tool_calls
+            ]
+        )
+
+    def _add_tool_results(
+        self,
+        prompt: BasePrompt,
+        messages: List[ChatCompletionMessageParam],
+        turn: CompletionTurn
+    ) -> bool:
+        """
+        Adds the assistant's tool calls and their results to the chat context
+
+        Returns:
+            bool: True if another round trip to the model is required
+        """
+        # If the finish reason is tool calls, added to the chat context and repeat the loop
+        if turn.finish_reason != "tool_calls" and len(turn.tool_calls) == 0:
+            return False
+
+        # Build the response message
+        response_message = ChatCompletionAssistantMessageParam(
+            role="assistant",
+            content=turn.content,
+            tool_calls=[
+                ChatCompletionMessageToolCall(
+                    id=record.id,
+                    type="function",
+                    function=FunctionCall(
+                        name=record.name,
+                        arguments=record.arguments
+                    )
+                ) for record in turn.tool_calls
+            ]
+        )
+
+        messages.append(response_message)
+
+        for record in turn.tool_calls:
+            messages.append(ChatCompletionToolMessageParam(
+                role="tool",
+                tool_call_id=record.id,
+                content=record.result
+            ))
+
+        # If the model was forced to call this a tool, break the loop unless there are errors
+        if prompt.forced_tool_name and not any(record.errors for record in turn.tool_calls):
+            return False
+
+        return True
+
+    def _has_tool_errors(self, turn: CompletionTurn) -> bool:
+        return any(record.errors for record in turn.tool_calls)
+
+    def _is_out_of_corrections(self, prompt: BasePrompt, turn: CompletionTurn, corrections: int) -> bool:
+        # Callers that can fall back to something else, such as a larger model, limit how often the model may correct itself
+        if prompt.max_tool_corrections is None or not self._has_tool_errors(turn):
+            return False
+
+        return corrections >= prompt.max_tool_corrections
+
     def get_messages(
-        self, 
+        self,
         message: BaseChatMessage
     ) -> List[ChatCompletionMessageParam]:
         if message.role == ChatRole.USER:
             # If images are included, write content out as an array of parts
-            if message.png_images:
+            if message.images:
                 base64_images = [
-                    f"data:image/png;base64,{base64_str}" 
-                    for base64_str in [
-                        base64.b64encode(image).decode("ascii") 
-                        for image in message.png_images
-                    ]
+                    f"data:{get_image_mime_type(image)};base64,{base64.b64encode(image).decode('ascii')}"
+                    for image in message.images
                 ]
-                
+
                 return [
                     ChatCompletionUserMessageParam(
                         role="user",
@@ -271,23 +759,23 @@ Correct the errors in tool arguments and try again.
                             *[
                                 ChatCompletionContentPartImageParam(
                                     type="image_url",
-                                    image_url=ImageURL(url=image)
+                                    image_url=ImageURL(url=image, detail=message.image_detail) if message.image_detail else ImageURL(url=image)
                                 ) for image in base64_images
                             ]
                         ]
                     )
                 ]
-                
+
             return [
                 ChatCompletionUserMessageParam(
-                    role="user", 
+                    role="user",
                     content=message.message
                 )
             ]
         elif message.role == ChatRole.AGENT:
             return [
                 ChatCompletionAssistantMessageParam(
-                    role="assistant", 
+                    role="assistant",
                     content=message.message,
                     tool_calls=[
                         ChatCompletionMessageToolCall(
@@ -313,17 +801,25 @@ Correct the errors in tool arguments and try again.
         elif message.role == ChatRole.TOOL:
             return [
                 ChatCompletionToolMessageParam(
-                    role="tool", 
+                    role="tool",
                     content=message.message
                 )
             ]
-        
+
     def get_tool(self, tool: BaseTool) -> dict:
-        return ChatCompletionToolParam(
-            type="function",
-            function=FunctionDefinition(
-                name=tool.name,
-                description=tool.description,
-                parameters=tool.schema
+        # Tool definitions never change, so each tool class is only converted once per process
+        tool_param = _tool_params.get(type(tool))
+
+        if tool_param is None:
+            tool_param = ChatCompletionToolParam(
+                type="function",
+                function=FunctionDefinition(
+                    name=tool.name,
+                    description=tool.description,
+                    parameters=tool.schema
+                )
             )
-        )
\ No newline at end of file
+
+            _tool_params[type(tool)] = tool_param
+
+        return tool_param
\ No newline at end of file
@@ -0,0 +1,4 @@
+from .batch_backend import BatchBackend, BatchRequest, BatchResult, BatchStatus, BatchError
+from .openai_batch_backend import OpenAIBatchBackend
+from .local_batch_backend import LocalBatchBackend
+from .batch_runner import get_batch_backend, run_batch
@@ -0,0 +1,165 @@
+import json
+import logging
+from typing import Dict, List, Optional
+
+logger = logging.getLogger("BatchBackend")
+
+# Batch statuses after which nothing more will be processed
+FINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+class BatchError(Exception):
+    pass
+
+class BatchRequest:
+    """
+    A single chat completion request within a batch
+
+    Attributes:
+        custom_id (str): Identifies the request's result within the batch
+        body (dict): The chat completion arguments, without streaming
+    """
+    custom_id: str
+    body: dict
+
+    def __init__(self, custom_id: str, body: dict) -> None:
+        self.custom_id = custom_id
+        self.body = body
+
+    def to_line(self) -> str:
+        return json.dumps({
+            "custom_id": self.custom_id,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": self.body
+        }, default=str)
+
+class BatchResult:
+    """
+    The outcome of a single request within a batch
+
+    Attributes:
+        custom_id (str): The custom ID of the request
+        content (Optional[str]): The message the model responded with, or None when the request failed
+        error (Optional[str]): Why the request failed
+    """
+    custom_id: str
+    content: Optional[str]
+    error: Optional[str]
+
+    def __init__(self, custom_id: str, content: Optional[str] = None, error: Optional[str] = None) -> None:
+        self.custom_id = custom_id
+        self.content = content
+        self.error = error
+
+    @staticmethod
+    def from_line(line: str) -> "BatchResult":
+        """
+        Parses a line of a batch output or error file
+        """
+        data = json.loads(line)
+        custom_id = data["custom_id"]
+        response = data.get("response") or {}
+        body = response.get("body") or {}
+
+        if data.get("error"):
+            return BatchResult(custom_id, error=data["error"].get("message") or str(data["error"]))
+
+        if response.get("status_code") != 200:
+            return BatchResult(custom_id, error=(body.get("error") or {}).get("message") or f"Status {response.get('status_code')}")
+
+        return BatchResult(custom_id, content=body["choices"][0]["message"]["content"])
+
+class BatchStatus:
+    """
+    Progress of a submitted batch
+
+    Attributes:
+        status (str): The batch status, such as "in_progress" or "completed"
+        completed (int): Requests that have finished
+        failed (int): Requests that have failed
+        total (int): Requests in the batch
+    """
+    status: str
+    completed: int
+    failed: int
+    total: int
+
+    def __init__(self, status: str, completed: int = 0, failed: int = 0, total: int = 0) -> None:
+        self.status = status
+        self.completed = completed
+        self.failed = failed
+        self.total = total
+
+    @property
+    def is_final(self) -> bool:
+        return self.status in FINAL_STATUSES
+
+class BatchBackend:
+    """
+    Runs chat completion requests asynchronously as a batch, trading latency for throughput and cost
+    """
+    def submit(self, requests: List[BatchRequest]) -> str:
+        """
+        Submits requests to be processed as a batch
+
+        Args:
+            requests (List[BatchRequest]): The requests to process
+
+        Returns:
+            str: The ID of the batch
+        """
+        raise NotImplementedError("Method not implemented")
+
+    def get_status(self, batch_id: str) -> BatchStatus:
+        """
+        Gets the progress of a batch
+
+        Args:
+            batch_id (str): The ID of the batch
+
+        Returns:
+            BatchStatus: The batch's progress
+        """
+        raise NotImplementedError("Method not implemented")
+
+    def get_results(self, batch_id: str) -> Dict[str, BatchResult]:
+        """
+        Gets the results of a batch which has finished, including the requests which failed
+
+        Args:
+            batch_id (str): The ID of the batch
+
+        Returns:
+            Dict[str, BatchResult]: The results, by the custom ID of their request
+        """
+        raise NotImplementedError("Method not implemented")
+
+    def cancel(self, batch_id: str) -> None:
+        """
+        Stops processing a batch which has not finished
+
+        Args:
+            batch_id (str): The ID of the batch
+        """
+        raise NotImplementedError("Method not implemented")
+
+def parse_results(text: str) -> Dict[str, BatchResult]:
+    """
+    Parses a batch output or error file. Lines which cannot be parsed are skipped, so their requests
+    have no result and are submitted again.
+    """
+    results: Dict[str, BatchResult] = {}
+
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+
+        try:
+            result = BatchResult.from_line(line)
+        except (ValueError, KeyError, IndexError, TypeError, AttributeError) as e:
+            logger.warning(f"Skipping malformed batch result: {e}")
+            continue
+
+        results[result.custom_id] = result
+
+    return results
@@ -0,0 +1,111 @@
+import logging
+import time
+from typing import Callable, List, Optional
+from openai import APIError
+from config import get_llm_batch_backend, get_llm_batch_directory, get_llm_batch_poll_seconds, get_llm_batch_max_wait_seconds
+from ..openai_clients import get_openai_api_client, get_openai_client
+from .batch_backend import BatchBackend, BatchError, BatchRequest
+from .local_batch_backend import LocalBatchBackend
+from .openai_batch_backend import OpenAIBatchBackend
+
+logger = logging.getLogger("BatchRunner")
+
+BatchProgressCallback = Callable[[int, int], None] # Requests finished, requests in the batch
+
+def get_batch_backend() -> BatchBackend:
+    """
+    Gets the batch backend configured by LLM_BATCH_BACKEND
+    """
+    if get_llm_batch_backend() == "openai":
+        return OpenAIBatchBackend(get_openai_api_client())
+
+    return LocalBatchBackend(get_llm_batch_directory(), get_openai_client)
+
+def run_batch(
+    bodies: List[dict],
+    backend: Optional[BatchBackend] = None,
+    progress_cb: Optional[BatchProgressCallback] = None,
+    max_resubmits: int = 1
+) -> List[str]:
+    """
+    Runs chat completion requests as a batch and waits for them to finish. Requests which fail are
+    submitted again in a smaller batch. A batch which has not finished within LLM_BATCH_MAX_WAIT_SECONDS
+    is cancelled.
+
+    Batches are sent with the default OpenAI client, so they are not balanced over the credential pool and
+    do not wait for admission control. The wait blocks the calling thread.
+
+    Args:
+        bodies (List[dict]): The chat completion arguments for each request
+        backend (Optional[BatchBackend]): The backend to use, the configured backend by default
+        progress_cb (Optional[BatchProgressCallback]): Called with the batch's progress each time it is polled
+        max_resubmits (int): Times failed requests are submitted again
+
+    Returns:
+        List[str]: The message content for each request, in the same order
+
+    Raises:
+        BatchError: When requests still fail after being resubmitted, the batch did not complete in time,
+            or the backend could not be reached
+    """
+    try:
+        return _run_batch(bodies, backend or get_batch_backend(), progress_cb, max_resubmits)
+    except (APIError, OSError) as e:
+        raise BatchError(f"Batch could not be run: {e}") from e
+
+def _run_batch(
+    bodies: List[dict],
+    backend: BatchBackend,
+    progress_cb: Optional[BatchProgressCallback],
+    max_resubmits: int
+) -> List[str]:
+    contents: List[Optional[str]] = [None] * len(bodies)
+    pending = list(range(len(bodies)))
+
+    for _ in range(max_resubmits + 1):
+        requests = [BatchRequest(custom_id=f"request-{index}", body=bodies[index]) for index in pending]
+        batch_id = backend.submit(requests)
+        finished_before = len(bodies) - len(pending)
+
+        logger.info(f"Submitted batch {batch_id} with {len(requests)} requests")
+
+        deadline = time.monotonic() + get_llm_batch_max_wait_seconds()
+
+        while True:
+            status = backend.get_status(batch_id)
+
+            if progress_cb:
+                progress_cb(finished_before + status.completed, len(bodies))
+
+            if status.is_final:
+                break
+
+            if time.monotonic() >= deadline:
+                backend.cancel(batch_id)
+
+                raise BatchError(f"Batch {batch_id} did not finish within {get_llm_batch_max_wait_seconds()}s and was cancelled")
+
+            time.sleep(min(get_llm_batch_poll_seconds(), max(0, deadline - time.monotonic())))
+
+        if status.status != "completed":
+            raise BatchError(f"Batch {batch_id} finished with status {status.status}")
+
+        results = backend.get_results(batch_id)
+        errors = []
+
+        for index in pending:
+            result = results.get(f"request-{index}")
+
+            if result and result.content is not None:
+                contents[index] = result.content
+            else:
+                errors.append(result.error if result else "No result")
+
+        pending = [index for index in pending if contents[index] is None]
+
+        if not pending:
+            return contents
+
+        logger.warning(f"{len(pending)} requests in batch {batch_id} failed, first error: {errors[0]}")
+
+    raise BatchError(f"{len(pending)} requests failed after {max_resubmits + 1} attempts")
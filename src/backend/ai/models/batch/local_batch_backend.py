@@ -0,0 +1,89 @@
+import json
+import logging
+import os
+import uuid
+from typing import Callable, Dict, List
+from openai import OpenAI
+from .batch_backend import BatchBackend, BatchRequest, BatchResult, BatchStatus, parse_results
+
+logger = logging.getLogger("LocalBatchBackend")
+
+class LocalBatchBackend(BatchBackend):
+    """
+    A file-based stand-in for the Batch API. Batches are written to a directory in the same JSONL format and
+    run against the chat completions client when first polled, so batch mode works offline with the replay
+    backend.
+    """
+    directory: str
+
+    def __init__(self, directory: str, get_client: Callable[[], OpenAI]) -> None:
+        self.directory = directory
+        self._get_client = get_client
+
+    def submit(self, requests: List[BatchRequest]) -> str:
+        batch_id = f"batch_{uuid.uuid4().hex}"
+        os.makedirs(self.directory, exist_ok=True)
+
+        with open(self._get_path(batch_id, "input"), "w") as f:
+            f.write("\n".join(request.to_line() for request in requests))
+
+        return batch_id
+
+    def get_status(self, batch_id: str) -> BatchStatus:
+        if not os.path.exists(self._get_path(batch_id, "input")):
+            raise ValueError(f"Batch {batch_id} does not exist")
+
+        if not os.path.exists(self._get_path(batch_id, "output")):
+            self._process(batch_id)
+
+        results = self.get_results(batch_id)
+        failed = sum(1 for result in results.values() if result.error)
+
+        return BatchStatus("completed", completed=len(results) - failed, failed=failed, total=len(results))
+
+    def get_results(self, batch_id: str) -> Dict[str, BatchResult]:
+        with open(self._get_path(batch_id, "output"), "r") as f:
+            return parse_results(f.read())
+
+    def cancel(self, batch_id: str) -> None:
+        # Batches are processed in full the first time they are polled, so there is never one in progress
+        pass
+
+    def _process(self, batch_id: str) -> None:
+        with open(self._get_path(batch_id, "input"), "r") as f:
+            lines = [json.loads(line) for line in f if line.strip()]
+
+        output = [self._run_request(line) for line in lines]
+
+        # Written in one go so a batch is never seen half processed
+        with open(self._get_path(batch_id, "output"), "w") as f:
+            f.write("\n".join(json.dumps(line) for line in output))
+
+    def _run_request(self, line: dict) -> dict:
+        try:
+            stream = self._get_client().chat.completions.create(
+                **line["body"],
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            content = "".join(
+                chunk.choices[0].delta.content or ""
+                for chunk in stream
+                if chunk.choices
+            )
+        except Exception as e:
+            logger.warning(f"Batch request {line['custom_id']} failed: {e}")
+
+            return {"custom_id": line["custom_id"], "response": None, "error": {"message": str(e)}}
+
+        return {
+            "custom_id": line["custom_id"],
+            "response": {
+                "status_code": 200,
+                "body": {"choices": [{"index": 0, "message": {"role": "assistant", "content": content}}]}
+            },
+            "error": None
+        }
+
+    def _get_path(self, batch_id: str, kind: str) -> str:
+        return os.path.join(self.directory, f"{batch_id}.{kind}.jsonl")
@@ -0,0 +1,50 @@
+from typing import Dict, List
+from openai import OpenAI
+from .batch_backend import BatchBackend, BatchRequest, BatchResult, BatchStatus, parse_results
+
+class OpenAIBatchBackend(BatchBackend):
+    """
+    Runs batches through OpenAI's Batch API, which has its own rate limits separate from chat completions.
+    Batches are sent with the client they are given rather than through the credential pool, and do not
+    take from the quota shared through admission control.
+    """
+    client: OpenAI
+
+    def __init__(self, client: OpenAI) -> None:
+        self.client = client
+
+    def submit(self, requests: List[BatchRequest]) -> str:
+        content = "\n".join(request.to_line() for request in requests).encode("utf-8")
+        input_file = self.client.files.create(file=("batch.jsonl", content), purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+
+        return batch.id
+
+    def get_status(self, batch_id: str) -> BatchStatus:
+        batch = self.client.batches.retrieve(batch_id)
+        counts = batch.request_counts
+
+        return BatchStatus(
+            status=batch.status,
+            completed=counts.completed if counts else 0,
+            failed=counts.failed if counts else 0,
+            total=counts.total if counts else 0
+        )
+
+    def get_results(self, batch_id: str) -> Dict[str, BatchResult]:
+        batch = self.client.batches.retrieve(batch_id)
+        results: Dict[str, BatchResult] = {}
+
+        # Successful requests are written to the output file and failed requests to the error file
+        for file_id in [batch.output_file_id, batch.error_file_id]:
+            if file_id:
+                results.update(parse_results(self.client.files.content(file_id).text))
+
+        return results
+
+    def cancel(self, batch_id: str) -> None:
+        self.client.batches.cancel(batch_id)
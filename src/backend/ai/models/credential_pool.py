@@ -0,0 +1,265 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Iterator, List, Optional, Tuple
+from ai.metrics import get_metrics_sink
+
+logger = logging.getLogger("CredentialPool")
+
+# Requests and tokens are counted over a sliding window of this length, matching OpenAI's per-minute limits
+WINDOW_SECONDS = 60
+
+# A key that returns 429s without a retry-after header is drained for this long, doubling for each 429 in a row
+DRAIN_BASE_SECONDS = 5
+DRAIN_MAX_SECONDS = 60
+
+class Credential:
+    """
+    An API key and the endpoint it is used with
+
+    Attributes:
+        name (str): Identifies the credential in logs and metrics without exposing the key. Credentials
+            without one are named by their position in the pool.
+        api_key (str): The API key
+        base_url (Optional[str]): The API endpoint, or None for OpenAI's
+        rpm_limit (int): Requests allowed per minute, or 0 when unknown
+        tpm_limit (int): Tokens allowed per minute, or 0 when unknown
+    """
+    name: str
+    api_key: str
+    base_url: Optional[str]
+    rpm_limit: int
+    tpm_limit: int
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: Optional[str] = None,
+        rpm_limit: int = 0,
+        tpm_limit: int = 0,
+        name: Optional[str] = None
+    ) -> None:
+        self.name = name
+        self.api_key = api_key
+        self.base_url = base_url
+        self.rpm_limit = rpm_limit
+        self.tpm_limit = tpm_limit
+
+class CredentialState:
+    credential: Credential
+    in_flight: int
+    requests: Deque[float]
+    tokens: Deque[Tuple[float, int]]
+    token_total: int
+    drained_until: float
+    consecutive_rate_limits: int
+
+    def __init__(self, credential: Credential) -> None:
+        self.credential = credential
+        self.in_flight = 0
+        self.requests = deque()
+        self.tokens = deque()
+        self.token_total = 0
+        self.drained_until = 0
+        self.consecutive_rate_limits = 0
+
+    def expire(self, now: float) -> None:
+        cutoff = now - WINDOW_SECONDS
+
+        while self.requests and self.requests[0] < cutoff:
+            self.requests.popleft()
+
+        while self.tokens and self.tokens[0][0] < cutoff:
+            self.token_total -= self.tokens.popleft()[1]
+
+    def get_load(self) -> float:
+        """
+        The fraction of the tightest known limit in use, with requests in flight breaking ties between keys
+        whose limits are unknown
+        """
+        load = 0.0
+
+        if self.credential.rpm_limit:
+            load = max(load, (len(self.requests) + self.in_flight) / self.credential.rpm_limit)
+
+        if self.credential.tpm_limit:
+            load = max(load, self.token_total / self.credential.tpm_limit)
+
+        return load + self.in_flight * 1e-6
+
+class Lease:
+    """
+    A credential reserved for a single request. Released once the request has finished, with the tokens it used.
+    """
+    def __init__(self, pool: "CredentialPool", state: CredentialState, estimated_tokens: int) -> None:
+        self._pool = pool
+        self._state = state
+        self._estimated_tokens = estimated_tokens
+        self._released = False
+
+    @property
+    def credential(self) -> Credential:
+        return self._state.credential
+
+    def release(self, tokens: Optional[int] = None, error: Optional[BaseException] = None) -> None:
+        """
+        Returns the credential to the pool
+
+        Args:
+            tokens (Optional[int]): Tokens the request used, or None to keep the estimate made when it was acquired
+            error (Optional[BaseException]): The error the request failed with, if any
+        """
+        if self._released:
+            return
+
+        self._released = True
+        self._pool._release(self._state, self._estimated_tokens, tokens, error)
+
+class CredentialPool:
+    """
+    Spreads requests over several API keys or endpoints. Each request goes to the least loaded key, and keys
+    that are rate limited are drained until they recover.
+    """
+    def __init__(self, credentials: List[Credential]) -> None:
+        if not credentials:
+            raise ValueError("At least one credential is required")
+
+        for index, credential in enumerate(credentials):
+            credential.name = credential.name or f"credential-{index}"
+
+        self._states = [CredentialState(credential) for credential in credentials]
+        self._lock = threading.Lock()
+
+    @property
+    def credentials(self) -> List[Credential]:
+        return [state.credential for state in self._states]
+
+    def acquire(self, estimated_tokens: int = 0) -> Lease:
+        """
+        Reserves the least loaded credential that is not drained. When every credential is drained, the one
+        that recovers first is used.
+
+        Args:
+            estimated_tokens (int): Tokens the request is expected to use, counted until the actual usage is known
+
+        Returns:
+            Lease: The reserved credential
+        """
+        with self._lock:
+            now = time.monotonic()
+
+            for state in self._states:
+                state.expire(now)
+
+            available = [state for state in self._states if state.drained_until <= now]
+
+            if available:
+                state = min(available, key=lambda state: state.get_load())
+            else:
+                state = min(self._states, key=lambda state: state.drained_until)
+
+            state.in_flight += 1
+            state.requests.append(now)
+            state.tokens.append((now, estimated_tokens))
+            state.token_total += estimated_tokens
+
+        get_metrics_sink().increment("llm_credential_requests_total", {"credential": state.credential.name})
+
+        return Lease(self, state, estimated_tokens)
+
+    def _release(
+        self,
+        state: CredentialState,
+        estimated_tokens: int,
+        tokens: Optional[int],
+        error: Optional[BaseException]
+    ) -> None:
+        is_rate_limited = _is_rate_limit_error(error)
+
+        with self._lock:
+            now = time.monotonic()
+            state.in_flight -= 1
+
+            # Replaces the estimate with the actual usage, in whichever window entry it is still counted
+            if tokens is not None:
+                correction = tokens - estimated_tokens
+                state.tokens.append((now, correction))
+                state.token_total += correction
+
+            if is_rate_limited:
+                state.consecutive_rate_limits += 1
+                drain_seconds = _get_retry_after(error) or min(
+                    DRAIN_MAX_SECONDS,
+                    DRAIN_BASE_SECONDS * 2 ** (state.consecutive_rate_limits - 1)
+                )
+                state.drained_until = max(state.drained_until, now + drain_seconds)
+            elif error is None:
+                state.consecutive_rate_limits = 0
+
+        if is_rate_limited:
+            logger.warning(f"Credential {state.credential.name} was rate limited, draining for {drain_seconds:.1f}s")
+            get_metrics_sink().increment("llm_credential_rate_limited_total", {"credential": state.credential.name})
+
+class LeasedStream:
+    """
+    Wraps a completion stream so its credential is released, with the tokens reported in the usage chunk,
+    once the stream has been read or closed
+    """
+    def __init__(self, stream: Any, lease: Lease) -> None:
+        self.stream = stream
+        self.lease = lease
+        self.tokens: Optional[int] = None
+
+    def __iter__(self) -> Iterator[Any]:
+        try:
+            for chunk in self.stream:
+                self._observe(chunk)
+                yield chunk
+        except Exception as e:
+            self.lease.release(self.tokens, e)
+            raise
+
+        self.lease.release(self.tokens)
+
+    def close(self) -> None:
+        try:
+            self.stream.close()
+        finally:
+            self.lease.release(self.tokens)
+
+    def _observe(self, chunk: Any) -> None:
+        usage = getattr(chunk, "usage", None)
+
+        if usage:
+            self.tokens = usage.total_tokens
+
+class AsyncLeasedStream(LeasedStream):
+    async def __aiter__(self) -> AsyncIterator[Any]:
+        try:
+            async for chunk in self.stream:
+                self._observe(chunk)
+                yield chunk
+        except Exception as e:
+            self.lease.release(self.tokens, e)
+            raise
+
+        self.lease.release(self.tokens)
+
+    async def close(self) -> None:
+        try:
+            await self.stream.close()
+        finally:
+            self.lease.release(self.tokens)
+
+def _is_rate_limit_error(error: Optional[BaseException]) -> bool:
+    return getattr(error, "status_code", None) == 429
+
+def _get_retry_after(error: BaseException) -> Optional[float]:
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
@@ -0,0 +1,289 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import AsyncGenerator, Dict, Iterator, List, Optional, Type
+from ai.common import AsyncCompletionStream, BaseChatResponse
+from ai.metrics import record_routing_decision, record_routing_savings
+from ai.prompts import BasePrompt
+from config import get_llm_speculative_prompts, get_llm_short_followup_chars
+from domain.dto.ai import CompletionChunk
+from . import BaseModel
+from .base_gpt import BaseGPT
+from .gpt_4o import GPT4o
+from .gpt_4o_mini import GPT4oMini
+
+logger = logging.getLogger("ModelRouter")
+
+# Phrases that suggest the smaller model was out of its depth, checked against the final message
+LOW_CONFIDENCE_PHRASES = [
+    "i'm not sure",
+    "i am not sure",
+    "i don't know",
+    "i do not know",
+    "i'm unable to",
+    "i am unable to",
+    "i cannot determine"
+]
+
+# Streamed answers from the smaller model are held back until this much text has been generated, so one which
+# opens by admitting it is out of its depth can still be escalated before the client has seen any of it
+STREAM_ESCALATION_WINDOW_CHARS = 160
+
+# Weight given to the newest sample of the larger model's latency
+LATENCY_SMOOTHING = 0.2
+
+_large_latency: Dict[str, float] = {}
+_large_latency_lock = threading.Lock()
+
+class SpeculativeModel(BaseModel):
+    """
+    Answers a prompt with the smaller model first, escalating to the larger model when the forced tool call
+    fails validation or the answer looks unusable. Async streams are held back for the first
+    STREAM_ESCALATION_WINDOW_CHARS of text, so only the opening of a streamed answer is checked; synchronous
+    streams always go to the larger model.
+    """
+    small: BaseGPT
+    large: BaseGPT
+
+    def __init__(self, small: BaseGPT, large: BaseGPT) -> None:
+        self.small = small
+        self.large = large
+
+    def _get_responses(self, prompt: BasePrompt) -> List[BaseChatResponse]:
+        prompt_name = type(prompt).__name__
+        started_at = time.perf_counter()
+        snapshot = self._take_snapshot(prompt)
+
+        try:
+            with corrections_disabled(prompt):
+                responses = self.small._get_responses(prompt)
+
+            if not self._should_escalate(prompt, responses):
+                self._record_small(prompt_name, started_at)
+                return responses
+        except Exception as e:
+            logger.warning(f"{prompt_name} failed on {self.small.model_name}, escalating: {e}")
+
+        self._restore_snapshot(prompt, snapshot)
+        escalated_at = time.perf_counter()
+        responses = self.large._get_responses(prompt)
+        self._record_escalation(prompt_name, started_at, escalated_at)
+
+        return responses
+
+    async def get_responses_async(self, prompt: BasePrompt) -> List[BaseChatResponse]:
+        prompt_name = type(prompt).__name__
+        started_at = time.perf_counter()
+        snapshot = self._take_snapshot(prompt)
+
+        try:
+            with corrections_disabled(prompt):
+                responses = await self.small.get_responses_async(prompt)
+
+            if not self._should_escalate(prompt, responses):
+                self._record_small(prompt_name, started_at)
+                return responses
+        except Exception as e:
+            logger.warning(f"{prompt_name} failed on {self.small.model_name}, escalating: {e}")
+
+        self._restore_snapshot(prompt, snapshot)
+        escalated_at = time.perf_counter()
+        responses = await self.large.get_responses_async(prompt)
+        self._record_escalation(prompt_name, started_at, escalated_at)
+
+        return responses
+
+    def get_streaming_response(self, prompt: BasePrompt):
+        return self.large.get_streaming_response(prompt)
+
+    def get_streaming_response_async(self, prompt: BasePrompt) -> AsyncCompletionStream:
+        responses: List[BaseChatResponse] = []
+
+        return AsyncCompletionStream(
+            generator=self._stream_speculatively(prompt, responses),
+            responses=responses
+        )
+
+    async def _stream_speculatively(
+        self,
+        prompt: BasePrompt,
+        responses: List[BaseChatResponse]
+    ) -> AsyncGenerator[CompletionChunk, None]:
+        prompt_name = type(prompt).__name__
+        started_at = time.perf_counter()
+        snapshot = self._take_snapshot(prompt)
+        stream = self.small.get_streaming_response_async(prompt)
+        iterator = stream.__aiter__()
+        held: List[CompletionChunk] = []
+        text = ""
+        is_finished = False
+
+        try:
+            while len(text) < STREAM_ESCALATION_WINDOW_CHARS:
+                try:
+                    chunk = await iterator.__anext__()
+                except StopAsyncIteration:
+                    is_finished = True
+                    break
+
+                held.append(chunk)
+                text += chunk.text or ""
+
+            is_unusable = (is_finished and not text and not any(chunk.tools for chunk in held)) or is_low_confidence(text)
+        except Exception as e:
+            logger.warning(f"{prompt_name} failed on {self.small.model_name}, escalating: {e}")
+            is_unusable = True
+
+        if not is_unusable:
+            try:
+                for chunk in held:
+                    yield chunk
+
+                if not is_finished:
+                    async for chunk in iterator:
+                        yield chunk
+            finally:
+                # Closes the request when the client stops reading part way through
+                await stream.aclose()
+
+            responses.extend(stream.responses)
+            self._record_small(prompt_name, started_at)
+            return
+
+        await stream.aclose()
+
+        self._restore_snapshot(prompt, snapshot)
+        escalated_at = time.perf_counter()
+        escalated = self.large.get_streaming_response_async(prompt)
+
+        try:
+            async for chunk in escalated:
+                yield chunk
+        finally:
+            await escalated.aclose()
+
+        responses.extend(escalated.responses)
+        self._record_escalation(prompt_name, started_at, escalated_at)
+
+    def get_cache_key(self, prompt: BasePrompt) -> str:
+        # Both models produce an answer to the same request, so it is cached under the larger model's key
+        return self.large.get_cache_key(prompt)
+
+    def _take_snapshot(self, prompt: BasePrompt) -> Dict[str, list]:
+        return {name: list(instances) for name, instances in prompt.tool_instances.items()}
+
+    def _restore_snapshot(self, prompt: BasePrompt, snapshot: Dict[str, list]) -> None:
+        # Tool calls made by the smaller model are discarded along with its answer
+        prompt.tool_instances = snapshot
+
+    def _should_escalate(self, prompt: BasePrompt, responses: List[BaseChatResponse]) -> bool:
+        if not responses:
+            return True
+
+        if prompt.forced_tool_name:
+            tool_type_name = prompt.get_tool_by_name(prompt.forced_tool_name).tool_type.__name__
+
+            return not prompt.tool_instances.get(tool_type_name)
+
+        final = responses[-1]
+
+        if not final.message and not final.tool_calls:
+            return True
+
+        return is_low_confidence(final.message or "")
+
+    def _record_small(self, prompt_name: str, started_at: float) -> None:
+        duration = time.perf_counter() - started_at
+        large_latency = _get_large_latency(prompt_name)
+
+        record_routing_decision(prompt_name, "small", duration)
+
+        if large_latency is not None:
+            record_routing_savings(prompt_name, large_latency - duration)
+
+    def _record_escalation(self, prompt_name: str, started_at: float, escalated_at: float) -> None:
+        finished_at = time.perf_counter()
+
+        logger.info(f"{prompt_name} escalated to {self.large.model_name} after {escalated_at - started_at:.2f}s")
+
+        _update_large_latency(prompt_name, finished_at - escalated_at)
+        record_routing_decision(prompt_name, "escalated", finished_at - started_at)
+        record_routing_savings(prompt_name, -(escalated_at - started_at))
+
+@contextmanager
+def corrections_disabled(prompt: BasePrompt) -> Iterator[None]:
+    """
+    Stops the model from being asked to correct invalid tool arguments, so they can be escalated instead
+    """
+    max_tool_corrections = prompt.max_tool_corrections
+    prompt.max_tool_corrections = 0
+
+    try:
+        yield
+    finally:
+        prompt.max_tool_corrections = max_tool_corrections
+
+def is_low_confidence(message: str) -> bool:
+    message = message.lower()
+
+    return any(phrase in message for phrase in LOW_CONFIDENCE_PHRASES)
+
+def is_speculative(prompt: BasePrompt) -> bool:
+    return type(prompt).__name__ in get_llm_speculative_prompts()
+
+def get_routed_model(prompt: BasePrompt, model_type: Type[BaseGPT] = GPT4o) -> BaseModel:
+    """
+    Gets the model to answer a prompt with, trying GPT-4o mini first for prompt classes configured for
+    speculative routing
+
+    Args:
+        prompt (BasePrompt): The prompt to answer
+        model_type (Type[BaseGPT]): The model used when the prompt class is not routed
+
+    Returns:
+        BaseModel: The model to use
+    """
+    if is_speculative(prompt):
+        return SpeculativeModel(GPT4oMini(), GPT4o())
+
+    return model_type()
+
+def get_streaming_model(prompt: BasePrompt, message: str, has_history: bool) -> BaseModel:
+    """
+    Chooses the model for a streamed answer. Short follow-ups within an ongoing conversation are tried on
+    GPT-4o mini for prompt classes configured for speculative routing, and escalated to GPT-4o when the
+    opening of its answer looks unusable.
+
+    Args:
+        prompt (BasePrompt): The prompt to answer
+        message (str): The user's latest message
+        has_history (bool): Whether the conversation has earlier turns
+
+    Returns:
+        BaseModel: The model to use
+    """
+    prompt_name = type(prompt).__name__
+
+    if not is_speculative(prompt):
+        return GPT4o()
+
+    # Code usually needs the larger model however short the question is
+    is_short_followup = has_history and len(message) <= get_llm_short_followup_chars() and "```" not in message
+
+    if is_short_followup:
+        # Records whether the smaller model's answer was used once it is known
+        return SpeculativeModel(GPT4oMini(), GPT4o())
+
+    record_routing_decision(prompt_name, "large")
+
+    return GPT4o()
+
+def _get_large_latency(prompt_name: str) -> Optional[float]:
+    with _large_latency_lock:
+        return _large_latency.get(prompt_name)
+
+def _update_large_latency(prompt_name: str, duration: float) -> None:
+    with _large_latency_lock:
+        previous = _large_latency.get(prompt_name)
+        _large_latency[prompt_name] = duration if previous is None else previous + LATENCY_SMOOTHING * (duration - previous)
@@ -0,0 +1,270 @@
+import asyncio
+import importlib.util
+import logging
+import threading
+import weakref
+from typing import Dict, Optional, Tuple
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
+from config import (
+    get_openai_key,
+    get_llm_backend,
+    get_llm_recording_path,
+    get_llm_replay_time_to_first_token_ms,
+    get_llm_replay_tokens_per_second,
+    get_llm_max_connections,
+    get_llm_max_keepalive_connections,
+    get_llm_keepalive_expiry_seconds,
+    is_llm_http2_enabled,
+    get_openai_credentials
+)
+from .credential_pool import Credential, CredentialPool
+from .replay import (
+    Recording,
+    ReplayOpenAI,
+    AsyncReplayOpenAI,
+    ReplayTiming,
+    RecordingOpenAI,
+    AsyncRecordingOpenAI
+)
+
+logger = logging.getLogger("OpenAIClients")
+
+ClientKey = Tuple[str, str]
+
+# Startup does not wait any longer than this for each connection to be established
+WARM_TIMEOUT_SECONDS = 5
+
+_recordings: Dict[str, Recording] = {}
+_recordings_lock = threading.Lock()
+
+# Clients are shared by every model instance in the process so requests reuse pooled, kept-alive connections
+_clients: Dict[ClientKey, OpenAI] = {}
+_clients_lock = threading.Lock()
+_api_client: Optional[OpenAI] = None
+_api_client_lock = threading.Lock()
+_credential_pool: Optional[CredentialPool] = None
+_credential_clients: Dict[str, OpenAI] = {}
+
+# An async connection pool belongs to the event loop it was first used on
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[ClientKey, AsyncOpenAI]]" = weakref.WeakKeyDictionary()
+_async_clients_without_loop: Dict[ClientKey, AsyncOpenAI] = {}
+
+def get_openai_client() -> OpenAI:
+    """
+    Gets the process-wide chat completions client for the configured LLM backend
+    """
+    key = _get_client_key()
+    client = _clients.get(key)
+
+    if client:
+        return client
+
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = _create_openai_client()
+
+        return _clients[key]
+
+def get_async_openai_client() -> AsyncOpenAI:
+    """
+    Gets the asynchronous chat completions client for the configured LLM backend, shared by everything
+    running on the current event loop
+    """
+    clients = _get_loop_async_clients()
+    key = _get_client_key()
+
+    if key not in clients:
+        clients[key] = _create_async_openai_client()
+
+    return clients[key]
+
+def get_openai_api_client() -> OpenAI:
+    """
+    Gets the process-wide OpenAI client for APIs other than chat completions, such as image generation.
+    This client always calls OpenAI, whatever the LLM backend.
+    """
+    global _api_client
+
+    if _api_client:
+        return _api_client
+
+    with _api_client_lock:
+        if _api_client is None:
+            _api_client = OpenAI(api_key=_get_default_api_key(), max_retries=0, http_client=_create_http_client())
+
+        return _api_client
+
+def get_credential_pool() -> Optional[CredentialPool]:
+    """
+    Gets the process-wide pool of OpenAI credentials, or None when the LLM backend does not call OpenAI directly
+    """
+    global _credential_pool
+
+    if get_llm_backend() != "openai":
+        return None
+
+    if _credential_pool:
+        return _credential_pool
+
+    with _clients_lock:
+        if _credential_pool is None:
+            _credential_pool = CredentialPool([
+                Credential(
+                    api_key=credential["key"],
+                    base_url=credential.get("base_url"),
+                    rpm_limit=int(credential.get("rpm", 0)),
+                    tpm_limit=int(credential.get("tpm", 0)),
+                    name=credential.get("name")
+                )
+                for credential in get_openai_credentials()
+            ])
+
+        return _credential_pool
+
+def get_credential_client(credential: Credential) -> OpenAI:
+    """
+    Gets the process-wide chat completions client for a credential from the pool
+    """
+    client = _credential_clients.get(credential.name)
+
+    if client:
+        return client
+
+    with _clients_lock:
+        if credential.name not in _credential_clients:
+            _credential_clients[credential.name] = OpenAI(
+                api_key=credential.api_key,
+                base_url=credential.base_url,
+                max_retries=0,
+                http_client=_create_http_client()
+            )
+
+        return _credential_clients[credential.name]
+
+def get_async_credential_client(credential: Credential) -> AsyncOpenAI:
+    """
+    Gets the asynchronous chat completions client for a credential from the pool, shared by everything running
+    on the current event loop
+    """
+    clients = _get_loop_async_clients()
+    key = ("credential", credential.name)
+
+    if key not in clients:
+        clients[key] = AsyncOpenAI(
+            api_key=credential.api_key,
+            base_url=credential.base_url,
+            max_retries=0,
+            http_client=_create_async_http_client()
+        )
+
+    return clients[key]
+
+async def warm_openai_clients() -> None:
+    """
+    Creates the shared clients and opens a connection to OpenAI with each of them, so the first prompt
+    after startup does not pay for the TLS handshake. Failures are logged and otherwise ignored.
+    """
+    if get_llm_backend() == "replay":
+        get_openai_client()
+        get_async_openai_client()
+        return
+
+    pool = get_credential_pool()
+    credentials = pool.credentials if pool else []
+
+    def warm_sync_clients() -> None:
+        for client in [get_openai_api_client(), *[get_credential_client(credential) for credential in credentials]]:
+            client.with_options(timeout=WARM_TIMEOUT_SECONDS).models.list()
+
+    try:
+        await asyncio.to_thread(warm_sync_clients)
+        await get_async_openai_client().with_options(timeout=WARM_TIMEOUT_SECONDS).models.list()
+
+        for credential in credentials:
+            await get_async_credential_client(credential).with_options(timeout=WARM_TIMEOUT_SECONDS).models.list()
+
+        logger.info("Warmed OpenAI client connections")
+    except Exception as e:
+        logger.warning(f"Failed to warm OpenAI client connections: {e}")
+
+def _create_openai_client() -> OpenAI:
+    backend = get_llm_backend()
+
+    if backend == "replay":
+        return ReplayOpenAI(_get_recording(), _get_replay_timing())
+
+    # Retries are handled per prompt by its RequestPolicy
+    client = get_openai_api_client()
+
+    if backend == "record":
+        return RecordingOpenAI(client, _get_recording(), get_llm_recording_path())
+
+    return client
+
+def _create_async_openai_client() -> AsyncOpenAI:
+    backend = get_llm_backend()
+
+    if backend == "replay":
+        return AsyncReplayOpenAI(_get_recording(), _get_replay_timing())
+
+    client = AsyncOpenAI(api_key=_get_default_api_key(), max_retries=0, http_client=_create_async_http_client())
+
+    if backend == "record":
+        return AsyncRecordingOpenAI(client, _get_recording(), get_llm_recording_path())
+
+    return client
+
+def _get_default_api_key() -> str:
+    # Deployments that only configure a credential pool use its first key for everything else
+    return get_openai_key() or get_openai_credentials()[0]["key"]
+
+def _get_loop_async_clients() -> Dict[ClientKey, AsyncOpenAI]:
+    try:
+        return _async_clients.setdefault(asyncio.get_running_loop(), {})
+    except RuntimeError:
+        return _async_clients_without_loop
+
+def _get_client_key() -> ClientKey:
+    # The backend can only change between tests and benchmark runs, which also switch recordings
+    return get_llm_backend(), get_llm_recording_path()
+
+def _get_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=get_llm_max_connections(),
+        max_keepalive_connections=get_llm_max_keepalive_connections(),
+        keepalive_expiry=get_llm_keepalive_expiry_seconds()
+    )
+
+def _is_http2_available() -> bool:
+    if not is_llm_http2_enabled():
+        return False
+
+    # httpx only supports HTTP/2 with its optional h2 dependency installed
+    if importlib.util.find_spec("h2") is None:
+        logger.warning("HTTP/2 is enabled for OpenAI requests but the h2 package is not installed, using HTTP/1.1")
+        return False
+
+    return True
+
+def _create_http_client() -> httpx.Client:
+    return DefaultHttpxClient(limits=_get_limits(), http2=_is_http2_available())
+
+def _create_async_http_client() -> httpx.AsyncClient:
+    return DefaultAsyncHttpxClient(limits=_get_limits(), http2=_is_http2_available())
+
+def _get_recording() -> Recording:
+    # Recordings are loaded once per path so round-robin positions are shared by every model instance
+    path = get_llm_recording_path()
+
+    with _recordings_lock:
+        if path not in _recordings:
+            _recordings[path] = Recording.load(path)
+
+        return _recordings[path]
+
+def _get_replay_timing() -> ReplayTiming:
+    return ReplayTiming(
+        time_to_first_token_ms=get_llm_replay_time_to_first_token_ms(),
+        tokens_per_second=get_llm_replay_tokens_per_second()
+    )
@@ -0,0 +1,87 @@
+import logging
+import threading
+from typing import Dict
+from openai.types import CompletionUsage
+
+logger = logging.getLogger("PromptUsage")
+
+class PromptUsage:
+    """
+    Token usage accumulated across every request made for a prompt class
+
+    Attributes:
+        requests (int): The number of requests which reported usage
+        prompt_tokens (int): Input tokens, including those served from the provider's prompt cache
+        cached_tokens (int): Input tokens that matched a previously seen prefix
+        completion_tokens (int): Output tokens
+    """
+    requests: int
+    prompt_tokens: int
+    cached_tokens: int
+    completion_tokens: int
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.completion_tokens = 0
+
+    @property
+    def cache_hit_rate(self) -> float:
+        if not self.prompt_tokens:
+            return 0
+
+        return self.cached_tokens / self.prompt_tokens
+
+    def to_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cache_hit_rate": self.cache_hit_rate
+        }
+
+_usage: Dict[str, PromptUsage] = {}
+_usage_lock = threading.Lock()
+
+def record_usage(prompt_name: str, usage: CompletionUsage) -> None:
+    """
+    Adds the usage reported for a single request to the totals for its prompt class
+
+    Args:
+        prompt_name (str): The name of the prompt class
+        usage (CompletionUsage): The usage from the final chunk of the completion stream
+    """
+    cached_tokens = 0
+
+    if usage.prompt_tokens_details and usage.prompt_tokens_details.cached_tokens:
+        cached_tokens = usage.prompt_tokens_details.cached_tokens
+
+    with _usage_lock:
+        totals = _usage.setdefault(prompt_name, PromptUsage())
+        totals.requests += 1
+        totals.prompt_tokens += usage.prompt_tokens
+        totals.cached_tokens += cached_tokens
+        totals.completion_tokens += usage.completion_tokens
+
+    logger.info(f"{prompt_name}: {usage.prompt_tokens} prompt tokens ({cached_tokens} cached), {usage.completion_tokens} completion tokens")
+
+def get_prompt_usage() -> Dict[str, PromptUsage]:
+    """
+    Gets a snapshot of the usage totals for each prompt class
+    """
+    with _usage_lock:
+        return {
+            prompt_name: _copy_usage(usage)
+            for prompt_name, usage in _usage.items()
+        }
+
+def _copy_usage(usage: PromptUsage) -> PromptUsage:
+    copy = PromptUsage()
+    copy.requests = usage.requests
+    copy.prompt_tokens = usage.prompt_tokens
+    copy.cached_tokens = usage.cached_tokens
+    copy.completion_tokens = usage.completion_tokens
+
+    return copy
@@ -0,0 +1,8 @@
+from .recording import (
+    Recording,
+    get_recording_key,
+    synthesize_text_exchange,
+    synthesize_tool_call_exchange
+)
+from .replay_client import ReplayOpenAI, AsyncReplayOpenAI, ReplayTiming
+from .recording_client import RecordingOpenAI, AsyncRecordingOpenAI
\ No newline at end of file
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+import threading
+import uuid
+from typing import Dict, List, Optional
+
+WILDCARD = "*"
+
+class Recording:
+    """
+    A set of recorded completion streams. Each exchange is the list of raw chunk payloads
+    returned by the chat completions API for a single request.
+
+    Exchanges are grouped by a key made of the forced tool name and a hash of the system prompt, so
+    the same recording can serve every instance of a prompt class. When a key has several exchanges
+    they are replayed in a round-robin order.
+    """
+    exchanges: Dict[str, List[List[dict]]]
+
+    def __init__(self, exchanges: Optional[Dict[str, List[List[dict]]]] = None) -> None:
+        self.exchanges = exchanges or {}
+        self._positions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def load(path: str) -> "Recording":
+        if not os.path.exists(path):
+            return Recording()
+
+        with open(path, "r") as f:
+            data = json.load(f)
+
+        return Recording(data.get("exchanges", {}))
+
+    def save(self, path: str) -> None:
+        with self._lock:
+            data = json.dumps({"exchanges": self.exchanges})
+
+        with open(path, "w") as f:
+            f.write(data)
+
+    def add_exchange(self, key: str, chunks: List[dict]) -> None:
+        with self._lock:
+            self.exchanges.setdefault(key, []).append(chunks)
+
+    def get_exchange(self, request_args: dict) -> List[dict]:
+        """
+        Finds the next recorded exchange for a chat completion request, falling back to
+        less specific keys when there is no exact match
+
+        Args:
+            request_args (dict): The arguments passed to chat.completions.create
+
+        Returns:
+            List[dict]: The raw chunk payloads to replay
+        """
+        tool_name, system_hash = get_exchange_key(request_args).split("|")
+
+        candidates = [
+            f"{tool_name}|{system_hash}",
+            f"{tool_name}|{WILDCARD}",
+            f"{WILDCARD}|{system_hash}",
+            f"{WILDCARD}|{WILDCARD}"
+        ]
+
+        with self._lock:
+            for key in candidates:
+                exchanges = self.exchanges.get(key)
+
+                if not exchanges:
+                    continue
+
+                position = self._positions.get(key, 0)
+                self._positions[key] = position + 1
+
+                return exchanges[position % len(exchanges)]
+
+        raise LookupError(f"No recorded exchange matches request (tool: {tool_name}, system prompt: {system_hash})")
+
+def get_exchange_key(request_args: dict) -> str:
+    """
+    Builds the recording key for a chat completion request
+    """
+    tool_choice = request_args.get("tool_choice")
+
+    if isinstance(tool_choice, dict):
+        tool_name = tool_choice["function"]["name"]
+    else:
+        tool_name = WILDCARD
+
+    system_prompt = next((
+        message["content"]
+        for message in request_args.get("messages", [])
+        if message["role"] == "system"
+    ), None)
+
+    return f"{tool_name}|{get_system_prompt_hash(system_prompt)}"
+
+def get_system_prompt_hash(system_prompt: Optional[str]) -> str:
+    if not system_prompt:
+        return WILDCARD
+
+    return hashlib.sha1(system_prompt.encode("utf-8")).hexdigest()[:16]
+
+def get_recording_key(tool_name: Optional[str] = None, system_prompt: Optional[str] = None) -> str:
+    """
+    Builds a key for hand-made recordings. Omitted parts match any request.
+    """
+    return f"{tool_name or WILDCARD}|{get_system_prompt_hash(system_prompt)}"
+
+def synthesize_text_exchange(text: str, chars_per_chunk: int = 4) -> List[dict]:
+    """
+    Creates a recorded exchange which streams the given text content
+    """
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+
+    chunks = [
+        _create_chunk(completion_id, {"role": "assistant", "content": text[i:i + chars_per_chunk]})
+        for i in range(0, len(text), chars_per_chunk)
+    ]
+
+    chunks.append(_create_chunk(completion_id, {}, finish_reason="stop"))
+
+    return chunks
+
+def synthesize_tool_call_exchange(tool_name: str, arguments: str, chars_per_chunk: int = 4) -> List[dict]:
+    """
+    Creates a recorded exchange which streams a single tool call, with the arguments split into deltas
+    """
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+
+    chunks = [
+        _create_chunk(completion_id, {
+            "role": "assistant",
+            "tool_calls": [{
+                "index": 0,
+                "id": f"call_{uuid.uuid4().hex[:24]}",
+                "type": "function",
+                "function": {"name": tool_name, "arguments": ""}
+            }]
+        })
+    ]
+
+    chunks.extend(
+        _create_chunk(completion_id, {
+            "tool_calls": [{
+                "index": 0,
+                "function": {"arguments": arguments[i:i + chars_per_chunk]}
+            }]
+        })
+        for i in range(0, len(arguments), chars_per_chunk)
+    )
+
+    chunks.append(_create_chunk(completion_id, {}, finish_reason="tool_calls"))
+
+    return chunks
+
+def _create_chunk(completion_id: str, delta: dict, finish_reason: Optional[str] = None) -> dict:
+    return {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": "replay",
+        "choices": [{
+            "index": 0,
+            "delta": delta,
+            "finish_reason": finish_reason
+        }]
+    }
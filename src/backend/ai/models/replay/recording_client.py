@@ -0,0 +1,69 @@
+import logging
+from typing import AsyncIterator, Iterator, List
+from openai import AsyncOpenAI, OpenAI
+from openai.types.chat import ChatCompletionChunk
+from .recording import Recording, get_exchange_key
+
+logger = logging.getLogger("RecordingClient")
+
+class _RecordingCompletions:
+    def __init__(self, client: OpenAI, recording: Recording, path: str) -> None:
+        self.client = client
+        self.recording = recording
+        self.path = path
+
+    def create(self, **kwargs) -> Iterator[ChatCompletionChunk]:
+        key = get_exchange_key(kwargs)
+        stream = self.client.chat.completions.create(**kwargs)
+        chunks: List[dict] = []
+
+        for chunk in stream:
+            chunks.append(chunk.model_dump(exclude_none=True))
+            yield chunk
+
+        self.recording.add_exchange(key, chunks)
+        self.recording.save(self.path)
+
+        logger.info(f"Recorded exchange {key} ({len(chunks)} chunks)")
+
+class _AsyncRecordingCompletions:
+    def __init__(self, client: AsyncOpenAI, recording: Recording, path: str) -> None:
+        self.client = client
+        self.recording = recording
+        self.path = path
+
+    async def create(self, **kwargs) -> AsyncIterator[ChatCompletionChunk]:
+        key = get_exchange_key(kwargs)
+        stream = await self.client.chat.completions.create(**kwargs)
+
+        async def record():
+            chunks: List[dict] = []
+
+            async for chunk in stream:
+                chunks.append(chunk.model_dump(exclude_none=True))
+                yield chunk
+
+            self.recording.add_exchange(key, chunks)
+            self.recording.save(self.path)
+
+            logger.info(f"Recorded exchange {key} ({len(chunks)} chunks)")
+
+        return record()
+
+class _Chat:
+    def __init__(self, completions) -> None:
+        self.completions = completions
+
+class RecordingOpenAI:
+    """
+    Wraps an OpenAI client, passing requests through and saving every streamed completion to a recording
+    """
+    def __init__(self, client: OpenAI, recording: Recording, path: str) -> None:
+        self.chat = _Chat(_RecordingCompletions(client, recording, path))
+
+class AsyncRecordingOpenAI:
+    """
+    Wraps an AsyncOpenAI client, passing requests through and saving every streamed completion to a recording
+    """
+    def __init__(self, client: AsyncOpenAI, recording: Recording, path: str) -> None:
+        self.chat = _Chat(_AsyncRecordingCompletions(client, recording, path))
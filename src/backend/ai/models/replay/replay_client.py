@@ -0,0 +1,184 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from typing import AsyncIterator, Iterator, List, Set
+from openai.types.chat import ChatCompletionChunk
+from ai.util import estimate_tokens
+from .recording import Recording
+
+class ReplayTiming:
+    """
+    Controls how fast recorded streams are replayed
+
+    Attributes:
+        time_to_first_token_ms (int): Delay before the first chunk is produced
+        tokens_per_second (float): Rate at which the remaining chunks are produced, 0 for no throttling
+    """
+    time_to_first_token_ms: int
+    tokens_per_second: float
+
+    def __init__(self, time_to_first_token_ms: int = 0, tokens_per_second: float = 0) -> None:
+        self.time_to_first_token_ms = time_to_first_token_ms
+        self.tokens_per_second = tokens_per_second
+
+    def get_delay(self, index: int) -> float:
+        if index == 0:
+            return self.time_to_first_token_ms / 1000
+
+        if self.tokens_per_second <= 0:
+            return 0
+
+        return 1 / self.tokens_per_second
+
+class PrefixCache:
+    """
+    Approximates the provider's prompt caching so replayed usage reports cached tokens. Requests are cached
+    at message boundaries, and only prefixes of at least 1024 tokens count, in 128 token increments.
+    """
+    MIN_CACHED_TOKENS = 1024
+    CACHE_INCREMENT = 128
+
+    def __init__(self) -> None:
+        self._prefixes: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def get_cached_tokens(self, request_args: dict) -> int:
+        prefix = hashlib.sha256()
+        prefix.update(json.dumps(request_args.get("tools", []), sort_keys=True, default=str).encode("utf-8"))
+
+        tokens = 0
+        cached_tokens = 0
+
+        with self._lock:
+            for message in request_args.get("messages", []):
+                serialized = json.dumps(message, sort_keys=True, default=str)
+                prefix.update(serialized.encode("utf-8"))
+                tokens += estimate_tokens(serialized)
+                digest = prefix.hexdigest()
+
+                if digest in self._prefixes:
+                    cached_tokens = tokens
+                else:
+                    self._prefixes.add(digest)
+
+        if cached_tokens < self.MIN_CACHED_TOKENS:
+            return 0
+
+        return cached_tokens - cached_tokens % self.CACHE_INCREMENT
+
+_prefix_cache = PrefixCache()
+
+def get_replay_chunks(recording: Recording, request_args: dict) -> List[dict]:
+    """
+    Finds the recorded chunks for a request, adding a usage chunk when the request asks for usage and the
+    recording does not include one
+    """
+    chunks = recording.get_exchange(request_args)
+    include_usage = (request_args.get("stream_options") or {}).get("include_usage")
+
+    if not include_usage or any(chunk.get("usage") for chunk in chunks):
+        return chunks
+
+    prompt_tokens = estimate_tokens(json.dumps(request_args.get("messages", []), default=str))
+    completion_tokens = sum(
+        estimate_tokens(json.dumps(choice.get("delta", {})))
+        for chunk in chunks
+        for choice in chunk.get("choices", [])
+    )
+
+    return [
+        *chunks,
+        {
+            "id": chunks[-1]["id"] if chunks else "",
+            "object": "chat.completion.chunk",
+            "created": 0,
+            "model": "replay",
+            "choices": [],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens_details": {
+                    "cached_tokens": min(_prefix_cache.get_cached_tokens(request_args), prompt_tokens)
+                }
+            }
+        }
+    ]
+
+class ReplayStream:
+    def __init__(self, chunks: List[dict], timing: ReplayTiming) -> None:
+        self.chunks = chunks
+        self.timing = timing
+        self.closed = False
+
+    def __iter__(self) -> Iterator[ChatCompletionChunk]:
+        for index, chunk in enumerate(self.chunks):
+            if self.closed:
+                return
+
+            delay = self.timing.get_delay(index)
+
+            if delay:
+                time.sleep(delay)
+
+            yield ChatCompletionChunk.model_validate(chunk)
+
+    def close(self) -> None:
+        self.closed = True
+
+class AsyncReplayStream:
+    def __init__(self, chunks: List[dict], timing: ReplayTiming) -> None:
+        self.chunks = chunks
+        self.timing = timing
+        self.closed = False
+
+    async def __aiter__(self) -> AsyncIterator[ChatCompletionChunk]:
+        for index, chunk in enumerate(self.chunks):
+            if self.closed:
+                return
+
+            delay = self.timing.get_delay(index)
+
+            if delay:
+                await asyncio.sleep(delay)
+
+            yield ChatCompletionChunk.model_validate(chunk)
+
+    async def close(self) -> None:
+        self.closed = True
+
+class _ReplayCompletions:
+    def __init__(self, recording: Recording, timing: ReplayTiming) -> None:
+        self.recording = recording
+        self.timing = timing
+
+    def create(self, **kwargs) -> ReplayStream:
+        return ReplayStream(get_replay_chunks(self.recording, kwargs), self.timing)
+
+class _AsyncReplayCompletions:
+    def __init__(self, recording: Recording, timing: ReplayTiming) -> None:
+        self.recording = recording
+        self.timing = timing
+
+    async def create(self, **kwargs) -> AsyncReplayStream:
+        return AsyncReplayStream(get_replay_chunks(self.recording, kwargs), self.timing)
+
+class _Chat:
+    def __init__(self, completions) -> None:
+        self.completions = completions
+
+class ReplayOpenAI:
+    """
+    A stand-in for the OpenAI client which serves streamed chat completions from a recording
+    """
+    def __init__(self, recording: Recording, timing: ReplayTiming) -> None:
+        self.chat = _Chat(_ReplayCompletions(recording, timing))
+
+class AsyncReplayOpenAI:
+    """
+    A stand-in for the AsyncOpenAI client which serves streamed chat completions from a recording
+    """
+    def __init__(self, recording: Recording, timing: ReplayTiming) -> None:
+        self.chat = _Chat(_AsyncReplayCompletions(recording, timing))
@@ -0,0 +1,305 @@
+import asyncio
+import inspect
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, List, Optional
+import httpx
+import openai
+from ai.common.request_policy import RequestPolicy
+
+logger = logging.getLogger("ResilientStream")
+
+class FirstTokenTimeoutError(TimeoutError):
+    pass
+
+class DeadlineExceededError(TimeoutError):
+    pass
+
+# Failures worth another attempt, provided nothing has been streamed to the caller yet
+TRANSIENT_ERRORS = (
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+    httpx.TransportError,
+    FirstTokenTimeoutError
+)
+
+class Deadline:
+    def __init__(self, seconds: Optional[float]) -> None:
+        self.expires_at = time.monotonic() + seconds if seconds is not None else None
+
+    def remaining(self) -> Optional[float]:
+        if self.expires_at is None:
+            return None
+
+        return max(0, self.expires_at - time.monotonic())
+
+    def check(self) -> None:
+        if self.expires_at is not None and time.monotonic() >= self.expires_at:
+            raise DeadlineExceededError("The request did not complete before its deadline")
+
+class OpenedStream:
+    """
+    A completion stream whose first chunk has already been read
+
+    Attributes:
+        stream (Any): The underlying stream, used to close it
+        chunks (Any): An iterator (or async iterator) over the chunks after the first
+        first_chunk (Optional[Any]): The first chunk, or None when the stream was empty
+    """
+    def __init__(self, stream: Any, chunks: Any, first_chunk: Optional[Any]) -> None:
+        self.stream = stream
+        self.chunks = chunks
+        self.first_chunk = first_chunk
+
+_hedge_executor: Optional[ThreadPoolExecutor] = None
+_hedge_executor_lock = threading.Lock()
+
+def open_stream(
+    create: Callable[[], Any],
+    policy: RequestPolicy,
+    deadline: Deadline
+) -> OpenedStream:
+    """
+    Sends a streaming request and waits for its first chunk, applying the policy's first token
+    timeout, hedging and retries
+
+    Args:
+        create (Callable[[], Any]): Sends the request and returns the stream
+        policy (RequestPolicy): The prompt's request policy
+        deadline (Deadline): The prompt's overall deadline
+
+    Returns:
+        OpenedStream: The stream which produced a chunk first
+    """
+    attempt = 0
+
+    while True:
+        try:
+            return _open_hedged(create, policy, deadline)
+        except TRANSIENT_ERRORS as e:
+            attempt += 1
+            delay = _get_retry_delay(policy, deadline, attempt, e)
+
+            if delay is None:
+                raise
+
+            time.sleep(delay)
+
+async def open_stream_async(
+    create: Callable[[], Awaitable[Any]],
+    policy: RequestPolicy,
+    deadline: Deadline
+) -> OpenedStream:
+    """
+    Async counterpart of open_stream
+    """
+    attempt = 0
+
+    while True:
+        try:
+            return await _open_hedged_async(create, policy, deadline)
+        except TRANSIENT_ERRORS as e:
+            attempt += 1
+            delay = _get_retry_delay(policy, deadline, attempt, e)
+
+            if delay is None:
+                raise
+
+            await asyncio.sleep(delay)
+
+def close_stream(stream: Any) -> None:
+    close = getattr(stream, "close", None)
+
+    try:
+        if close:
+            close()
+    except Exception as e:
+        logger.warning(f"Failed to close stream: {e}")
+
+async def close_stream_async(stream: Any) -> None:
+    close = getattr(stream, "close", None) or getattr(stream, "aclose", None)
+
+    try:
+        if close:
+            result = close()
+
+            if inspect.isawaitable(result):
+                await result
+    except Exception as e:
+        logger.warning(f"Failed to close stream: {e}")
+
+def _get_retry_delay(policy: RequestPolicy, deadline: Deadline, attempt: int, error: Exception) -> Optional[float]:
+    if attempt > policy.max_retries:
+        return None
+
+    delay = policy.get_backoff_seconds(attempt)
+    remaining = deadline.remaining()
+
+    if remaining is not None and delay >= remaining:
+        return None
+
+    logger.warning(f"Retrying request in {delay:.2f}s after attempt {attempt} failed: {error}")
+
+    return delay
+
+def _get_first_token_timeout(policy: RequestPolicy, deadline: Deadline) -> Optional[float]:
+    timeouts = [
+        timeout
+        for timeout in [policy.first_token_timeout_seconds, deadline.remaining()]
+        if timeout is not None
+    ]
+
+    return min(timeouts) if timeouts else None
+
+def _start(create: Callable[[], Any]) -> OpenedStream:
+    stream = create()
+    chunks = iter(stream)
+
+    try:
+        first_chunk = next(chunks, None)
+    except BaseException:
+        close_stream(stream)
+        raise
+
+    return OpenedStream(stream, chunks, first_chunk)
+
+async def _start_async(create: Callable[[], Awaitable[Any]]) -> OpenedStream:
+    stream = await create()
+    chunks = stream.__aiter__()
+
+    try:
+        first_chunk = await chunks.__anext__()
+    except StopAsyncIteration:
+        first_chunk = None
+    except BaseException:
+        await close_stream_async(stream)
+        raise
+
+    return OpenedStream(stream, chunks, first_chunk)
+
+def _get_hedge_executor() -> ThreadPoolExecutor:
+    global _hedge_executor
+
+    if _hedge_executor is None:
+        with _hedge_executor_lock:
+            if _hedge_executor is None:
+                _hedge_executor = ThreadPoolExecutor(thread_name_prefix="llm-stream")
+
+    return _hedge_executor
+
+def _abandon(future: Future) -> None:
+    # Streams that open after losing the race are closed as soon as they are available
+    if future.cancel():
+        return
+
+    def close_when_done(done: Future) -> None:
+        if not done.cancelled() and done.exception() is None:
+            close_stream(done.result().stream)
+
+    future.add_done_callback(close_when_done)
+
+def _open_hedged(
+    create: Callable[[], Any],
+    policy: RequestPolicy,
+    deadline: Deadline
+) -> OpenedStream:
+    timeout = _get_first_token_timeout(policy, deadline)
+
+    # Without a timeout or hedging there is nothing to wait on, so read the first chunk on this thread
+    if timeout is None and policy.hedge_after_seconds is None:
+        return _start(create)
+
+    executor = _get_hedge_executor()
+    started_at = time.monotonic()
+    pending: List[Future] = [executor.submit(_start, create)]
+    hedged = policy.hedge_after_seconds is None
+
+    while pending:
+        elapsed = time.monotonic() - started_at
+        wait_seconds = timeout - elapsed if timeout is not None else None
+
+        if not hedged:
+            hedge_in = policy.hedge_after_seconds - elapsed
+            wait_seconds = hedge_in if wait_seconds is None else min(wait_seconds, hedge_in)
+
+        done, _ = wait(pending, timeout=max(0, wait_seconds) if wait_seconds is not None else None, return_when=FIRST_COMPLETED)
+
+        for future in done:
+            pending.remove(future)
+
+            if future.exception() is None:
+                for other in pending:
+                    _abandon(other)
+
+                return future.result()
+
+            # Let the hedged request finish, otherwise hand the failure to the retry loop
+            if not pending:
+                raise future.exception()
+
+        elapsed = time.monotonic() - started_at
+
+        if timeout is not None and elapsed >= timeout:
+            break
+
+        if not hedged and elapsed >= policy.hedge_after_seconds:
+            logger.info(f"No first token after {elapsed:.2f}s, sending a hedged request")
+            pending.append(executor.submit(_start, create))
+            hedged = True
+
+    for future in pending:
+        _abandon(future)
+
+    raise FirstTokenTimeoutError(f"No first token within {timeout:.2f}s")
+
+async def _open_hedged_async(
+    create: Callable[[], Awaitable[Any]],
+    policy: RequestPolicy,
+    deadline: Deadline
+) -> OpenedStream:
+    timeout = _get_first_token_timeout(policy, deadline)
+    loop = asyncio.get_running_loop()
+    started_at = loop.time()
+    pending: List[asyncio.Task] = [asyncio.ensure_future(_start_async(create))]
+    hedged = policy.hedge_after_seconds is None
+
+    try:
+        while pending:
+            elapsed = loop.time() - started_at
+            wait_seconds = timeout - elapsed if timeout is not None else None
+
+            if not hedged:
+                hedge_in = policy.hedge_after_seconds - elapsed
+                wait_seconds = hedge_in if wait_seconds is None else min(wait_seconds, hedge_in)
+
+            done, _ = await asyncio.wait(pending, timeout=max(0, wait_seconds) if wait_seconds is not None else None, return_when=asyncio.FIRST_COMPLETED)
+
+            for task in done:
+                pending.remove(task)
+
+                if task.exception() is None:
+                    return task.result()
+
+                if not pending:
+                    raise task.exception()
+
+            elapsed = loop.time() - started_at
+
+            if timeout is not None and elapsed >= timeout:
+                raise FirstTokenTimeoutError(f"No first token within {timeout:.2f}s")
+
+            if not hedged and elapsed >= policy.hedge_after_seconds:
+                logger.info(f"No first token after {elapsed:.2f}s, sending a hedged request")
+                pending.append(asyncio.ensure_future(_start_async(create)))
+                hedged = True
+    finally:
+        # Cancels requests which lost the race, and closes any that opened in the meantime
+        for task in pending:
+            task.cancel()
+
+        for result in await asyncio.gather(*pending, return_exceptions=True):
+            if isinstance(result, OpenedStream):
+                await close_stream_async(result.stream)
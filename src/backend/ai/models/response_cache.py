@@ -0,0 +1,164 @@
+import json
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple
+from ai.common import BaseChatResponse, BaseToolCallWithResult
+from common.cache import get_key, set_key, set_key_if_not_exists, delete_key
+
+logger = logging.getLogger("ResponseCache")
+
+CACHE_KEY_PREFIX = "llm-response:"
+LOCK_KEY_PREFIX = "llm-response-lock:"
+
+# How long another process may hold the computation lock for a key before it is considered abandoned
+LOCK_TIMEOUT_SECONDS = 60
+LOCK_POLL_INTERVAL_SECONDS = 0.1
+
+_in_flight: Dict[str, Future] = {}
+_in_flight_lock = threading.Lock()
+
+def get_cached_responses(
+    key: str,
+    ttl_seconds: int,
+    compute: Callable[[], List[BaseChatResponse]]
+) -> Tuple[List[BaseChatResponse], bool]:
+    """
+    Returns the responses stored for a request, computing and storing them when they are not cached.
+    Identical requests that arrive while a computation is running wait for its result rather than
+    calling the model themselves, both within this process and across processes sharing the cache.
+
+    Args:
+        key (str): A content hash of the request
+        ttl_seconds (int): How long the responses are kept for
+        compute (Callable[[], List[BaseChatResponse]]): Performs the request against the model
+
+    Returns:
+        Tuple[List[BaseChatResponse], bool]: The responses, and whether they were produced by another request
+    """
+    with _in_flight_lock:
+        future = _in_flight.get(key)
+        is_leader = future is None
+
+        if is_leader:
+            future = Future()
+            _in_flight[key] = future
+
+    if not is_leader:
+        logger.info(f"Waiting on in-flight request for {key}")
+        return deserialize_responses(future.result()), True
+
+    try:
+        payload, responses = _get_or_compute(key, ttl_seconds, compute)
+        future.set_result(payload)
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _in_flight_lock:
+            _in_flight.pop(key, None)
+
+    if responses is None:
+        return deserialize_responses(payload), True
+
+    return responses, False
+
+def _get_or_compute(
+    key: str,
+    ttl_seconds: int,
+    compute: Callable[[], List[BaseChatResponse]]
+) -> Tuple[str, Optional[List[BaseChatResponse]]]:
+    cache_key = CACHE_KEY_PREFIX + key
+    lock_key = LOCK_KEY_PREFIX + key
+    lock_token = uuid.uuid4().hex
+
+    try:
+        payload = _wait_for_payload(cache_key, lock_key, lock_token)
+    except Exception as e:
+        # The cache is an optimization, fall through to the model if Redis is unavailable
+        logger.warning(f"Response cache unavailable, computing directly: {e}")
+        responses = compute()
+
+        return serialize_responses(responses), responses
+
+    if payload is not None:
+        logger.info(f"Response cache hit for {key}")
+        return payload, None
+
+    try:
+        responses = compute()
+        payload = serialize_responses(responses)
+
+        try:
+            set_key(cache_key, payload, ttl_seconds)
+        except Exception as e:
+            logger.warning(f"Failed to store cached response for {key}: {e}")
+
+        return payload, responses
+    finally:
+        _release_lock(lock_key, lock_token)
+
+def _wait_for_payload(cache_key: str, lock_key: str, lock_token: str) -> Optional[str]:
+    """
+    Returns the cached payload, or None once this process holds the lock to compute it
+    """
+    deadline = time.monotonic() + LOCK_TIMEOUT_SECONDS
+
+    while True:
+        payload = get_key(cache_key)
+
+        if payload is not None:
+            return payload.decode("utf-8") if isinstance(payload, bytes) else payload
+
+        if set_key_if_not_exists(lock_key, lock_token, LOCK_TIMEOUT_SECONDS):
+            return None
+
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Timed out waiting on {lock_key}")
+
+        time.sleep(LOCK_POLL_INTERVAL_SECONDS)
+
+def _release_lock(lock_key: str, lock_token: str) -> None:
+    try:
+        owner = get_key(lock_key)
+
+        if owner is not None and (owner.decode("utf-8") if isinstance(owner, bytes) else owner) == lock_token:
+            delete_key(lock_key)
+    except Exception as e:
+        logger.warning(f"Failed to release {lock_key}: {e}")
+
+def serialize_responses(responses: List[BaseChatResponse]) -> str:
+    return json.dumps([
+        {
+            "message": response.message,
+            "tool_calls": [
+                {
+                    "id": tool_call.id,
+                    "name": tool_call.name,
+                    "arguments": tool_call.arguments,
+                    "result": tool_call.result
+                }
+                for tool_call in response.tool_calls
+            ]
+        }
+        for response in responses
+    ])
+
+def deserialize_responses(payload: str) -> List[BaseChatResponse]:
+    return [
+        BaseChatResponse(
+            message=response["message"],
+            tool_calls=[
+                BaseToolCallWithResult(
+                    id=tool_call["id"],
+                    name=tool_call["name"],
+                    arguments=tool_call["arguments"],
+                    result=tool_call["result"]
+                )
+                for tool_call in response["tool_calls"]
+            ]
+        )
+        for response in json.loads(payload)
+    ]
@@ -0,0 +1,24 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from config import get_tool_executor_max_workers
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def get_tool_executor() -> ThreadPoolExecutor:
+    """
+    Gets the process-wide pool that concurrent tool calls run on. The pool is bounded so a burst of
+    turns which fan out to many tools cannot exhaust threads.
+    """
+    global _executor
+
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=get_tool_executor_max_workers(),
+                    thread_name_prefix="tool"
+                )
+
+    return _executor
@@ -4,4 +4,5 @@ from .resume_scan import ResumeScannerPrompt
 from .assertion import AssertionPrompt
 from .course_planning import GetAdditionalInputsPrompt
 from .course_generation import GenerateCourseOutlinePrompt, GenerateModuleContentPrompt
-from .lesson_discussion import LessonDiscussionPrompt
\ No newline at end of file
+from .lesson_discussion import LessonDiscussionPrompt
+from .conversation_summary import ConversationSummaryPrompt
\ No newline at end of file
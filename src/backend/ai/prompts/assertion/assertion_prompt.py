@@ -11,6 +11,7 @@ You will determine whether or not the given statement is true or false.
 You will be objective and sound in your decision and will not consider unreasonable or irrelevant factors.""")
         
         self.use_tool(ProvideAssertionTool, force=True)
+        self.use_response_cache(ttl_seconds=60 * 60 * 24)
         
     def get_assertion(self, statement: str) -> Tuple[bool, str]:
         """
@@ -1,6 +1,7 @@
-from ai.common import BaseTool
+from ai.common import BaseTool, concurrent_tool
 from .models import AssertionResult
 
+@concurrent_tool()
 class ProvideAssertionTool(BaseTool):
     result: AssertionResult
     
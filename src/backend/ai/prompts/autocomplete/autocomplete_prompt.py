@@ -1,6 +1,8 @@
-from typing import List
+from typing import Generator, List, Optional
 from .provide_options_tool import ProvideOptionsTool
 from ai.prompts import BasePrompt
+from ai.common import RequestPolicy
+from ai.util import IncrementalJsonParser
 
 class AutocompletePrompt(BasePrompt):
     def setup(self) -> None:
@@ -12,15 +14,83 @@ If there is an exact match, you will make sure you provide it as the first optio
 """)
         
         self.use_tool(ProvideOptionsTool, force=True)
+        self.use_tool_deltas()
+        self.use_response_cache(ttl_seconds=60 * 60 * 24)
         
-    def get_options(self) -> List[str]:
+        # Suggestions are only useful while the user is typing, so give up quickly and hedge slow requests
+        self.use_request_policy(RequestPolicy(
+            deadline_seconds=8,
+            first_token_timeout_seconds=3,
+            max_retries=1,
+            backoff_base_seconds=0.2,
+            hedge_after_seconds=1.5
+        ))
+        
+    def get_options(self, max_options: Optional[int] = None) -> List[str]:
+        """
+        Gets the autocompletion options for the query
+
+        Args:
+            max_options (Optional[int]): When set, returns as soon as this many options have been generated
+                instead of waiting for the model to finish. Streamed options are not read from or written to
+                the response cache, and are not validated before they are returned.
+
+        Returns:
+            List[str]: The options
+        """
         from ...models.gpt_4o_mini import GPT4oMini
         
+        if max_options is not None:
+            return list(self.stream_options(max_options))
+        
         model = GPT4oMini()
         model.get_responses(self)
         call = self.get_tool_call(ProvideOptionsTool)
         
-        if not call.result:
+        if not call or not call.result:
             return []
         
-        return call.result.options
\ No newline at end of file
+        return call.result.options
+    
+    def stream_options(self, max_options: Optional[int] = None) -> Generator[str, None, None]:
+        """
+        Yields each option as soon as the model has finished writing it. The upstream request is closed
+        once max_options have been yielded.
+
+        Args:
+            max_options (Optional[int]): The most options to yield
+
+        Yields:
+            str: The next option
+        """
+        from ...models.gpt_4o_mini import GPT4oMini
+        
+        if max_options is not None and max_options <= 0:
+            return
+        
+        parser = IncrementalJsonParser()
+        stream = GPT4oMini().get_streaming_response(self)
+        seen = set()
+        
+        try:
+            for chunk in stream:
+                for tool in chunk.tools:
+                    if tool.name != "provide_options":
+                        continue
+                    
+                    # The model is asked to call the tool again when its arguments are invalid
+                    if tool.offset == 0:
+                        parser = IncrementalJsonParser()
+                    
+                    for path, value in parser.feed(tool.data):
+                        if len(path) != 2 or path[0] != "options" or not isinstance(value, str) or value in seen:
+                            continue
+                        
+                        seen.add(value)
+                        yield value
+                        
+                        if max_options is not None and len(seen) >= max_options:
+                            return
+        finally:
+            # Stops the model from generating options nobody will see
+            stream.close()
\ No newline at end of file
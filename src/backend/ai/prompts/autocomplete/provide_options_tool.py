@@ -1,11 +1,13 @@
 from typing import List
 
 from pydantic import BaseModel
-from ai.common import BaseTool
+from ai.common import BaseTool, public_tool, concurrent_tool
 
 class ResultObject(BaseModel):
     options: List[str]
 
+@public_tool()
+@concurrent_tool()
 class ProvideOptionsTool(BaseTool):
     result: ResultObject
     
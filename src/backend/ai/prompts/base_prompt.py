@@ -1,29 +1,70 @@
+import asyncio
+import copy
 import json
 import logging
-from typing import Dict, List, Optional, Type, TypeVar, cast, get_type_hints
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Coroutine, Dict, List, Optional, Tuple, Type, TypeVar
 
-from pydantic import BaseModel
 from pydantic_core import ValidationError
-from ai.common import BaseChatMessage, BaseTool, ChatRole, BaseToolCallWithResult
+from ai.metrics import record_tool_argument_repair
+from ai.util import repair_validation_errors
+from ai.common import BaseChatMessage, BaseTool, ChatRole, ImageDetail, BaseToolCallWithResult, RegisteredTool, RequestPolicy, Priority, DEFAULT_REQUEST_POLICY, get_registered_tool
 
 T = TypeVar('T', bound='BaseTool')
+R = TypeVar('R')
+
+_coroutine_executor: Optional[ThreadPoolExecutor] = None
+_coroutine_executor_lock = threading.Lock()
+
+def run_coroutine(coroutine: Coroutine[Any, Any, R]) -> R:
+    """
+    Runs a coroutine to completion from synchronous code. asyncio.run cannot be called from a thread
+    whose event loop is running, so the coroutine is then run on a shared worker thread with a loop of its own.
+    This blocks the calling loop until the coroutine finishes, so code running on a loop should use
+    BasePrompt.execute_tool_async instead.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+
+    logging.warning("Running a coroutine tool synchronously from a running event loop")
+
+    return _get_coroutine_executor().submit(asyncio.run, coroutine).result()
+
+def _get_coroutine_executor() -> ThreadPoolExecutor:
+    global _coroutine_executor
+
+    if _coroutine_executor is None:
+        with _coroutine_executor_lock:
+            if _coroutine_executor is None:
+                _coroutine_executor = ThreadPoolExecutor(thread_name_prefix="tool-loop")
+
+    return _coroutine_executor
 
 class BasePrompt:
     system_prompt: str
+    static_messages: List[BaseChatMessage]
     messages: List[BaseChatMessage]
     tools: List[BaseTool]
-    tool_types: Dict[str, Type[BaseTool]]
-    tool_result_types: Dict[str, Type]
+    registered_tools: Dict[str, RegisteredTool]
     tool_instances: Dict[str, List[BaseTool]]
     forced_tool_name: Optional[str] = None
     tool_choice_filter: Optional[list[str]] = None
-     
+    tools_enabled: bool = True
+    stream_tool_deltas: bool = False
+    response_cache_ttl: Optional[int] = None
+    max_tool_corrections: Optional[int] = None
+    request_policy: RequestPolicy = DEFAULT_REQUEST_POLICY
+    priority: Priority = "interactive"
+
     def __init__(self) -> None:
         self.system_prompt = None
+        self.static_messages = []
         self.messages = []
         self.tools = []
-        self.tool_types = {}
-        self.tool_result_types = {}
+        self.registered_tools = {}
         self.tool_instances = {}
         
         self.setup()
@@ -34,52 +75,129 @@ class BasePrompt:
     def set_system_prompt(self, system_prompt: str) -> None:
         self.system_prompt = system_prompt
         
-    def use_tool(self, tool_type: Type[BaseTool], force: Optional[bool] = False) -> None:
-        inst = tool_type()
-        self.tools.append(inst)
-        self.tool_types[inst.name] = tool_type
-        self.tool_instances[tool_type.__name__] = []
-        
-        # Get the Type annotation of the tool's "result" property
-        result_type = get_type_hints(tool_type).get("result")
+    def use_tool_deltas(self) -> None:
+        """
+        Streams public tool calls as argument fragments with their offset, rather than resending
+        the full accumulated arguments with every chunk
+        """
+        self.stream_tool_deltas = True
 
-        if not result_type:
-            raise ValueError(f"Tool {tool_type.__name__} does not have a 'result' property defined with a type hint")
+    def use_response_cache(self, ttl_seconds: int) -> None:
+        """
+        Caches the model's responses to this prompt in Redis, keyed by a hash of the request, so identical
+        requests are answered without a round trip. Concurrent identical requests share a single call.
+        Only applies to BaseModel.get_responses.
+
+        Args:
+            ttl_seconds (int): How long responses are kept for
+        """
+        self.response_cache_ttl = ttl_seconds
+
+    def use_request_policy(self, policy: RequestPolicy) -> None:
+        """
+        Sets the deadline, timeouts, retries and hedging used for this prompt's requests to the model
         
-        self.tool_result_types[inst.name] = result_type
+        Args:
+            policy (RequestPolicy): The policy to use
+        """
+        self.request_policy = policy
+
+    def use_priority(self, priority: Priority) -> None:
+        """
+        Sets how this prompt's requests compete for the OpenAI quota shared by every process. Lower priority
+        requests wait while the quota is running low, leaving the rest for higher priorities.
+
+        Args:
+            priority (Priority): The priority to use
+        """
+        self.priority = priority
         
-        logging.info(f"{tool_type.__name__} has result type {result_type.__name__}")
+    def use_tool(self, tool_type: Type[BaseTool], force: Optional[bool] = False) -> None:
+        # Schemas and validators are built once per process, the prompt only keeps a reference
+        registered = get_registered_tool(tool_type)
+        self.tools.append(registered.prototype)
+        self.registered_tools[registered.name] = registered
+        self.tool_instances[tool_type.__name__] = []
         
         if force:
             self.force_tool(tool_type)
             
+    def disable_tools(self) -> None:
+        """
+        Keeps the tools declared to the model but prevents it from calling them until a tool is forced or required.
+        Declaring tools up front rather than adding them later keeps the start of each request identical.
+        """
+        self.tools_enabled = False
+        
     def require_one_of_tools(self, tool_types: list[Type[BaseTool]]) -> None:
+        self.tools_enabled = True
         self.forced_tool_name = None
-        self.tool_choice_filter = [tool_type().name for tool_type in tool_types]
+        self.tool_choice_filter = [get_registered_tool(tool_type).name for tool_type in tool_types]
         
     def force_tool(self, tool_type: Type[BaseTool]) -> None:
-        inst = tool_type()
-        self.forced_tool_name = inst.name
+        self.tools_enabled = True
+        self.forced_tool_name = get_registered_tool(tool_type).name
         self.tool_choice_filter = None
         
     def process_tool(self, tool_name: str, arguments: dict):
-        if tool_name not in self.tool_types:
-            raise ValueError(f"Tool {tool_name} not found when processing")
+        inst, tool_response = self.execute_tool(tool_name, arguments)
+        self.record_tool_call(inst)
+        
+        return tool_response
+    
+    def execute_tool(self, tool_name: str, arguments: dict) -> Tuple[BaseTool, str]:
+        """
+        Runs a tool and validates its result without recording the call, so calls from the same turn
+        can execute concurrently and still be recorded in the order the model made them.
+        Coroutine tools are run to completion on their own event loop, on a shared worker thread when this
+        thread is already running one. Callers on an event loop should use execute_tool_async instead.
+        
+        Returns:
+            Tuple[BaseTool, str]: The tool instance holding the result, and the response for the model
+        """
+        registered = self.get_tool_by_name(tool_name)
+        inst = registered.create_instance()
+        tool_response = inst.process(arguments)
+        
+        if registered.is_async:
+            tool_response = run_coroutine(tool_response)
+        
+        self._validate_tool_result(registered, inst)
         
-        tool_type = self.tool_types[tool_name]
-        inst = tool_type()
+        return inst, tool_response
+    
+    async def execute_tool_async(self, tool_name: str, arguments: dict) -> Tuple[BaseTool, str]:
+        """
+        Async counterpart of execute_tool. Coroutine tools are awaited, other tools are called directly.
+        """
+        registered = self.get_tool_by_name(tool_name)
+        inst = registered.create_instance()
         tool_response = inst.process(arguments)
         
+        if registered.is_async:
+            tool_response = await tool_response
+        
+        self._validate_tool_result(registered, inst)
+        
+        return inst, tool_response
+    
+    def record_tool_call(self, inst: BaseTool) -> None:
+        self.tool_instances[type(inst).__name__].append(inst)
+    
+    def get_tool_by_name(self, tool_name: str) -> RegisteredTool:
+        if tool_name not in self.registered_tools:
+            raise ValueError(f"Tool {tool_name} not found when processing")
+        
+        return self.registered_tools[tool_name]
+    
+    def _validate_tool_result(self, registered: RegisteredTool, inst: BaseTool) -> None:
         try:
-            pydantic_cast = cast(BaseModel, self.tool_result_types[tool_name])
-            validated_data = pydantic_cast.model_validate(inst.result)
-            
-            inst.result = validated_data
-            
-            self.tool_instances[tool_type.__name__].append(inst)
-            
-            return tool_response
+            inst.result = registered.validate_result(inst.result)
         except ValidationError as validation_error:
+            # Fixing common mismatches here is far cheaper than a round trip for the model to correct them
+            if self._repair_tool_result(registered, inst, validation_error):
+                return
+            
             logging.info(f"Validation error: {validation_error}")
             logging.info(inst.result)
             
@@ -93,13 +211,27 @@ class BasePrompt:
                 if error_str not in errors:
                     errors.append(error_str)
                 
-            raise ValueError(f"Tool {tool_name} result validation failed: {', '.join(errors)}")
+            raise ValueError(f"Tool {registered.name} result validation failed: {', '.join(errors)}")
+    
+    def _repair_tool_result(self, registered: RegisteredTool, inst: BaseTool, validation_error: ValidationError) -> bool:
+        try:
+            repaired = repair_validation_errors(copy.deepcopy(inst.result), validation_error)
+            is_repaired = repaired is not None
+            
+            if is_repaired:
+                inst.result = registered.validate_result(repaired)
+        except ValidationError:
+            is_repaired = False
+        
+        record_tool_argument_repair(type(self).__name__, registered.name, "schema", is_repaired)
+        
+        return is_repaired
     
     def is_tool_public(self, tool_name: str) -> bool:
-        if tool_name not in self.tool_types:
+        if tool_name not in self.registered_tools:
             return False
         
-        return hasattr(self.tool_types[tool_name], "IS_PUBLIC")
+        return self.registered_tools[tool_name].is_public
     
     def get_tool_call(self, tool_type: Type[T]) -> Optional[T]:
         if tool_type.__name__ not in self.tool_instances:
@@ -112,8 +244,24 @@ class BasePrompt:
         
         return calls[-1]
         
-    def add_user_message(self, message: str, png_images: List[bytes] = []) -> None:
-        self.messages.append(BaseChatMessage(role=ChatRole.USER, message=message, png_images=png_images))
+    def add_static_context(self, message: str) -> None:
+        """
+        Adds reference material which does not change between requests for the same subject, such as lesson
+        or course content. Static context is always sent directly after the system prompt and tools, ahead of
+        the conversation, so the provider can reuse its cached prefix.
+        
+        Args:
+            message (str): The context to add
+        """
+        self.static_messages.append(BaseChatMessage(role=ChatRole.USER, message=message))
+        
+    def add_user_message(
+        self,
+        message: str,
+        images: List[bytes] = [],
+        image_detail: Optional[ImageDetail] = None
+    ) -> None:
+        self.messages.append(BaseChatMessage(role=ChatRole.USER, message=message, images=images, image_detail=image_detail))
         
     def add_agent_message(self, message: str, tool_calls: Optional[List[BaseToolCallWithResult]] = None) -> None:
         self.messages.append(BaseChatMessage(role=ChatRole.AGENT, message=message, tool_calls=tool_calls or []))
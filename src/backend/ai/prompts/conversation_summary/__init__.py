@@ -0,0 +1 @@
+from .conversation_summary_prompt import ConversationSummaryPrompt
\ No newline at end of file
@@ -0,0 +1,52 @@
+from typing import List, Optional
+from ai.prompts.base_prompt import BasePrompt
+from ai.common import BaseChatMessage, ChatRole
+
+class ConversationSummaryPrompt(BasePrompt):
+    def setup(self) -> None:
+        self.set_system_prompt("""
+You maintain a running summary of a conversation between a student and a tutor about a lesson.
+You will merge the existing summary with the new messages into a single updated summary.
+Keep the questions the student asked, the explanations and examples they were given, and anything they struggled with or asked to revisit.
+Leave out greetings and small talk. Write in the third person, as plain text, in no more than 300 words.
+""".strip())
+
+    async def get_summary(
+        self,
+        previous_summary: Optional[str],
+        messages: List[BaseChatMessage]
+    ) -> str:
+        """
+        Folds a set of chat messages into the running summary of a conversation
+
+        Args:
+            previous_summary (Optional[str]): The summary of the conversation before these messages, if any
+            messages (List[BaseChatMessage]): The messages to add to the summary, oldest first
+
+        Returns:
+            str: The updated summary
+        """
+        from ai.models.gpt_4o_mini import GPT4oMini
+        model = GPT4oMini()
+
+        transcript = "\n\n".join(
+            f"{'Student' if message.role == ChatRole.USER else 'Tutor'}: {message.message}"
+            for message in messages
+            if message.message
+        )
+
+        self.add_user_message(f"""
+Existing summary:
+{previous_summary or "(none)"}
+
+New messages:
+{transcript}
+""".strip())
+
+        responses = await model.get_responses_async(self)
+
+        return "\n".join(
+            response.message
+            for response in responses
+            if response.message
+        ).strip()
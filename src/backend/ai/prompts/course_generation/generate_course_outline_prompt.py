@@ -10,6 +10,11 @@ class GenerateCourseOutlinePrompt(BasePrompt):
         self.set_system_prompt(f"""
 You are an AI designed to create structured course syllabi based on user information and learning requests. Your task is to generate a syllabus outline that includes sections such as Introduction, Learning Objectives, Modules, Hands-On Practice/Assignments, Assessments, Resources, and Conclusion. Each module can optionally include a quiz at the end, if it makes sense, and each lesson can optionally include a hands-on exercise, such as coding or using a system shell in a sandbox environment, if it aligns with the learning objectives. These sections should contain placeholders or brief descriptions, as the detailed content will be generated by another system.
 """)
+        
+        # The outline tool is declared from the start so every turn shares the same prefix, but only called at the end
+        self.use_tool(ProvideCourseOutlineTool)
+        self.disable_tools()
+        self.use_priority("planning")
     
     def get_outline(self, plan: CoursePlanDto, profile_text: str) -> CourseOutline:
         from ai.models.gpt_4o import GPT4o
@@ -74,7 +79,7 @@ Take careful consideration of the tool schema in order to provide the data in th
 """.strip())
 
         # Now we force it to use the tool to produce the course outline
-        self.use_tool(ProvideCourseOutlineTool, force=True)
+        self.force_tool(ProvideCourseOutlineTool)
         model.get_responses(self)
         outline_call = self.get_tool_call(ProvideCourseOutlineTool)
         
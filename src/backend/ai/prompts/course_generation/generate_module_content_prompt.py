@@ -1,6 +1,6 @@
 import json
 import logging
-from typing import Callable
+from typing import Callable, Iterator, List
 from ai.prompts.base_prompt import BasePrompt
 from .models import CourseOutline, ModuleOutline
 from domain.dto.courses import ModuleDto, LessonDto, SectionDto
@@ -25,6 +25,9 @@ The content you generate should:
 - **Links**: Include links to external resources when relevant, using markdown link syntax.
 - **Explanations**: Provide clear explanations for any technical concepts, breaking down complex ideas into understandable segments.                            
 """)
+        
+        # Generation runs in the background and yields the shared quota to requests users are waiting on
+        self.use_priority("background")
     
     def generate_module_content(
         self, 
@@ -34,15 +37,87 @@ The content you generate should:
     ) -> ModuleDto:
         from ai.models.gpt_4o import GPT4o
         
+        model = GPT4o()
+        contents: List[str] = []
+        
+        for _ in self._add_section_messages(course, module):
+            messages = model.get_responses(self)
+            
+            content = messages[-1].message
+            
+            logging.info(content)
+            
+            contents.append(content)
+            
+            if progress_cb:
+                progress_cb(len(contents))
+                
+        return self.get_module(module, contents)
+    
+    def get_section_requests(
+        self,
+        course: CourseOutline,
+        module: ModuleOutline
+    ) -> List[dict]:
+        """
+        Builds the request for every section of the module up front, so they can be sent as a batch rather
+        than one at a time. Each section only depends on the messages before it, not on earlier responses.
+
+        Args:
+            course (CourseOutline): The course the module belongs to
+            module (ModuleOutline): The module to generate
+
+        Returns:
+            List[dict]: The chat completion arguments for each section, in the order they appear in the module
+        """
+        from ai.models.gpt_4o import GPT4o
+        
+        model = GPT4o()
+        
+        return [model.get_batch_request(self) for _ in self._add_section_messages(course, module)]
+    
+    def get_module(self, module: ModuleOutline, contents: List[str]) -> ModuleDto:
+        """
+        Assembles the module from the content generated for each of its sections
+
+        Args:
+            module (ModuleOutline): The module that was generated
+            contents (List[str]): The content of each section, in the order they appear in the module
+
+        Returns:
+            ModuleDto: The module
+        """
         module_dto = ModuleDto.model_construct(
             title=module.title,
             description=module.description,
             lessons=[]
         )
-        model = GPT4o()
- 
+        section_contents = iter(contents)
+        
+        for lesson in module.lessons:
+            module_dto.lessons.append(
+                LessonDto.model_construct(
+                    title=lesson.title,
+                    description=lesson.description,
+                    sections=[
+                        SectionDto.model_construct(
+                            title=section.title,
+                            description=section.description,
+                            content=next(section_contents)
+                        )
+                        for section in lesson.sections
+                    ]
+                )
+            )
+            
+        return module_dto
+    
+    def _add_section_messages(self, course: CourseOutline, module: ModuleOutline) -> Iterator[None]:
+        """
+        Adds the messages for the module, yielding once the request for each section is ready to be made
+        """
         key_outcomes_str = "\n".join([f"- {outcome}" for outcome in course.key_outcomes])       
-        self.add_user_message(f"""### Course:
+        self.add_static_context(f"""### Course:
 - **Subject**: {course.course_subject}
 - **Description**: {course.description}
 
@@ -50,24 +125,17 @@ The content you generate should:
 {key_outcomes_str}
 
 ### Module:
-- **Name**: {module_dto.title}
+- **Name**: {module.title}
 - **Focus Area**: {module.focus_area}
-- **Objective**: {module_dto.description}
+- **Objective**: {module.description}
 
 I will provide you with each lesson in the module. You will focus on one lesson at a time.
 """)
         
-        current_section = 0
         for lesson in module.lessons:
-            lesson_dto = LessonDto.model_construct(
-                title=lesson.title,
-                description=lesson.description,
-                sections=[]
-            )
-            
             self.add_user_message(f"""### Lesson:
-- **Name**: {lesson_dto.title}
-- **Focus Area**: {lesson_dto.description}
+- **Name**: {lesson.title}
+- **Focus Area**: {lesson.description}
 
 I will provide you with the title for each section in this lesson. You will generate comprehensive learning content for each of these, one at a time. Do not include any other commentary in your output.
 """)
@@ -76,24 +144,4 @@ I will provide you with the title for each section in this lesson. You will gene
                 self.add_user_message(f"""{section.title}
 {section.description}                                   
 """)
-                messages = model.get_responses(self)
-                
-                content = messages[-1].message
-                
-                logging.info(content)
-                
-                lesson_dto.sections.append(
-                    SectionDto.model_construct(
-                        title=section.title,
-                        description=section.description,
-                        content=content
-                    )
-                )
-                
-                if progress_cb:
-                    current_section += 1
-                    progress_cb(current_section)
-
-            module_dto.lessons.append(lesson_dto)
-                
-        return module_dto
\ No newline at end of file
+                yield
@@ -1,8 +1,10 @@
 import logging
 from ai.common.base_tool import BaseTool
+from ai.common.concurrent_tool_decorator import concurrent_tool
 from .models import CourseOutline
 from ai.util import pydantic_inline_ref_schema
 
+@concurrent_tool()
 class ProvideCourseOutlineTool(BaseTool):
     result: CourseOutline
     
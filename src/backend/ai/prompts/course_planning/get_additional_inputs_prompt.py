@@ -23,14 +23,21 @@ You are an AI assistant tasked with reviewing student applications for an online
 - **Follow-Up**: If "Other" is selected, always include a follow-up question to clarify the student's needs.
 - **Rule-Based Questions**: If any of your questions need to follow specific rules, define them clearly in the tool’s schema.
 """.strip())
+        
+        self.use_response_cache(ttl_seconds=60 * 60)
+        self.use_priority("planning")
+        
+        # The tool is declared from the start so every turn shares the same prefix, but only called at the end
+        self.use_tool(ProvideAdditionalInputsTool)
+        self.disable_tools()
     
     def get_inputs(
         self,
         plan: CoursePlanDto,
         profile_text: str
     ) -> AdditionalInputs:
-        from ai.models.gpt_4o import GPT4o
-        model = GPT4o()
+        from ai.models.model_router import get_routed_model
+        model = get_routed_model(self)
         
         plan_description = get_course_plan_description(plan)
         
@@ -63,7 +70,7 @@ Good, now generate follow-up questions to gather more specific details. Ensure n
 """.strip())
         
         # Now we force it to use the tool to produce the question fields
-        self.use_tool(ProvideAdditionalInputsTool, force=True)
+        self.force_tool(ProvideAdditionalInputsTool)
         model.get_responses(self)
         followup_call = self.get_tool_call(ProvideAdditionalInputsTool)
         
@@ -1,7 +1,9 @@
 from ai.common.base_tool import BaseTool
+from ai.common.concurrent_tool_decorator import concurrent_tool
 from domain.dto.courses import AdditionalInputs
 from ai.util import pydantic_inline_ref_schema
 
+@concurrent_tool()
 class ProvideAdditionalInputsTool(BaseTool):
     result: AdditionalInputs
     
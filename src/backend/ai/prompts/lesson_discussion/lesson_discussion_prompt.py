@@ -1,7 +1,6 @@
-from typing import Generator, List
+from typing import List, Optional
 from ai.prompts.base_prompt import BasePrompt
-from ai.common import BaseChatResponse, BaseChatMessage, ChatRole
-from domain.dto.ai.completion_chunk import CompletionChunk
+from ai.common import AsyncCompletionStream, BaseChatMessage, ChatRole, RequestPolicy
 
 class LessonDiscussionPrompt(BasePrompt):
     def setup(self) -> None:
@@ -9,36 +8,59 @@ class LessonDiscussionPrompt(BasePrompt):
 You are a helpful assistant who answers questions and helps students comprehend the lesson.
 You will not go off topic and will only discuss the lesson content.
 """.strip())
+        
+        self.use_tool_deltas()
+        
+        # Answers stream for a while, so only the wait for the first token is bounded
+        self.use_request_policy(RequestPolicy(
+            first_token_timeout_seconds=15,
+            max_retries=2,
+            hedge_after_seconds=5
+        ))
     
     def get_responses(
         self,
         history: List[BaseChatMessage],
         lesson_content: str,
-        message: str
-    ) -> Generator[CompletionChunk, None, List[BaseChatResponse]]:
-        from ai.models.gpt_4o import GPT4o
-        model = GPT4o()
+        message: str,
+        history_summary: Optional[str] = None,
+        lesson_excerpts: Optional[str] = None,
+        reused_answer: Optional[str] = None
+    ) -> AsyncCompletionStream:
+        # A previous answer to the same question is streamed back without calling the model
+        if reused_answer is not None:
+            return AsyncCompletionStream.from_text(reused_answer)
         
-        self.add_user_message(f"""
+        from ai.models.model_router import get_streaming_model
+        model = get_streaming_model(self, message, has_history=bool(history or history_summary))
+        
+        self.add_static_context(f"""
 Lesson content:
 {lesson_content}
 """.strip())
         
-        for message in history:
-            if message.role == ChatRole.USER:
-                self.add_user_message(message.message)
-            elif message.role == ChatRole.AGENT:
+        if history_summary:
+            self.add_user_message(f"""
+Summary of the earlier conversation:
+{history_summary}
+""".strip())
+        
+        for history_message in history:
+            if history_message.role == ChatRole.USER:
+                self.add_user_message(history_message.message)
+            elif history_message.role == ChatRole.AGENT:
                 self.add_agent_message(
-                    message=message.message,
-                    tool_calls=message.tool_calls
+                    message=history_message.message,
+                    tool_calls=history_message.tool_calls
                 )
+        
+        # Excerpts change with every question, so they follow the history to keep the prefix cacheable
+        if lesson_excerpts:
+            self.add_user_message(f"""
+Lesson excerpts relevant to my next message:
+{lesson_excerpts}
+""".strip())
                 
         self.add_user_message(message)
         
-        response_generator = model.get_streaming_response(self)
-        
-        while True:
-            try:
-                yield next(response_generator)
-            except StopIteration as e:
-                return e.value
\ No newline at end of file
+        return model.get_streaming_response_async(self)
\ No newline at end of file
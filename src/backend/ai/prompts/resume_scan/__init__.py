@@ -1 +1 @@
-from .resume_scanner_prompt import ResumeScannerPrompt
\ No newline at end of file
+from .resume_scanner_prompt import ResumeScannerPrompt, RESUME_IMAGE_OPTIONS, MAX_RESUME_PAGES
\ No newline at end of file
@@ -1,7 +1,8 @@
-from ai.common import BaseTool
+from ai.common import BaseTool, concurrent_tool
 from .models import ProfileScan
 from ai.util import pydantic_inline_ref_schema
 
+@concurrent_tool()
 class ProvideProfileTool(BaseTool):
     result: ProfileScan
     
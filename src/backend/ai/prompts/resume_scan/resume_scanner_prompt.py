@@ -1,5 +1,6 @@
 from typing import List, Optional
 from ai.prompts import BasePrompt
+from common.conversion import ImagePreparationOptions
 from domain.dto.profile import UserProfileDisciplineDto, UserProfileDto, UserSkillDto
 from domain.dto.profile.hobby import HobbyProjectDto, UserProfileHobbyDto
 from domain.dto.profile.professional import UserProfileEmploymentDto, UserProfileProfessionalDto
@@ -8,6 +9,18 @@ from domain.enums.user_enums import UserDiscipline, UserLearningCapacity, UserSk
 from .models import Discipline, ProfileScan
 from .provide_profile_tool import ProvideProfileTool
 
+# Resume text stays legible in grayscale at this size, at a fraction of the upload of a full colour page
+RESUME_IMAGE_OPTIONS = ImagePreparationOptions(
+    max_long_edge=1024,
+    format="JPEG",
+    grayscale=True,
+    jpeg_quality=75,
+    max_total_bytes=1024 * 1024
+)
+
+# Pages past this point are rarely more than references, and each page costs the same number of tokens
+MAX_RESUME_PAGES = 4
+
 class ResumeScannerPrompt(BasePrompt):
     def setup(self) -> None:
         self.set_system_prompt("""
@@ -34,7 +47,7 @@ Ex: If the resume says "May 2020", you will use "2020-05-01" or "2020-05-31" res
     def get_profile_data(self, resume_images: List[bytes]) -> ProfileScan:
         from ...models.gpt_4o import GPT4o
         
-        self.add_user_message("Process this resume", resume_images)
+        self.add_user_message("Process this resume", resume_images, image_detail="high")
         
         model = GPT4o()
         model.get_responses(self)
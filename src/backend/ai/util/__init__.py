@@ -1 +1,7 @@
-from .pydantic_inline_refs import pydantic_inline_ref_schema
\ No newline at end of file
+from .pydantic_inline_refs import pydantic_inline_ref_schema
+from .token_estimator import estimate_tokens, estimate_message_tokens, estimate_messages_tokens
+from .json_repair import repair_json
+from .validation_repair import repair_validation_errors
+from .incremental_json import IncrementalJsonParser, JsonPath
+from .bm25_index import Bm25Index
+from .ngram_vectors import get_ngram_vector
\ No newline at end of file
@@ -0,0 +1,93 @@
+import re
+from collections import Counter
+from typing import Dict, List, Tuple
+import numpy as np
+
+# Term frequency saturation and document length normalization, the usual defaults for BM25
+K1 = 1.2
+B = 0.75
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9_]+")
+
+# Words too common to say anything about which passage a question is about
+_STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from", "how", "i", "in", "is",
+    "it", "me", "my", "of", "on", "or", "that", "the", "this", "to", "was", "what", "when", "where", "which",
+    "why", "with", "you", "your"
+}
+
+def tokenize(text: str) -> List[str]:
+    """
+    Splits text into lowercase words and identifiers, without stop words
+    """
+    return [token for token in _TOKEN_PATTERN.findall(text.lower()) if token not in _STOP_WORDS]
+
+class Bm25Index:
+    """
+    Ranks a fixed set of documents against a query with BM25. The index is built once from term counts,
+    which are all that need to be stored, and every document is scored at once with NumPy.
+
+    Example:
+        index = Bm25Index.build(["Lists are ordered", "Dictionaries map keys to values"])
+        index.search("how do dictionaries work", top_k=1) returns [(1, score)]
+    """
+    term_counts: List[Dict[str, int]]
+
+    def __init__(self, term_counts: List[Dict[str, int]]) -> None:
+        self.term_counts = term_counts
+        self._columns: Dict[str, int] = {}
+
+        for counts in term_counts:
+            for term in counts:
+                self._columns.setdefault(term, len(self._columns))
+
+        self._weights = self._get_weights()
+
+    @staticmethod
+    def build(documents: List[str]) -> "Bm25Index":
+        return Bm25Index([dict(Counter(tokenize(document))) for document in documents])
+
+    def search(self, query: str, top_k: int) -> List[Tuple[int, float]]:
+        """
+        Finds the documents most relevant to a query
+
+        Args:
+            query (str): The text to search for
+            top_k (int): The most documents to return
+
+        Returns:
+            List[Tuple[int, float]]: The index and score of each matching document, best first. Documents
+            sharing no terms with the query are not returned.
+        """
+        query_counts = Counter(term for term in tokenize(query) if term in self._columns)
+
+        if not query_counts or not self.term_counts:
+            return []
+
+        columns = [self._columns[term] for term in query_counts]
+        scores = self._weights[:, columns] @ np.array(list(query_counts.values()), dtype=np.float32)
+
+        ranked = np.argsort(-scores, kind="stable")[:top_k]
+
+        return [(int(index), float(scores[index])) for index in ranked if scores[index] > 0]
+
+    def _get_weights(self) -> np.ndarray:
+        """
+        Precomputes the BM25 weight of every term in every document, so a query only sums columns
+        """
+        weights = np.zeros((len(self.term_counts), len(self._columns)), dtype=np.float32)
+
+        for row, counts in enumerate(self.term_counts):
+            for term, count in counts.items():
+                weights[row, self._columns[term]] = count
+
+        if not weights.size:
+            return weights
+
+        lengths = weights.sum(axis=1, keepdims=True)
+        average_length = max(float(lengths.mean()), 1)
+        document_frequencies = (weights > 0).sum(axis=0)
+        idf = np.log(1 + (len(self.term_counts) - document_frequencies + 0.5) / (document_frequencies + 0.5))
+        saturated = weights * (K1 + 1) / (weights + K1 * (1 - B + B * lengths / average_length))
+
+        return (saturated * idf).astype(np.float32)
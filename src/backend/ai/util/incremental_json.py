@@ -0,0 +1,103 @@
+import json
+from typing import Any, List, Optional, Tuple, Union
+
+JsonPath = Tuple[Union[str, int], ...]
+
+class _Frame:
+    def __init__(self, is_object: bool) -> None:
+        self.is_object = is_object
+        self.key: Optional[Union[str, int]] = None if is_object else 0
+        self.expecting_key = is_object
+
+class IncrementalJsonParser:
+    """
+    Parses JSON as it is streamed, reporting each string, number and literal as soon as it is complete,
+    along with its location in the document. Used to act on tool arguments before the model has
+    finished writing them.
+
+    Example:
+        feeding '{"options": ["a", "b' reports (("options", 0), "a"), and "b" once its closing quote arrives
+    """
+    def __init__(self) -> None:
+        self._stack: List[_Frame] = []
+        self._token: List[str] = []
+        self._in_string = False
+        self._escaped = False
+        self._in_scalar = False
+
+    def feed(self, fragment: str) -> List[Tuple[JsonPath, Any]]:
+        """
+        Parses the next piece of the document
+
+        Args:
+            fragment (str): The text following everything fed so far
+
+        Returns:
+            List[Tuple[JsonPath, Any]]: The values completed by this fragment, with their paths
+        """
+        values: List[Tuple[JsonPath, Any]] = []
+
+        for char in fragment:
+            if self._in_string:
+                self._token.append(char)
+
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    self._complete_token(values)
+
+                continue
+
+            if self._in_scalar:
+                if char.isspace() or char in ",:]}":
+                    self._complete_token(values)
+                else:
+                    self._token.append(char)
+                    continue
+
+            if char == '"':
+                self._in_string = True
+                self._token.append(char)
+            elif char in "{[":
+                self._stack.append(_Frame(is_object=char == "{"))
+            elif char in "}]":
+                if self._stack:
+                    self._stack.pop()
+            elif char == ":":
+                if self._stack:
+                    self._stack[-1].expecting_key = False
+            elif char == ",":
+                if self._stack:
+                    frame = self._stack[-1]
+
+                    if frame.is_object:
+                        frame.expecting_key = True
+                    else:
+                        frame.key += 1
+            elif not char.isspace():
+                self._in_scalar = True
+                self._token.append(char)
+
+        return values
+
+    def _complete_token(self, values: List[Tuple[JsonPath, Any]]) -> None:
+        token = "".join(self._token)
+        self._token = []
+        self._in_scalar = False
+
+        try:
+            value = json.loads(token)
+        except json.JSONDecodeError:
+            # Malformed values are skipped, the complete arguments are validated separately
+            return
+
+        frame = self._stack[-1] if self._stack else None
+
+        if frame and frame.is_object and frame.expecting_key:
+            frame.key = value
+            return
+
+        values.append((tuple(frame.key for frame in self._stack), value))
@@ -0,0 +1,161 @@
+import json
+from typing import Any, List, Optional
+
+class _Container:
+    def __init__(self, closing: str) -> None:
+        self.closing = closing
+
+        # Objects alternate between expecting a key, a colon, a value and a comma, arrays between a value and a comma
+        self.expecting = "key" if closing == "}" else "value"
+
+        # Where the key currently being written starts, so a key without a value can be removed
+        self.key_start: Optional[int] = None
+
+def repair_json(text: str) -> Optional[Any]:
+    """
+    Attempts to parse malformed JSON produced by a model. Trailing commas are removed and output which was
+    cut off is closed: an unterminated string is ended, a dangling key or comma is dropped, and any open
+    objects and arrays are closed.
+
+    Args:
+        text (str): The malformed JSON
+
+    Returns:
+        Optional[Any]: The parsed value, or None when the text could not be repaired
+    """
+    output: List[str] = []
+    stack: List[_Container] = []
+    in_string = False
+    escaped = False
+    scalar_start: Optional[int] = None
+
+    def end_scalar() -> None:
+        nonlocal scalar_start
+
+        if scalar_start is not None:
+            scalar_start = None
+
+            if stack:
+                stack[-1].expecting = "comma"
+
+    for char in text.strip():
+        if in_string:
+            output.append(char)
+
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+
+                if stack:
+                    container = stack[-1]
+                    container.expecting = "colon" if container.closing == "}" and container.expecting == "key" else "comma"
+
+            continue
+
+        if char.isspace():
+            end_scalar()
+            output.append(char)
+            continue
+
+        if char == '"':
+            end_scalar()
+
+            if stack and stack[-1].closing == "}" and stack[-1].expecting == "key":
+                stack[-1].key_start = len(output)
+
+            in_string = True
+            output.append(char)
+        elif char in "{[":
+            end_scalar()
+            stack.append(_Container("}" if char == "{" else "]"))
+            output.append(char)
+        elif char in "}]":
+            end_scalar()
+
+            if not stack or stack[-1].closing != char:
+                return None
+
+            _strip_trailing_comma(output)
+            output.append(char)
+            stack.pop()
+
+            if stack:
+                stack[-1].expecting = "comma"
+        elif char == ":":
+            end_scalar()
+
+            if stack:
+                stack[-1].expecting = "value"
+
+            output.append(char)
+        elif char == ",":
+            end_scalar()
+
+            if stack:
+                stack[-1].expecting = "key" if stack[-1].closing == "}" else "value"
+
+            output.append(char)
+        else:
+            if scalar_start is None:
+                scalar_start = len(output)
+
+            output.append(char)
+
+    if escaped:
+        output.pop()
+
+    if in_string:
+        container = stack[-1] if stack else None
+
+        if container and container.closing == "}" and container.expecting == "key":
+            # A key that was cut off has no value to keep
+            del output[container.key_start:]
+        else:
+            output.append('"')
+
+            if container:
+                container.expecting = "comma"
+    elif scalar_start is not None and not _is_complete_scalar("".join(output[scalar_start:])):
+        # A number or literal that was cut off, such as "tr" or "1."
+        del output[scalar_start:]
+
+    if stack:
+        container = stack[-1]
+
+        if container.closing == "}" and container.expecting == "colon":
+            del output[container.key_start:]
+        elif container.expecting == "value" and container.closing == "}" and _last_non_space(output) == ":":
+            output.append("null")
+
+    while stack:
+        _strip_trailing_comma(output)
+        output.append(stack.pop().closing)
+
+    try:
+        return json.loads("".join(output))
+    except json.JSONDecodeError:
+        return None
+
+def _is_complete_scalar(value: str) -> bool:
+    try:
+        json.loads(value)
+        return True
+    except json.JSONDecodeError:
+        return False
+
+def _last_non_space(output: List[str]) -> Optional[str]:
+    for char in reversed(output):
+        if not char.isspace():
+            return char
+
+    return None
+
+def _strip_trailing_comma(output: List[str]) -> None:
+    while output and output[-1].isspace():
+        output.pop()
+
+    if output and output[-1] == ",":
+        output.pop()
@@ -0,0 +1,51 @@
+import re
+import zlib
+from typing import List
+import numpy as np
+
+# Vectors have a fixed size, n-grams are hashed into it rather than looked up in a vocabulary
+DIMENSIONS = 4096
+
+# Character n-grams match questions phrased slightly differently or with typos, words match reordered questions
+CHAR_NGRAM_SIZES = (3, 4, 5)
+
+_NON_WORD_PATTERN = re.compile(r"[^a-z0-9]+")
+
+def get_ngram_vector(text: str) -> np.ndarray:
+    """
+    Embeds text as a unit vector of hashed character and word n-gram counts, so the cosine similarity of two
+    texts is the dot product of their vectors. Needs no model or external service.
+
+    Args:
+        text (str): The text to embed
+
+    Returns:
+        np.ndarray: A float32 vector of DIMENSIONS values, all zeros when the text has no words
+    """
+    normalized = _NON_WORD_PATTERN.sub(" ", text.lower()).strip()
+    words = normalized.split()
+    padded = f" {normalized} "
+    ngrams: List[str] = [
+        padded[i:i + size]
+        for size in CHAR_NGRAM_SIZES
+        for i in range(len(padded) - size + 1)
+    ]
+    ngrams.extend(f"w:{word}" for word in words)
+    ngrams.extend(f"w:{first} {second}" for first, second in zip(words, words[1:]))
+
+    vector = np.zeros(DIMENSIONS, dtype=np.float32)
+
+    if not ngrams:
+        return vector
+
+    hashes = np.array([zlib.crc32(ngram.encode("utf-8")) for ngram in ngrams], dtype=np.uint32)
+
+    # A bit of each hash decides the sign, so collisions tend to cancel out rather than add up
+    signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+    np.add.at(vector, hashes % DIMENSIONS, signs)
+
+    # Dampens n-grams repeated many times, such as in long questions
+    vector = np.sign(vector) * np.log1p(np.abs(vector))
+    norm = np.linalg.norm(vector)
+
+    return vector / norm if norm else vector
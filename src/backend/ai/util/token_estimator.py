@@ -0,0 +1,54 @@
+import math
+from typing import List, Optional
+from ai.common import BaseChatMessage
+
+# English prose and code average roughly four characters per token with the GPT-4o tokenizer
+CHARS_PER_TOKEN = 4
+
+# Role markers and separators the API adds around every message
+TOKENS_PER_MESSAGE = 4
+
+# Detail "high" images are billed per tile, this is the cost of a typical 1024x1024 image
+TOKENS_PER_IMAGE = 765
+
+# Detail "low" images are billed at a flat rate regardless of size
+TOKENS_PER_LOW_DETAIL_IMAGE = 85
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """
+    Estimates the number of tokens in a piece of text without running a tokenizer
+
+    Args:
+        text (Optional[str]): The text to measure
+
+    Returns:
+        int: The estimated token count
+    """
+    if not text:
+        return 0
+
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def estimate_message_tokens(message: BaseChatMessage) -> int:
+    """
+    Estimates the number of tokens a chat message occupies in the model's context, including tool calls
+
+    Args:
+        message (BaseChatMessage): The message to measure
+
+    Returns:
+        int: The estimated token count
+    """
+    tokens = TOKENS_PER_MESSAGE + estimate_tokens(message.message)
+    tokens += (TOKENS_PER_LOW_DETAIL_IMAGE if message.image_detail == "low" else TOKENS_PER_IMAGE) * len(message.images or [])
+
+    for tool_call in message.tool_calls or []:
+        tokens += TOKENS_PER_MESSAGE
+        tokens += estimate_tokens(tool_call.name)
+        tokens += estimate_tokens(tool_call.arguments)
+        tokens += estimate_tokens(tool_call.result)
+
+    return tokens
+
+def estimate_messages_tokens(messages: List[BaseChatMessage]) -> int:
+    return sum(estimate_message_tokens(message) for message in messages)
@@ -0,0 +1,113 @@
+import re
+from datetime import date
+from typing import Any, List, Optional, Tuple, Union
+from pydantic_core import ValidationError
+
+Location = Tuple[Union[str, int], ...]
+
+_DATE_ERROR_TYPES = {"date_parsing", "date_from_datetime_parsing", "date_type", "datetime_parsing", "datetime_from_date_parsing"}
+_LIST_ERROR_TYPES = {"list_type"}
+
+# Values models use for a date range which has not ended yet
+_OPEN_ENDED_DATES = {"present", "current", "now", "ongoing", "today"}
+
+_MONTHS = {
+    name: index + 1
+    for index, names in enumerate([
+        ("jan", "january"), ("feb", "february"), ("mar", "march"), ("apr", "april"),
+        ("may",), ("jun", "june"), ("jul", "july"), ("aug", "august"),
+        ("sep", "sept", "september"), ("oct", "october"), ("nov", "november"), ("dec", "december")
+    ])
+    for name in names
+}
+
+def repair_validation_errors(value: Any, error: ValidationError) -> Optional[Any]:
+    """
+    Coerces the values that failed validation into the shapes models most commonly get wrong. Month
+    strings such as "May 2020" become dates and single values become lists.
+
+    Args:
+        value (Any): The value that failed validation, which is modified in place
+        error (ValidationError): The validation error
+
+    Returns:
+        Optional[Any]: The repaired value, or None when an error could not be repaired
+    """
+    for details in error.errors():
+        location: Location = details["loc"]
+        parent, key = _find_parent(value, location)
+
+        if parent is None:
+            return None
+
+        current = parent[key]
+
+        if details["type"] in _DATE_ERROR_TYPES and isinstance(current, str):
+            repaired = _parse_loose_date(current)
+
+            if repaired is None and current.strip().lower() not in _OPEN_ENDED_DATES:
+                return None
+
+            parent[key] = repaired.isoformat() if repaired else None
+        elif details["type"] in _LIST_ERROR_TYPES and current is not None:
+            parent[key] = [current]
+        else:
+            return None
+
+    return value
+
+def _find_parent(value: Any, location: Location) -> Tuple[Optional[Any], Optional[Union[str, int]]]:
+    if not location:
+        return None, None
+
+    parent = value
+
+    for key in location[:-1]:
+        try:
+            parent = parent[key]
+        except (KeyError, IndexError, TypeError):
+            return None, None
+
+    key = location[-1]
+
+    if isinstance(parent, dict) and key in parent or isinstance(parent, list) and isinstance(key, int) and key < len(parent):
+        return parent, key
+
+    return None, None
+
+def _parse_loose_date(value: str) -> Optional[date]:
+    text = value.strip().lower().replace(",", " ")
+
+    # 2020-05, 2020/05
+    match = re.fullmatch(r"(\d{4})[-/.](\d{1,2})", text)
+
+    if match:
+        return _make_date(int(match.group(1)), int(match.group(2)))
+
+    # 05/2020, 5-2020
+    match = re.fullmatch(r"(\d{1,2})[-/.](\d{4})", text)
+
+    if match:
+        return _make_date(int(match.group(2)), int(match.group(1)))
+
+    # may 2020, 2020 may
+    parts: List[str] = text.split()
+
+    if len(parts) == 2:
+        month_name, year = (parts[0], parts[1]) if parts[1].isdigit() else (parts[1], parts[0])
+        month = _MONTHS.get(month_name.rstrip("."))
+
+        if month and year.isdigit() and len(year) == 4:
+            return _make_date(int(year), month)
+
+    # 2020
+    if re.fullmatch(r"\d{4}", text):
+        return _make_date(int(text), 1)
+
+    return None
+
+def _make_date(year: int, month: int) -> Optional[date]:
+    try:
+        return date(year, month, 1)
+    except ValueError:
+        return None
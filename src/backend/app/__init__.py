@@ -1,7 +1,9 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from socketio import ASGIApp
 from app.routing import api_router
 from app.websocket import socket_server
+from ai.models.openai_clients import warm_openai_clients
 from starlette.middleware.cors import CORSMiddleware
 
 origins = [
@@ -9,7 +11,12 @@ origins = [
     "https://eduvize.dev"
 ]
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    await warm_openai_clients()
+    yield
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -1,11 +1,14 @@
 import logging
 import json
 import uuid
-from typing import List, Optional
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
 
 from sqlmodel import Session, select
-from sqlalchemy.orm import joinedload
+from sqlalchemy import insert, tuple_
+from sqlalchemy.orm import selectinload
 from domain.schema.chat import ChatMessage, ChatSession, ChatToolCall
+from domain.dto.chat import ChatTurnMessageDto
 from common.database import engine
 
 logger = logging.getLogger("ChatRepository")
@@ -39,53 +42,72 @@ class ChatRepository:
             
             return chat_session
     
-    def add_chat_message(
-        self, 
+    def add_chat_turn(
+        self,
         session_id: uuid.UUID,
-        is_user: bool,
-        content: Optional[str]
-    ) -> ChatMessage:
+        messages: List[ChatTurnMessageDto]
+    ) -> List[ChatMessage]:
         """
-        Adds a message to a chat session
+        Adds the messages of a chat turn and their tool calls in a single transaction, with one batched
+        insert for the messages and one for the tool calls
 
         Args:
-            user_id (str): The user that owns the chat session
-            message_dto (ChatMessageDto): The message to add
+            session_id (uuid.UUID): The chat session the turn belongs to
+            messages (List[ChatTurnMessageDto]): The messages in the order they were sent
 
         Returns:
-            ChatMessage: The added message
+            List[ChatMessage]: The added messages with their tool calls, detached from the database session
         """
         
-        with Session(engine) as session:
-            chat_message = ChatMessage(
-                session_id=session_id,
-                is_user=is_user,
-                content=content
+        created_at = datetime.utcnow()
+        message_rows = []
+        tool_call_rows = []
+        
+        for index, message in enumerate(messages):
+            message_id = uuid.uuid4()
+            
+            message_rows.append({
+                "id": message_id,
+                "session_id": session_id,
+                "is_user": message.is_user,
+                "content": message.content,
+                # Messages are ordered by creation time, which must not tie within the turn
+                "created_at_utc": created_at + timedelta(microseconds=index)
+            })
+            
+            tool_call_rows.extend(
+                {
+                    "id": uuid.uuid4(),
+                    "message_id": message_id,
+                    "tool_call_id": tool_call.call_id,
+                    "tool_name": tool_call.tool_name,
+                    "json_arguments": tool_call.arguments,
+                    "result": tool_call.result
+                }
+                for tool_call in message.tool_calls
             )
-            session.add(chat_message)
-            session.commit()
-            session.refresh(chat_message)
             
-            return chat_message
+        if not message_rows:
+            return []
         
-    def add_tool_message(
-        self,
-        message_id: uuid.UUID,
-        call_id: str,
-        tool_name: str,
-        arguments: str,
-        result: str
-    ):
+        # Inserted through the tables rather than the ORM, which would split rows with a null content into separate statements
         with Session(engine) as session:
-            tool_call = ChatToolCall(
-                message_id=message_id,
-                tool_call_id=call_id,
-                tool_name=tool_name,
-                json_arguments=arguments,
-                result=result
-            )
-            session.add(tool_call)
+            session.execute(insert(ChatMessage.__table__), message_rows)
+            
+            if tool_call_rows:
+                session.execute(insert(ChatToolCall.__table__), tool_call_rows)
+                
             session.commit()
+            
+        tool_calls = [ChatToolCall(**row) for row in tool_call_rows]
+        
+        return [
+            ChatMessage(
+                **row,
+                tool_calls=[tool_call for tool_call in tool_calls if tool_call.message_id == row["id"]]
+            )
+            for row in message_rows
+        ]
         
     def get_session(
         self,
@@ -107,14 +129,20 @@ class ChatRepository:
         
     def get_chat_messages(
         self,
-        session_id: uuid.UUID
+        session_id: uuid.UUID,
+        since: Optional[datetime] = None,
+        limit: Optional[int] = 50,
+        before: Optional[Tuple[datetime, uuid.UUID]] = None
     ) -> List[ChatMessage]:
         """
-        Gets all messages in a chat session
+        Gets the most recent messages in a chat session
 
         Args:
-            user_id (uuid.UUID): The user that owns the chat session
             session_id (uuid.UUID): The chat session to get messages for
+            since (Optional[datetime]): Only include messages created after this time
+            limit (Optional[int]): The maximum number of messages to return, or None for all of them
+            before (Optional[Tuple[datetime, uuid.UUID]]): Only include messages older than the message with this
+            creation time and ID, to page back through the session
 
         Returns:
             List[ChatMessage]: The messages in the chat session
@@ -127,13 +155,22 @@ class ChatRepository:
                 ChatMessage.session_id == session_id
             )
             
-            query = query.options(joinedload(ChatMessage.tool_calls))
+            if since is not None:
+                query = query.where(ChatMessage.created_at_utc > since)
+                
+            if before is not None:
+                query = query.where(tuple_(ChatMessage.created_at_utc, ChatMessage.id) < tuple_(*before))
+            
+            # Tool calls are loaded in a second query, so the limit applies to messages and the index serves the page
+            query = query.options(selectinload(ChatMessage.tool_calls))
+            
+            # Newest first, with the ID breaking ties so pages neither skip nor repeat messages
+            query = query.order_by(ChatMessage.created_at_utc.desc(), ChatMessage.id.desc())
             
-            # Order by created_at_utc descending
-            query = query.order_by(ChatMessage.created_at_utc.desc())
-            query = query.limit(50)
+            if limit is not None:
+                query = query.limit(limit)
             
-            messages = session.exec(query).unique().all()
+            messages = session.exec(query).all()
             messages.reverse()
             
             return messages
\ No newline at end of file
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 import uuid
 
 from sqlalchemy import update
@@ -33,7 +33,7 @@ class CourseRepository:
         self,
         course_id: uuid.UUID,
         course_dto: CourseDto
-    ):
+    ) -> List[uuid.UUID]:
         with Session(engine) as session:
             query = (
                 select(Course)
@@ -99,6 +99,8 @@ class CourseRepository:
             # save the course entity
             session.commit()
             
+            return [lesson.id for lesson in added_lessons]
+            
     def set_generation_progress(
         self,
         course_id: uuid.UUID,
@@ -11,6 +11,7 @@ from .validation_router import router as validation_router
 from .chat_router import router as chat_router
 from .playground_router import router as playground_router
 from .course_router import router as course_router
+from .metrics_router import router as metrics_router
 
 api_router.include_router(auth_router)
 api_router.include_router(user_router)
@@ -20,4 +21,5 @@ api_router.include_router(file_router)
 api_router.include_router(validation_router)
 api_router.include_router(chat_router)
 api_router.include_router(playground_router)
-api_router.include_router(course_router)
\ No newline at end of file
+api_router.include_router(course_router)
+api_router.include_router(metrics_router)
\ No newline at end of file
@@ -1,14 +1,16 @@
-import asyncio
 import json
-from typing import Optional
+from typing import AsyncIterator, Optional
 import uuid
 import logging
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header, Query
 from fastapi.responses import StreamingResponse
 from app.routing.middleware import token_validator, user_id_extractor
-from app.services import ChatService
+from app.services import ChatService, StreamBatch
+from app.utilities.sse import SseWriter
+from .responses import raise_bad_request
 from .contracts.chat_contracts import SendChatMessagePayload, CreateSessionResponse
 from domain.enums.chat_enums import PromptType
+from config import is_chat_stream_resumable
 
 router = APIRouter(
     prefix="/chat",
@@ -42,24 +44,71 @@ async def send_message(
     chat_service: ChatService = Depends(ChatService),
     user_id: str = Depends(user_id_extractor)
 ):
-    # This function generates a stream of messages
-    async def message_stream():
-        async for message in chat_service.get_response(
+    if is_chat_stream_resumable():
+        batches = await chat_service.start_response(
+            user_id=user_id,
+            session_id=session_id,
+            message=payload.message
+        )
+        
+        # Sent directly when the response cannot be mirrored to Redis
+        if batches is not None:
+            return get_event_stream_response(get_batch_frames(batches))
+    
+    writer = SseWriter()
+    frames = writer.write(
+        chat_service.get_response(
             user_id=user_id, 
             session_id=session_id, 
             message=payload.message
-        ):
-            yield f"{message.model_dump_json()}\n\n"
-            await asyncio.sleep(0.01)
+        )
+    )
 
-    response = StreamingResponse(message_stream(), media_type="text/event-stream")
-    return response
+    return get_event_stream_response(frames)
+
+@router.get("/{session_id}/stream")
+async def resume_message_stream(
+    session_id: uuid.UUID,
+    last_event_id: Optional[str] = Header(None),
+    chat_service: ChatService = Depends(ChatService),
+    user_id: str = Depends(user_id_extractor)
+):
+    try:
+        batches = await chat_service.resume_response(user_id, session_id, last_event_id)
+    except ValueError as e:
+        raise_bad_request(str(e))
+        
+    return get_event_stream_response(get_batch_frames(batches))
     
 @router.get("/{session_id}/history")
 async def get_chat_history(
     session_id: uuid.UUID,
+    before: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
     chat_service: ChatService = Depends(ChatService),
     user_id: str = Depends(user_id_extractor)
 ):
-    messages = await chat_service.get_history(user_id, session_id)
-    return messages
\ No newline at end of file
+    try:
+        return await chat_service.get_history(user_id, session_id, before=before, limit=limit)
+    except ValueError as e:
+        raise_bad_request(str(e))
+
+async def get_batch_frames(batches: AsyncIterator[Optional[StreamBatch]]) -> AsyncIterator[str]:
+    writer = SseWriter()
+    
+    async for batch in batches:
+        if batch is None:
+            # Comments keep idle connections from being closed by proxies, and are ignored by clients
+            yield ": keepalive\n\n"
+        elif batch.error:
+            yield writer.get_error_frame(batch.error)
+        else:
+            yield writer.get_frame(batch.chunks, batch.event_id)
+
+def get_event_stream_response(frames: AsyncIterator[str]) -> StreamingResponse:
+    # Proxies must pass frames through as they are written rather than buffer the response
+    return StreamingResponse(
+        frames,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
\ No newline at end of file
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, File, UploadFile
 from ai.prompts import ResumeScannerPrompt
+from ai.prompts.resume_scan import RESUME_IMAGE_OPTIONS, MAX_RESUME_PAGES
 from app.routing.middleware import token_validator, user_id_extractor
 
 from common.conversion.pdf_to_image import get_images_from_pdf_bytes
@@ -14,6 +15,10 @@ router = APIRouter(
 
 @router.post("/resume")
 async def get_resume_details(file: UploadFile = File(...)):
-    images = get_images_from_pdf_bytes(await file.read())
+    images = get_images_from_pdf_bytes(
+        await file.read(),
+        max_pages=MAX_RESUME_PAGES,
+        options=RESUME_IMAGE_OPTIONS
+    )
     
     return ResumeScannerPrompt().get_profile_data(images)
\ No newline at end of file
@@ -0,0 +1,23 @@
+from typing import Optional
+from fastapi import APIRouter, Header
+from fastapi.responses import PlainTextResponse
+from ai.metrics import get_metrics_sink
+from app.routing.responses import raise_unauthorized
+from config import get_metrics_token
+
+router = APIRouter(
+    prefix="/metrics"
+)
+
+@router.get("", response_class=PlainTextResponse)
+async def get_metrics(authorization: Optional[str] = Header(default=None)):
+    metrics_token = get_metrics_token()
+
+    # Scrapers authenticate with a shared token rather than a user session
+    if metrics_token and authorization != f"Bearer {metrics_token}":
+        raise_unauthorized()
+
+    return PlainTextResponse(
+        get_metrics_sink().render(),
+        media_type="text/plain; version=0.0.4"
+    )
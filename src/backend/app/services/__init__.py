@@ -3,6 +3,11 @@ from .autocomplete_service import AutocompleteService
 from .user_onboarding_service import UserOnboardingService
 from .user_service import UserService
 from .validation_service import ValidationService
+from .chat_history_service import ChatHistoryService
+from .chat_context_service import ChatContextService, ChatContext
+from .lesson_index_service import LessonIndexService, LessonContext
+from .answer_reuse_service import AnswerReuseService, ReusedAnswer
+from .chat_stream_service import ChatStreamService, StreamBatch
 from .chat_service import ChatService
 from .playground_service import PlaygroundService
 from .course_service import CourseService
\ No newline at end of file
@@ -0,0 +1,196 @@
+import json
+import logging
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from typing import FrozenSet, List, Optional, Tuple
+import numpy as np
+from ai.util import get_ngram_vector
+from common.cache import get_key, set_key, push_to_list, get_list, get_list_item
+from config import get_lesson_answer_reuse_threshold
+
+logger = logging.getLogger("AnswerReuseService")
+
+QUESTIONS_KEY_PREFIX = "lesson-questions:"
+ANSWER_KEY_PREFIX = "lesson-answer:"
+ANSWER_EXPIRATION_SECONDS = 60 * 60 * 24 * 30
+
+# The most recent questions kept per lesson, older answers stop being reused
+MAX_QUESTIONS_PER_LESSON = 500
+
+# Question vectors loaded by this process, most recently used last
+MAX_LOADED_LESSONS = 256
+
+# Questions about code depend on every character of it, which similar n-grams say nothing about
+_CODE_PATTERN = re.compile(r"`|[{};]|=>|->|==|!=|:=|\w\([^)]*\)|^\s{2,}\S", re.MULTILINE)
+
+# Numbers, and names such as snake_case, camelCase, dotted.paths and calls(), change the answer when they change
+_EXACT_TOKEN_PATTERN = re.compile(
+    r"\d+(?:\.\d+)*"
+    r"|[A-Za-z_$][\w$]*(?:\.[A-Za-z_$][\w$]*)+"
+    r"|[A-Za-z_$][\w$]*(?=\()"
+    r"|\b\w*(?:_|[a-z][A-Z]|[A-Za-z]\d|\d[A-Za-z])\w*\b"
+)
+
+class QuestionIndex:
+    """
+    The answered questions for a lesson and their n-gram vectors, one row per question
+
+    Attributes:
+        answer_ids (List[str]): The ID of the stored answer to each question, oldest first
+        questions (List[str]): The questions, oldest first
+        exact_tokens (List[FrozenSet[str]]): The numbers and identifiers in each question
+        vectors (np.ndarray): The vector of each question
+    """
+    answer_ids: List[str]
+    questions: List[str]
+    exact_tokens: List[FrozenSet[str]]
+    vectors: np.ndarray
+
+    def __init__(self, entries: List[dict]) -> None:
+        self.answer_ids = [entry["id"] for entry in entries]
+        self.questions = [entry["question"] for entry in entries]
+        self.exact_tokens = [get_exact_tokens(question) for question in self.questions]
+        self.vectors = np.stack([get_ngram_vector(question) for question in self.questions]) if entries else None
+
+    def find_closest(self, question: str) -> Tuple[Optional[int], float]:
+        """
+        Finds the most similar question mentioning the same numbers and identifiers, returning its position
+        and cosine similarity
+        """
+        if self.vectors is None:
+            return None, 0
+
+        exact_tokens = get_exact_tokens(question)
+        is_match = np.array([tokens == exact_tokens for tokens in self.exact_tokens])
+
+        if not is_match.any():
+            return None, 0
+
+        similarities = np.where(is_match, self.vectors @ get_ngram_vector(question), -1)
+        closest = int(np.argmax(similarities))
+
+        return closest, float(similarities[closest])
+
+_loaded_indexes: "OrderedDict[uuid.UUID, QuestionIndex]" = OrderedDict()
+_loaded_indexes_lock = threading.Lock()
+
+class ReusedAnswer:
+    """
+    A previous answer to a question similar to the one being asked
+
+    Attributes:
+        question (str): The question that was answered
+        answer (str): The answer
+        similarity (float): The cosine similarity of the two questions
+    """
+    question: str
+    answer: str
+    similarity: float
+
+    def __init__(self, question: str, answer: str, similarity: float) -> None:
+        self.question = question
+        self.answer = answer
+        self.similarity = similarity
+
+class AnswerReuseService:
+    """
+    Shares answers to opening questions about a lesson between students. Lookups read from Redis
+    synchronously, so async callers run them in a worker thread.
+    """
+    def is_reusable(self, question: str) -> bool:
+        """
+        Whether answers to a question may be reused, or stored for reuse
+        """
+        return not _CODE_PATTERN.search(question)
+
+    def find_answer(self, lesson_id: uuid.UUID, question: str) -> Tuple[Optional[ReusedAnswer], float]:
+        """
+        Finds a previous answer to an opening question about a lesson which is similar enough to reuse
+
+        Args:
+            lesson_id (uuid.UUID): The lesson the question is about
+            question (str): The student's question
+
+        Returns:
+            Tuple[Optional[ReusedAnswer], float]: The answer, or None when no question was similar enough,
+            and the similarity of the closest question
+        """
+        if not self.is_reusable(question):
+            return None, 0
+
+        try:
+            index = self._get_index(lesson_id)
+            closest, similarity = index.find_closest(question)
+
+            if closest is None or similarity < get_lesson_answer_reuse_threshold():
+                return None, similarity
+
+            answer = get_key(f"{ANSWER_KEY_PREFIX}{index.answer_ids[closest]}")
+        except Exception as e:
+            logger.warning(f"Failed to look up answers for lesson {lesson_id}: {e}")
+            return None, 0
+
+        if answer is None:
+            return None, similarity
+
+        return ReusedAnswer(index.questions[closest], answer.decode("utf-8"), similarity), similarity
+
+    def add_answer(self, lesson_id: uuid.UUID, question: str, answer: str) -> None:
+        """
+        Stores the answer to an opening question about a lesson so similar questions can reuse it
+
+        Args:
+            lesson_id (uuid.UUID): The lesson the question is about
+            question (str): The student's question
+            answer (str): The model's answer
+        """
+        if not self.is_reusable(question):
+            return
+
+        answer_id = uuid.uuid4().hex
+
+        try:
+            # The answer is stored first, so it exists by the time its question can be found
+            set_key(f"{ANSWER_KEY_PREFIX}{answer_id}", answer, ANSWER_EXPIRATION_SECONDS)
+            push_to_list(
+                f"{QUESTIONS_KEY_PREFIX}{lesson_id}",
+                json.dumps({"id": answer_id, "question": question}),
+                MAX_QUESTIONS_PER_LESSON,
+                ANSWER_EXPIRATION_SECONDS
+            )
+        except Exception as e:
+            logger.warning(f"Failed to store answer for lesson {lesson_id}: {e}")
+
+    def _get_index(self, lesson_id: uuid.UUID) -> QuestionIndex:
+        key = f"{QUESTIONS_KEY_PREFIX}{lesson_id}"
+
+        with _loaded_indexes_lock:
+            index = _loaded_indexes.get(lesson_id)
+
+        # Questions are only ever appended, so the newest ID tells whether the vectors are up to date
+        # without reading the whole list
+        if index:
+            newest = get_list_item(key, -1)
+
+            if index.answer_ids[-1:] == ([json.loads(newest)["id"]] if newest else []):
+                with _loaded_indexes_lock:
+                    if lesson_id in _loaded_indexes:
+                        _loaded_indexes.move_to_end(lesson_id)
+
+                return index
+
+        index = QuestionIndex([json.loads(entry) for entry in get_list(key)])
+
+        with _loaded_indexes_lock:
+            _loaded_indexes[lesson_id] = index
+            _loaded_indexes.move_to_end(lesson_id)
+
+            while len(_loaded_indexes) > MAX_LOADED_LESSONS:
+                _loaded_indexes.popitem(last=False)
+
+        return index
+
+def get_exact_tokens(question: str) -> FrozenSet[str]:
+    return frozenset(_EXACT_TOKEN_PATTERN.findall(question))
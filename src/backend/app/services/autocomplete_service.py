@@ -2,6 +2,7 @@ from typing import List
 
 from ai.prompts.autocomplete import AutocompletePrompt
 from common.cache import add_to_set, get_set
+from config import get_autocomplete_max_options
 from domain.enums.autocomplete_enums import AutocompleteLibrarySubject
 
 class AutocompleteService:
@@ -18,7 +19,7 @@ class AutocompleteService:
         
         prompt_input = get_programming_languages_input(disciplines, query)
         prompt = AutocompletePrompt().with_input(prompt_input)
-        options = prompt.get_options()
+        options = prompt.get_options(max_options=get_autocomplete_max_options())
         
         add_to_set(cache_key, options)
         
@@ -46,7 +47,7 @@ class AutocompleteService:
         
         prompt_input = get_library_input(subjects, languages, query)
         prompt = AutocompletePrompt().with_input(prompt_input)
-        options = prompt.get_options()
+        options = prompt.get_options(max_options=get_autocomplete_max_options())
         
         add_to_set(cache_key, options)
         
@@ -64,7 +65,7 @@ class AutocompleteService:
         
         prompt_input = get_educational_institutions_input(query)
         prompt = AutocompletePrompt().with_input(prompt_input)
-        options = prompt.get_options()
+        options = prompt.get_options(max_options=get_autocomplete_max_options())
         
         add_to_set(cache_key, options)
         
@@ -83,7 +84,7 @@ class AutocompleteService:
         
         prompt_input = get_educational_focuses_input(school_name, query)
         prompt = AutocompletePrompt().with_input(prompt_input)
-        options = prompt.get_options()
+        options = prompt.get_options(max_options=get_autocomplete_max_options())
         
         add_to_set(cache_key, options)
         
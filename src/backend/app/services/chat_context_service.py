@@ -0,0 +1,265 @@
+import asyncio
+import json
+import logging
+import uuid
+from datetime import datetime
+from typing import List, Optional, Set
+from fastapi import Depends
+from ai.common import BaseChatMessage, BaseToolCallWithResult, ChatRole
+from ai.prompts import ConversationSummaryPrompt
+from ai.util import estimate_tokens, estimate_message_tokens, estimate_messages_tokens
+from app.services import ChatHistoryService
+from common.cache import get_key, set_key, set_key_if_not_exists, delete_key
+from config import get_chat_context_token_budget, get_chat_history_message_limit
+from domain.schema.chat.chat_message import ChatMessage
+
+logger = logging.getLogger("ChatContextService")
+
+SUMMARY_EXPIRATION_SECONDS = 60 * 60 * 24 * 30
+COMPACTION_LOCK_SECONDS = 120
+
+# History always gets at least this many tokens, even when the fixed parts of the prompt exceed the budget
+MIN_HISTORY_TOKENS = 1000
+
+# Compaction starts once history fills this fraction of its budget, so the summary is ready before
+# messages have to be dropped
+COMPACTION_TRIGGER_RATIO = 0.8
+
+# Compaction keeps this fraction of the history budget as verbatim messages, so it only runs every few turns
+COMPACTION_TARGET_RATIO = 0.5
+
+_compaction_tasks: Set[asyncio.Task] = set()
+
+class ChatContext:
+    """
+    The part of a chat session that fits in the model's context
+
+    Attributes:
+        summary (Optional[str]): A summary of the messages that were compacted
+        messages (List[BaseChatMessage]): The most recent messages, oldest first
+        needs_compaction (bool): Whether the session's history has outgrown its token budget
+    """
+    summary: Optional[str]
+    messages: List[BaseChatMessage]
+    needs_compaction: bool
+
+    def __init__(self, summary: Optional[str], messages: List[BaseChatMessage], needs_compaction: bool) -> None:
+        self.summary = summary
+        self.messages = messages
+        self.needs_compaction = needs_compaction
+
+class ChatSummary:
+    summary: Optional[str]
+    summarized_through: Optional[datetime]
+
+    def __init__(self, summary: Optional[str] = None, summarized_through: Optional[datetime] = None) -> None:
+        self.summary = summary
+        self.summarized_through = summarized_through
+
+class ChatContextService:
+    chat_history_service: ChatHistoryService
+
+    def __init__(
+        self,
+        chat_history_service: ChatHistoryService = Depends(ChatHistoryService)
+    ):
+        self.chat_history_service = chat_history_service
+
+    def get_context(
+        self,
+        session_id: uuid.UUID,
+        reserved_tokens: int
+    ) -> ChatContext:
+        """
+        Loads as much of a chat session's history as fits in the token budget, along with the summary
+        of any messages that have already been compacted
+
+        Args:
+            session_id (uuid.UUID): The chat session
+            reserved_tokens (int): Tokens taken by the rest of the prompt, such as the system prompt and lesson content
+
+        Returns:
+            ChatContext: The summary and messages to send to the model
+        """
+        chat_summary = self._get_summary(session_id)
+        history_budget = get_history_token_budget(reserved_tokens) - estimate_tokens(chat_summary.summary)
+
+        records = self.chat_history_service.get_messages(
+            session_id,
+            since=chat_summary.summarized_through,
+            limit=get_chat_history_message_limit()
+        )
+
+        messages = get_chat_messages(records)
+        kept = fit_to_budget(messages, history_budget)
+
+        logger.info(f"Session {session_id} context: {len(kept)}/{len(messages)} messages, summary: {chat_summary.summary is not None}")
+
+        return ChatContext(
+            summary=chat_summary.summary,
+            messages=kept,
+            needs_compaction=estimate_messages_tokens(messages) > history_budget * COMPACTION_TRIGGER_RATIO
+        )
+
+    def schedule_compaction(
+        self,
+        session_id: uuid.UUID,
+        reserved_tokens: int
+    ) -> None:
+        """
+        Compacts a session's older messages in the background so the next response does not wait on it
+        """
+        task = asyncio.create_task(self.compact(session_id, reserved_tokens))
+
+        # The event loop only keeps weak references to tasks
+        _compaction_tasks.add(task)
+        task.add_done_callback(_compaction_tasks.discard)
+
+    async def compact(
+        self,
+        session_id: uuid.UUID,
+        reserved_tokens: int
+    ) -> None:
+        """
+        Folds the oldest messages of a session into its rolling summary until the remaining messages
+        take up a fraction of the history budget
+
+        Args:
+            session_id (uuid.UUID): The chat session
+            reserved_tokens (int): Tokens taken by the rest of the prompt
+        """
+        lock_key = f"chat-summary-lock:{session_id}"
+
+        try:
+            if not await asyncio.to_thread(set_key_if_not_exists, lock_key, "1", COMPACTION_LOCK_SECONDS):
+                return
+        except Exception as e:
+            logger.warning(f"Unable to lock session {session_id} for compaction: {e}")
+            return
+
+        try:
+            # Redis and the database are read on worker threads, since compaction runs on the event loop
+            chat_summary = await asyncio.to_thread(self._get_summary, session_id)
+            records = await asyncio.to_thread(
+                self.chat_history_service.get_messages,
+                session_id,
+                since=chat_summary.summarized_through,
+                limit=None
+            )
+
+            messages = get_chat_messages(records)
+            target = int(get_history_token_budget(reserved_tokens) * COMPACTION_TARGET_RATIO)
+            kept = fit_to_budget(messages, target)
+            compacted_count = len(messages) - len(kept)
+
+            if compacted_count == 0:
+                return
+
+            summary = await ConversationSummaryPrompt().get_summary(
+                previous_summary=chat_summary.summary,
+                messages=messages[:compacted_count]
+            )
+
+            await asyncio.to_thread(
+                self._set_summary,
+                session_id,
+                ChatSummary(
+                    summary=summary,
+                    summarized_through=records[compacted_count - 1].created_at_utc
+                )
+            )
+
+            logger.info(f"Compacted {compacted_count} messages in session {session_id}")
+        except Exception as e:
+            logger.error(f"Failed to compact chat session {session_id}: {e}")
+        finally:
+            try:
+                await asyncio.to_thread(delete_key, lock_key)
+            except Exception as e:
+                logger.warning(f"Failed to release compaction lock for session {session_id}: {e}")
+
+    def _get_summary(self, session_id: uuid.UUID) -> ChatSummary:
+        try:
+            value = get_key(get_summary_key(session_id))
+        except Exception as e:
+            logger.warning(f"Unable to read summary for session {session_id}: {e}")
+            return ChatSummary()
+
+        if not value:
+            return ChatSummary()
+
+        data = json.loads(value)
+
+        return ChatSummary(
+            summary=data["summary"],
+            summarized_through=datetime.fromisoformat(data["summarized_through"])
+        )
+
+    def _set_summary(self, session_id: uuid.UUID, chat_summary: ChatSummary) -> None:
+        set_key(
+            get_summary_key(session_id),
+            json.dumps({
+                "summary": chat_summary.summary,
+                "summarized_through": chat_summary.summarized_through.isoformat()
+            }),
+            SUMMARY_EXPIRATION_SECONDS
+        )
+
+def get_summary_key(session_id: uuid.UUID) -> str:
+    return f"chat-summary:{session_id}"
+
+def get_history_token_budget(reserved_tokens: int) -> int:
+    return max(get_chat_context_token_budget() - reserved_tokens, MIN_HISTORY_TOKENS)
+
+def fit_to_budget(
+    messages: List[BaseChatMessage],
+    budget: int
+) -> List[BaseChatMessage]:
+    """
+    Returns the most recent messages whose combined size fits in the budget
+    """
+    used = 0
+    start = len(messages)
+
+    while start > 0:
+        tokens = estimate_message_tokens(messages[start - 1])
+
+        if used + tokens > budget:
+            break
+
+        used += tokens
+        start -= 1
+
+    # Never begin the history with a tool result or an answer to a question that was dropped
+    while start < len(messages) and messages[start].role != ChatRole.USER:
+        start += 1
+
+    return messages[start:]
+
+def get_chat_messages(records: List[ChatMessage]) -> List[BaseChatMessage]:
+    """
+    Converts chat message records into a representation for the AI
+
+    Args:
+        records (List[ChatMessage]): The chat messages to convert
+
+    Returns:
+        List[BaseChatMessage]: The converted messages
+    """
+    return [
+        BaseChatMessage(
+            role=ChatRole.USER if record.is_user else ChatRole.AGENT,
+            message=record.content,
+            images=[],
+            tool_calls=[
+                BaseToolCallWithResult(
+                    id=tool_call.id,
+                    name=tool_call.tool_name,
+                    arguments=tool_call.json_arguments,
+                    result=tool_call.result
+                )
+                for tool_call in record.tool_calls
+            ]
+        )
+        for record in records
+    ]
@@ -0,0 +1,319 @@
+import base64
+import binascii
+import json
+import logging
+import uuid
+from datetime import datetime
+from typing import List, Optional, Tuple
+from fastapi import Depends
+from app.repositories import ChatRepository
+from common.cache import run_script
+from config import get_chat_history_message_limit, get_chat_history_page_size, is_chat_history_cache_enabled
+from domain.dto.chat import ChatTurnMessageDto
+from domain.schema.chat import ChatMessage, ChatToolCall
+
+logger = logging.getLogger("ChatHistoryService")
+
+HISTORY_KEY_PREFIX = "chat-history:"
+VERSIONS_KEY_PREFIX = "chat-history-version:"
+HISTORY_EXPIRATION_SECONDS = 60 * 60 * 24
+
+# Reads the versions of a session's history and its cached messages together, so they always match
+#
+# KEYS: versions hash, messages list
+# Returns: {turns written, turns cached or -1, messages oldest first}
+READ_SCRIPT = """
+local versions = redis.call('HMGET', KEYS[1], 'written', 'cached')
+
+return {versions[1] or '0', versions[2] or '-1', redis.call('LRANGE', KEYS[2], 0, -1)}
+"""
+
+# Counts a turn written to the database and appends its messages to the cached window. When the window
+# is missing a turn, such as one written while it was being filled, it is dropped instead and refilled
+# from the database by the next read.
+#
+# KEYS: versions hash, messages list
+# ARGV: most messages kept, expiration, messages...
+APPEND_SCRIPT = """
+local written = redis.call('HINCRBY', KEYS[1], 'written', 1)
+local cached = tonumber(redis.call('HGET', KEYS[1], 'cached'))
+
+if cached == written - 1 then
+    if #ARGV > 2 then
+        redis.call('RPUSH', KEYS[2], unpack(ARGV, 3))
+        redis.call('LTRIM', KEYS[2], -tonumber(ARGV[1]), -1)
+        redis.call('EXPIRE', KEYS[2], ARGV[2])
+    end
+
+    redis.call('HSET', KEYS[1], 'cached', written)
+else
+    redis.call('DEL', KEYS[2])
+    redis.call('HDEL', KEYS[1], 'cached')
+end
+
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+
+return written
+"""
+
+# Replaces the cached window with messages loaded from the database, unless a turn was written since
+# they were loaded
+#
+# KEYS: versions hash, messages list
+# ARGV: turns written when the messages were loaded, expiration, messages...
+FILL_SCRIPT = """
+local written = tonumber(redis.call('HGET', KEYS[1], 'written') or '0')
+
+if written ~= tonumber(ARGV[1]) then
+    return 0
+end
+
+redis.call('DEL', KEYS[2])
+
+if #ARGV > 2 then
+    redis.call('RPUSH', KEYS[2], unpack(ARGV, 3))
+    redis.call('EXPIRE', KEYS[2], ARGV[2])
+end
+
+redis.call('HSET', KEYS[1], 'written', written, 'cached', written)
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+
+return 1
+"""
+
+# Counts a turn which could not be appended and drops the window, so it is refilled from the database
+#
+# KEYS: versions hash, messages list
+# ARGV: expiration
+INVALIDATE_SCRIPT = """
+redis.call('HINCRBY', KEYS[1], 'written', 1)
+redis.call('HDEL', KEYS[1], 'cached')
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+redis.call('DEL', KEYS[2])
+
+return 0
+"""
+
+class CachedHistory:
+    """
+    The cached window of a session's most recent messages
+
+    Attributes:
+        written (int): Turns written to the session when the window was read
+        messages (List[ChatMessage]): The messages in the window, oldest first, or None when it is missing or out of date
+        is_complete (bool): Whether the window holds every message in the session
+    """
+    written: int
+    messages: Optional[List[ChatMessage]]
+    is_complete: bool
+
+    def __init__(self, written: int, messages: Optional[List[ChatMessage]] = None, is_complete: bool = False) -> None:
+        self.written = written
+        self.messages = messages
+        self.is_complete = is_complete
+
+class ChatHistoryService:
+    """
+    Serves the recent messages of chat sessions from a window cached in Redis, so hot sessions do not
+    query Postgres on every message. The database remains the source of truth: every turn written to it
+    is counted, and a window which has missed a turn is dropped and loaded again.
+    """
+    chat_repository: ChatRepository
+
+    def __init__(
+        self,
+        chat_repository: ChatRepository = Depends(ChatRepository)
+    ):
+        self.chat_repository = chat_repository
+
+    def get_messages(
+        self,
+        session_id: uuid.UUID,
+        since: Optional[datetime] = None,
+        limit: Optional[int] = None,
+        before: Optional[Tuple[datetime, uuid.UUID]] = None
+    ) -> List[ChatMessage]:
+        """
+        Gets the most recent messages in a chat session, from the cache when its window covers them
+
+        Args:
+            session_id (uuid.UUID): The chat session to get messages for
+            since (Optional[datetime]): Only include messages created after this time
+            limit (Optional[int]): The maximum number of messages to return, or None for all of them
+            before (Optional[Tuple[datetime, uuid.UUID]]): Only include messages older than the message with this
+            creation time and ID. Older pages are rarely read twice, so they always come from the database.
+
+        Returns:
+            List[ChatMessage]: The messages, oldest first
+        """
+        if before is not None or not is_chat_history_cache_enabled():
+            return self.chat_repository.get_chat_messages(session_id, since=since, limit=limit, before=before)
+
+        try:
+            cached = self._read(session_id)
+        except Exception as e:
+            logger.warning(f"Failed to read cached history for session {session_id}: {e}")
+            return self.chat_repository.get_chat_messages(session_id, since=since, limit=limit)
+
+        if cached.messages is None:
+            window = self.chat_repository.get_chat_messages(session_id, limit=get_window_size())
+            self._fill(session_id, cached.written, window)
+
+            cached = CachedHistory(cached.written, window, len(window) < get_window_size())
+
+        messages = select_messages(cached, since, limit)
+
+        if messages is None:
+            # Older messages than the window holds, only the database has them
+            return self.chat_repository.get_chat_messages(session_id, since=since, limit=limit)
+
+        return messages
+
+    def add_turn(
+        self,
+        session_id: uuid.UUID,
+        messages: List[ChatTurnMessageDto]
+    ) -> None:
+        """
+        Writes the messages of a chat turn to the database, then appends them to the cached window
+
+        Args:
+            session_id (uuid.UUID): The chat session the turn belongs to
+            messages (List[ChatTurnMessageDto]): The messages in the order they were sent
+        """
+        records = self.chat_repository.add_chat_turn(session_id, messages)
+
+        if not is_chat_history_cache_enabled():
+            return
+
+        try:
+            run_script(
+                APPEND_SCRIPT,
+                get_history_keys(session_id),
+                [get_window_size(), HISTORY_EXPIRATION_SECONDS] + [serialize_message(record) for record in records]
+            )
+        except Exception as e:
+            logger.error(f"Failed to append turn to cached history for session {session_id}: {e}")
+            self._invalidate(session_id)
+
+    def _read(self, session_id: uuid.UUID) -> CachedHistory:
+        written, cached, entries = run_script(READ_SCRIPT, get_history_keys(session_id), [])
+
+        if int(written) != int(cached):
+            return CachedHistory(int(written))
+
+        # A trimmed window only holds the most recent messages, an untrimmed one holds them all
+        return CachedHistory(
+            int(written),
+            [deserialize_message(session_id, entry) for entry in entries],
+            len(entries) < get_window_size()
+        )
+
+    def _fill(self, session_id: uuid.UUID, written: int, messages: List[ChatMessage]) -> None:
+        try:
+            run_script(
+                FILL_SCRIPT,
+                get_history_keys(session_id),
+                [written, HISTORY_EXPIRATION_SECONDS] + [serialize_message(message) for message in messages]
+            )
+        except Exception as e:
+            logger.warning(f"Failed to cache history for session {session_id}: {e}")
+
+    def _invalidate(self, session_id: uuid.UUID) -> None:
+        try:
+            run_script(INVALIDATE_SCRIPT, get_history_keys(session_id), [HISTORY_EXPIRATION_SECONDS])
+        except Exception as e:
+            logger.error(f"Failed to invalidate cached history for session {session_id}: {e}")
+
+def get_window_size() -> int:
+    # A page of history is read with one extra message to tell whether there are more
+    return max(get_chat_history_message_limit(), get_chat_history_page_size() + 1)
+
+def get_history_keys(session_id: uuid.UUID) -> List[str]:
+    return [f"{VERSIONS_KEY_PREFIX}{session_id}", f"{HISTORY_KEY_PREFIX}{session_id}"]
+
+def select_messages(
+    cached: CachedHistory,
+    since: Optional[datetime],
+    limit: Optional[int]
+) -> Optional[List[ChatMessage]]:
+    """
+    Picks the requested messages from a cached window, or None when the window does not reach back far enough
+    """
+    # A turn loaded from the database just before it was counted is appended again, so the window may repeat messages
+    unique = {message.id: message for message in cached.messages}
+    messages = sorted(unique.values(), key=lambda message: (message.created_at_utc, message.id))
+
+    selected = [message for message in messages if since is None or message.created_at_utc > since]
+    reaches_since = since is not None and messages and messages[0].created_at_utc <= since
+
+    if limit is not None and len(selected) >= limit:
+        return selected[-limit:]
+
+    if cached.is_complete or reaches_since:
+        return selected
+
+    return None
+
+def encode_cursor(message: ChatMessage) -> str:
+    """
+    Encodes the position of a message as an opaque cursor for the page of history before it
+    """
+    position = f"{message.created_at_utc.isoformat()}|{message.id}"
+
+    return base64.urlsafe_b64encode(position.encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    """
+    Decodes a cursor into the creation time and ID of the message it points to
+
+    Raises:
+        ValueError: The cursor is not one returned by encode_cursor
+    """
+    try:
+        created_at, message_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|")
+
+        return datetime.fromisoformat(created_at), uuid.UUID(message_id)
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError("Invalid history cursor")
+
+def serialize_message(message: ChatMessage) -> str:
+    return json.dumps({
+        "id": str(message.id),
+        "is_user": message.is_user,
+        "content": message.content,
+        "created_at_utc": message.created_at_utc.isoformat(),
+        "tool_calls": [
+            {
+                "id": str(tool_call.id),
+                "tool_call_id": tool_call.tool_call_id,
+                "tool_name": tool_call.tool_name,
+                "json_arguments": tool_call.json_arguments,
+                "result": tool_call.result
+            }
+            for tool_call in message.tool_calls
+        ]
+    })
+
+def deserialize_message(session_id: uuid.UUID, value: str) -> ChatMessage:
+    data = json.loads(value)
+    message_id = uuid.UUID(data["id"])
+
+    return ChatMessage(
+        id=message_id,
+        session_id=session_id,
+        is_user=data["is_user"],
+        content=data["content"],
+        created_at_utc=datetime.fromisoformat(data["created_at_utc"]),
+        tool_calls=[
+            ChatToolCall(
+                id=uuid.UUID(tool_call["id"]),
+                message_id=message_id,
+                tool_call_id=tool_call["tool_call_id"],
+                tool_name=tool_call["tool_name"],
+                json_arguments=tool_call["json_arguments"],
+                result=tool_call["result"]
+            )
+            for tool_call in data["tool_calls"]
+        ]
+    )
@@ -1,33 +1,88 @@
+import asyncio
 import uuid
 import logging
-from typing import AsyncGenerator, Generator, List, Optional
+from typing import AsyncGenerator, AsyncIterator, Dict, List, Optional
 from fastapi import Depends
-from ai.common import BaseChatMessage, BaseToolCallWithResult, ChatRole
-from app.services import UserService
+from ai.common import AsyncCompletionStream, BaseChatMessage, BaseToolCallWithResult, ChatRole
+from ai.metrics import record_answer_reuse_lookup
+from ai.util import estimate_tokens
+from app.services import (
+    UserService,
+    ChatHistoryService,
+    ChatContextService,
+    ChatStreamService,
+    LessonIndexService,
+    AnswerReuseService,
+    StreamBatch
+)
 from app.repositories import ChatRepository, CourseRepository
-from domain.schema.chat.chat_message import ChatMessage
 from domain.schema.chat.chat_session import ChatSession
+from app.services.chat_history_service import encode_cursor, decode_cursor
+from app.services.chat_stream_service import parse_event_id
 from domain.dto.chat.chat_message import ChatMessageDto
+from domain.dto.chat import ChatHistoryPageDto, ChatTurnMessageDto, ChatTurnToolCallDto
 from domain.dto.ai import CompletionChunk
 from domain.enums.chat_enums import PromptType
 from ai.prompts import LessonDiscussionPrompt
+from config import is_lesson_answer_reuse_enabled, is_chat_write_behind_enabled, get_chat_history_page_size
 
 logger = logging.getLogger("ChatService")
 
+# The most messages a client can ask for in one page of history
+MAX_HISTORY_PAGE_SIZE = 200
+
+# Attempts made to write a turn behind its response, and the delay before the second, doubling after each
+TURN_WRITE_ATTEMPTS = 3
+TURN_WRITE_RETRY_SECONDS = 0.5
+
+class PendingTurnWrites:
+    """
+    Turns of a session written behind their responses which are not in the database yet
+
+    Attributes:
+        turns (List[List[ChatTurnMessageDto]]): The turns, oldest first
+        task (Optional[asyncio.Task]): The task writing them, done once they are written or writing failed
+    """
+    turns: List[List[ChatTurnMessageDto]]
+    task: Optional[asyncio.Task]
+
+    def __init__(self) -> None:
+        self.turns = []
+        self.task = None
+
+# Turns still being written for each session, so the next turn in the same process reads a complete history.
+# Other processes do not know about them, which is why writing behind is off by default.
+_pending_turn_writes: Dict[uuid.UUID, PendingTurnWrites] = {}
+
 class ChatService:
     user_service: UserService
     chat_repository: ChatRepository
     course_repository: CourseRepository
+    chat_history_service: ChatHistoryService
+    chat_stream_service: ChatStreamService
+    chat_context_service: ChatContextService
+    lesson_index_service: LessonIndexService
+    answer_reuse_service: AnswerReuseService
     
     def __init__(
         self, 
         user_service: UserService = Depends(UserService),
         chat_repository: ChatRepository = Depends(ChatRepository),
-        course_repository: CourseRepository = Depends(CourseRepository)
+        course_repository: CourseRepository = Depends(CourseRepository),
+        chat_history_service: ChatHistoryService = Depends(ChatHistoryService),
+        chat_stream_service: ChatStreamService = Depends(ChatStreamService),
+        chat_context_service: ChatContextService = Depends(ChatContextService),
+        lesson_index_service: LessonIndexService = Depends(LessonIndexService),
+        answer_reuse_service: AnswerReuseService = Depends(AnswerReuseService)
     ):
         self.user_service = user_service
         self.chat_repository = chat_repository
         self.course_repository = course_repository
+        self.chat_history_service = chat_history_service
+        self.chat_stream_service = chat_stream_service
+        self.chat_context_service = chat_context_service
+        self.lesson_index_service = lesson_index_service
+        self.answer_reuse_service = answer_reuse_service
 
     async def create_session(
         self,
@@ -40,7 +95,8 @@ class ChatService:
         if not user:
             raise ValueError("User not found")
         
-        session = self.chat_repository.create_chat_session(
+        session = await asyncio.to_thread(
+            self.chat_repository.create_chat_session,
             user_id=user.id,
             prompt_type=prompt_type.value,
             resource_id=resource_id
@@ -51,19 +107,109 @@ class ChatService:
     async def get_history(
         self,
         user_id: str,
-        session_id: uuid.UUID
-    ) -> List[ChatMessageDto]:
+        session_id: uuid.UUID,
+        before: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> ChatHistoryPageDto:
+        """
+        Gets a page of a chat session's history, newest page first
+
+        Args:
+            user_id (str): The user requesting the history
+            session_id (uuid.UUID): The chat session
+            before (Optional[str]): The cursor of the page to continue from, or None for the most recent messages
+            limit (Optional[int]): The number of messages in the page, or None for the configured page size
+
+        Returns:
+            ChatHistoryPageDto: The messages oldest first, and the cursor of the previous page when there is one
+        """
         user = await self.user_service.get_user("id", user_id)
         
         if not user:
             raise ValueError("User not found")
         
-        messages = self.chat_repository.get_chat_messages(session_id)
+        page_size = min(limit or get_chat_history_page_size(), MAX_HISTORY_PAGE_SIZE)
+        position = decode_cursor(before) if before else None
         
-        return [
-            ChatMessageDto.model_validate(message)
-            for message in messages
-        ]
+        await self._wait_for_turn_write(session_id)
+        
+        # One extra message tells whether there is an older page
+        messages = await asyncio.to_thread(
+            self.chat_history_service.get_messages,
+            session_id,
+            limit=page_size + 1,
+            before=position
+        )
+        has_more = len(messages) > page_size
+        messages = messages[-page_size:]
+        
+        return ChatHistoryPageDto.model_construct(
+            messages=[ChatMessageDto.from_record(message) for message in messages],
+            next_cursor=encode_cursor(messages[0]) if has_more else None
+        )
+    
+    async def start_response(
+        self,
+        user_id: str,
+        session_id: uuid.UUID,
+        message: str
+    ) -> Optional[AsyncIterator[Optional[StreamBatch]]]:
+        """
+        Starts generating a response in the background and reads it back from its stream, so the response
+        is completed and can be resumed when the client's connection drops. Nothing is generated when the
+        stream cannot be created.
+
+        Args:
+            user_id (str): The user sending the message
+            session_id (uuid.UUID): The chat session
+            message (str): The user's message
+
+        Returns:
+            Optional[AsyncIterator[Optional[StreamBatch]]]: The response's batches of chunks, or None while waiting
+            for more. None when the response should be generated with get_response and sent directly instead.
+        """
+        response = self.get_response(user_id, session_id, message)
+        turn_id = await self.chat_stream_service.start(session_id, response)
+        
+        if turn_id is None:
+            # Never started, so nothing was generated
+            await response.aclose()
+            return None
+        
+        return self.chat_stream_service.read(session_id, turn_id=turn_id)
+    
+    async def resume_response(
+        self,
+        user_id: str,
+        session_id: uuid.UUID,
+        last_event_id: Optional[str] = None
+    ) -> AsyncIterator[Optional[StreamBatch]]:
+        """
+        Reads the latest response in a session from its stream, without generating it again
+
+        Args:
+            user_id (str): The user reading the response
+            session_id (uuid.UUID): The chat session
+            last_event_id (Optional[str]): The last event the client received, or None to read the response from the start
+
+        Returns:
+            AsyncIterator[Optional[StreamBatch]]: The response's remaining batches of chunks, or None while waiting for more
+        """
+        user = await self.user_service.get_user("id", user_id)
+        
+        if not user:
+            raise ValueError("User not found")
+        
+        session = await asyncio.to_thread(self.chat_repository.get_session, session_id)
+        
+        if not session or session.user_id != user.id:
+            raise ValueError("Session not found")
+        
+        # Checked here since the stream is only read once the response starts
+        if last_event_id:
+            parse_event_id(last_event_id)
+        
+        return self.chat_stream_service.read(session_id, last_event_id=last_event_id)
     
     async def get_response(
         self, 
@@ -76,119 +222,191 @@ class ChatService:
         if not user:
             raise ValueError("User not found")
         
-        session = self.chat_repository.get_session(session_id)
+        session = await asyncio.to_thread(self.chat_repository.get_session, session_id)
         
         logger.info(f"Preparing to generate chat response for user {user.id}, session {session.id}")
+        
+        await self._wait_for_turn_write(session_id)
 
-        response_generator = self.get_prompt_generator(
+        response_stream = await self.get_prompt_stream(
             session=session,
             input=message
         )
         
         # Iterate until complete, then save messages to the database
-        while True:
-            try:
-                yield next(response_generator)
-            except StopIteration as e:
-                messages: List[BaseChatMessage] = e.value
-                
-                self._add_message(
-                    session_id=session_id, 
-                    is_user=True, 
-                    message=message
-                )
-                
-                for new_message in messages:
-                    self._add_message(
-                        session_id=session_id, 
-                        is_user=new_message.role == ChatRole.USER, 
-                        message=new_message.message, 
-                        tool_calls=new_message.tool_calls
-                    )
-                
-                break
-    
-    def _get_chat_messages(
-        self,
-        records: List[ChatMessage]
-    ) -> List[BaseChatMessage]:
-        """
-        Converts chat message records into a representation for the AI
-
-        Args:
-            records (List[ChatMessage]): The chat messages to convert
-
-        Returns:
-            List[BaseChatMessage]: The converted messages
-        """
+        async for chunk in response_stream:
+            yield chunk
+            
+        messages: List[BaseChatMessage] = response_stream.responses
         
-        return [
-            BaseChatMessage(
-                role=ChatRole.USER if record.is_user else ChatRole.AGENT,
-                message=record.content,
-                png_images=[],
+        # The user message and every response are written together in one transaction
+        turn = [ChatTurnMessageDto(is_user=True, content=message)] + [
+            ChatTurnMessageDto(
+                is_user=new_message.role == ChatRole.USER,
+                content=new_message.message,
                 tool_calls=[
-                    BaseToolCallWithResult(
-                        id=tool_call.id,
-                        name=tool_call.tool_name,
-                        arguments=tool_call.json_arguments,
-                        result=tool_call.result
-                    )
-                    for tool_call in record.tool_calls
+                    self._get_turn_tool_call(tool_call)
+                    for tool_call in new_message.tool_calls or []
                 ]
             )
-            for record in records
+            for new_message in messages
         ]
-            
-    def _add_message(
-        self, 
-        session_id: uuid.UUID, 
-        is_user: bool, 
-        message: str,
-        tool_calls: List[BaseToolCallWithResult] = []
-    ) -> None:
-        added_msg = self.chat_repository.add_chat_message(
-            session_id=session_id, 
-            is_user=is_user, 
-            content=message
+        
+        if is_chat_write_behind_enabled():
+            # Lets the response close once the last chunk is sent rather than after the write
+            self._write_turn_behind(session_id, turn)
+        else:
+            await asyncio.to_thread(self.chat_history_service.add_turn, session_id, turn)
+    
+    def _get_turn_tool_call(self, tool_call: BaseToolCallWithResult) -> ChatTurnToolCallDto:
+        return ChatTurnToolCallDto(
+            call_id=tool_call.id,
+            tool_name=tool_call.name,
+            arguments=tool_call.arguments,
+            result=tool_call.result
         )
+    
+    def _write_turn_behind(self, session_id: uuid.UUID, turn: List[ChatTurnMessageDto]) -> None:
+        pending = _pending_turn_writes.setdefault(session_id, PendingTurnWrites())
+        pending.turns.append(turn)
+        
+        # Turns from the same session are written in order by a single task
+        if pending.task is None or pending.task.done():
+            pending.task = asyncio.create_task(self._write_pending_turns(session_id, pending))
+        
+    async def _write_pending_turns(self, session_id: uuid.UUID, pending: PendingTurnWrites) -> None:
+        while pending.turns:
+            for attempt in range(TURN_WRITE_ATTEMPTS):
+                try:
+                    await asyncio.to_thread(self.chat_history_service.add_turn, session_id, pending.turns[0])
+                    break
+                except Exception as e:
+                    logger.error(f"Failed to write chat turn for session {session_id}, attempt {attempt + 1}: {e}")
+                    
+                    if attempt + 1 == TURN_WRITE_ATTEMPTS:
+                        # Kept so the next request for the session tries again
+                        return
+                    
+                    await asyncio.sleep(TURN_WRITE_RETRY_SECONDS * 2 ** attempt)
+            
+            pending.turns.pop(0)
+        
+        if _pending_turn_writes.get(session_id) is pending:
+            del _pending_turn_writes[session_id]
+        
+    async def _wait_for_turn_write(self, session_id: uuid.UUID) -> None:
+        """
+        Waits for turns of the session still being written. Turns which could not be written are tried again,
+        and the request fails when they still cannot be rather than reading a history without them.
+        """
+        pending = _pending_turn_writes.get(session_id)
+        
+        if pending is None:
+            return
+        
+        if not pending.task.done():
+            await asyncio.wait([pending.task])
         
-        if tool_calls:
-            for tool_call in tool_calls:
-                self.chat_repository.add_tool_message(
-                    message_id=added_msg.id,
-                    call_id=tool_call.id,
-                    tool_name=tool_call.name,
-                    arguments=tool_call.arguments,
-                    result=tool_call.result
-                )
+        # Another request may have started writing them again while this one waited
+        if pending.turns and pending.task.done():
+            pending.task = asyncio.create_task(self._write_pending_turns(session_id, pending))
+        
+        if not pending.task.done():
+            await asyncio.wait([pending.task])
+        
+        if pending.turns:
+            raise RuntimeError(f"Earlier chat turns for session {session_id} could not be saved")
                 
-    def get_prompt_generator(
+    def _store_answer(
+        self,
+        lesson_id: uuid.UUID,
+        question: str,
+        stream: AsyncCompletionStream
+    ) -> AsyncCompletionStream:
+        """
+        Passes the stream through, storing the answer for reuse once it is complete. Answers which called
+        tools are not stored since replaying them would skip the tool calls.
+        """
+        async def generator():
+            async for chunk in stream:
+                yield chunk
+                
+            answer = stream.responses[-1] if len(stream.responses) == 1 else None
+            
+            if answer and answer.message and not answer.tool_calls:
+                await asyncio.to_thread(self.answer_reuse_service.add_answer, lesson_id, question, answer.message)
+        
+        return AsyncCompletionStream(
+            generator=generator(),
+            responses=stream.responses
+        )
+    
+    async def get_prompt_stream(
         self,
         session: ChatSession,
         input: str
-    ) -> Generator[CompletionChunk, None, List[BaseChatMessage]]:
+    ) -> AsyncCompletionStream:
+        """
+        Builds the prompt for a message and starts its response. The database and Redis clients are
+        synchronous, so every lookup runs on a worker thread rather than the event loop.
+        """
         p_type = PromptType(session.prompt_type)
         
-        messages = self.chat_repository.get_chat_messages(session.id)
-        model_messages = self._get_chat_messages(messages)
-        
         if p_type == PromptType.LESSON:
             if session.resource_id is None:
                 raise ValueError("Resource ID is required for lesson prompt")
             
-            lesson = self.course_repository.get_lesson(session.resource_id)
+            lesson = await asyncio.to_thread(self.course_repository.get_lesson, session.resource_id)
+            
+            # Long lessons are narrowed down to the passages relevant to the message
+            lesson_context = await asyncio.to_thread(
+                self.lesson_index_service.get_lesson_context,
+                lesson_id=lesson.id,
+                sections=[
+                    (section.title, section.content)
+                    for section in sorted(lesson.sections, key=lambda section: section.order)
+                ],
+                question=input
+            )
             
             prompt = LessonDiscussionPrompt()
-            return prompt.get_responses(
-                history=model_messages,
+            
+            # History gets whatever the token budget leaves after the fixed parts of the prompt
+            reserved_tokens = sum(
+                estimate_tokens(text)
+                for text in [prompt.system_prompt, lesson_context.outline, lesson_context.excerpts, input]
+            )
+            
+            context = await asyncio.to_thread(self.chat_context_service.get_context, session.id, reserved_tokens)
+            
+            if context.needs_compaction:
+                self.chat_context_service.schedule_compaction(session.id, reserved_tokens)
+            
+            # Opening questions do not depend on an earlier conversation, so answers to them can be shared
+            can_reuse_answer = (
+                not context.messages
+                and not context.summary
+                and is_lesson_answer_reuse_enabled()
+                and self.answer_reuse_service.is_reusable(input)
+            )
+            reused_answer = None
+            
+            if can_reuse_answer:
+                reused_answer, similarity = await asyncio.to_thread(self.answer_reuse_service.find_answer, lesson.id, input)
+                record_answer_reuse_lookup(type(prompt).__name__, reused_answer is not None, similarity)
+            
+            stream = prompt.get_responses(
+                history=context.messages,
+                history_summary=context.summary,
                 message=input,
-                lesson_content="\n\n".join(
-                    [
-                        f"{section.title}\n{section.content}" 
-                        for section in lesson.sections
-                    ]
-                )
+                lesson_content=lesson_context.outline,
+                lesson_excerpts=lesson_context.excerpts,
+                reused_answer=reused_answer.answer if reused_answer else None
             )
             
+            if can_reuse_answer and reused_answer is None:
+                return self._store_answer(lesson.id, input, stream)
+            
+            return stream
+            
         raise ValueError("Invalid prompt type")
\ No newline at end of file
@@ -0,0 +1,205 @@
+import asyncio
+import json
+import logging
+import re
+import time
+import uuid
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+from app.utilities.sse import FAILED_RESPONSE_MESSAGE, coalesce_chunks
+from common.cache import add_to_stream, read_stream, get_key, set_key, key_exists
+from domain.dto.ai import CompletionChunk
+
+logger = logging.getLogger("ChatStreamService")
+
+STREAM_KEY_PREFIX = "chat-stream:"
+ACTIVE_STREAM_KEY_PREFIX = "chat-stream-active:"
+
+# Streams are kept for a while after the response completes, so a client that dropped near the end can still resume
+STREAM_EXPIRATION_SECONDS = 60 * 10
+
+# Readers wake up this often while nothing is added, so the connection can be kept alive
+READ_BLOCK_MS = 15000
+
+# Readers give up once nothing has been added for this long, such as when the process generating the response died
+MAX_IDLE_SECONDS = 120
+
+_EVENT_ID_PATTERN = re.compile(r"^([0-9a-f]{32}):(\d+-\d+)$")
+
+_relay_tasks: Set[asyncio.Task] = set()
+
+class StreamBatch:
+    """
+    Chunks of a response which were mirrored to its stream together
+
+    Attributes:
+        event_id (str): The ID a client sends as Last-Event-ID to resume after this batch
+        chunks (List[CompletionChunk]): The chunks, in order
+        error (Optional[str]): Why the response failed, set on the last batch of a response which did not complete
+    """
+    event_id: str
+    chunks: List[CompletionChunk]
+    error: Optional[str]
+
+    def __init__(self, event_id: str, chunks: List[CompletionChunk], error: Optional[str] = None) -> None:
+        self.event_id = event_id
+        self.chunks = chunks
+        self.error = error
+
+class ChatStreamService:
+    """
+    Mirrors responses being generated to Redis streams, one per session and turn, so a client whose
+    connection drops can resume from the last event it received, or attach to a response still being
+    generated, without another request to the model
+    """
+    async def start(self, session_id: uuid.UUID, chunks: AsyncIterator[CompletionChunk]) -> Optional[str]:
+        """
+        Generates a response in the background, mirroring its chunks to a stream. The response is generated
+        to the end even when no client is reading it.
+
+        Args:
+            session_id (uuid.UUID): The chat session
+            chunks (AsyncIterator[CompletionChunk]): The response
+
+        Returns:
+            Optional[str]: The ID of the turn, to read the stream with, or None when the stream could not be created.
+            The response is then left for the caller to send directly.
+        """
+        turn_id = uuid.uuid4().hex
+        key = get_stream_key(session_id, turn_id)
+
+        # The stream is created before anything is generated, so a client can attach right away and wait for
+        # the first chunk
+        try:
+            await add_to_stream(key, {"status": "started"}, STREAM_EXPIRATION_SECONDS)
+        except Exception as e:
+            logger.error(f"Failed to create stream for turn {turn_id} of session {session_id}: {e}")
+            return None
+
+        try:
+            await asyncio.to_thread(set_key, f"{ACTIVE_STREAM_KEY_PREFIX}{session_id}", turn_id, STREAM_EXPIRATION_SECONDS)
+        except Exception as e:
+            logger.warning(f"Failed to mark turn {turn_id} as active for session {session_id}: {e}")
+
+        task = asyncio.create_task(self._relay(key, chunks))
+
+        # The event loop only keeps weak references to tasks
+        _relay_tasks.add(task)
+        task.add_done_callback(_relay_tasks.discard)
+
+        return turn_id
+
+    async def read(
+        self,
+        session_id: uuid.UUID,
+        turn_id: Optional[str] = None,
+        last_event_id: Optional[str] = None
+    ) -> AsyncIterator[Optional[StreamBatch]]:
+        """
+        Reads a response from its stream until it completes, replaying what was already generated
+
+        Args:
+            session_id (uuid.UUID): The chat session
+            turn_id (Optional[str]): The turn to read, or None for the session's latest turn
+            last_event_id (Optional[str]): The ID of the last event the client received, to resume after it
+
+        Yields:
+            Optional[StreamBatch]: The batches of chunks in order, or None while waiting so the connection can be kept alive.
+            The first batch has no chunks, so the client has an ID to resume from before anything is generated.
+            A response which failed ends with a batch holding the error.
+
+        Raises:
+            ValueError: The last event ID is not one sent by this service
+        """
+        after_id = "0"
+
+        if last_event_id:
+            turn_id, after_id = parse_event_id(last_event_id)
+
+        if turn_id is None:
+            value = await asyncio.to_thread(get_key, f"{ACTIVE_STREAM_KEY_PREFIX}{session_id}")
+            turn_id = value.decode("utf-8") if value else None
+
+        if turn_id is None:
+            return
+
+        key = get_stream_key(session_id, turn_id)
+
+        # Streams are created before their turn is handed out, so a missing one has expired or never existed
+        if not await asyncio.to_thread(key_exists, key):
+            return
+
+        idle_since = time.monotonic()
+
+        while True:
+            entries = await read_stream(key, after_id, READ_BLOCK_MS)
+
+            if not entries:
+                if time.monotonic() - idle_since > MAX_IDLE_SECONDS:
+                    return
+
+                yield None
+                continue
+
+            for entry_id, fields in entries:
+                after_id = entry_id
+
+                status = fields.get("status")
+
+                if status == "started":
+                    yield StreamBatch(f"{turn_id}:{entry_id}", [])
+                    continue
+
+                if status == "failed":
+                    yield StreamBatch(f"{turn_id}:{entry_id}", [], fields.get("error") or FAILED_RESPONSE_MESSAGE)
+
+                if status is not None:
+                    return
+
+                yield StreamBatch(
+                    f"{turn_id}:{entry_id}",
+                    [CompletionChunk.model_validate(chunk) for chunk in json.loads(fields["chunks"])]
+                )
+
+            idle_since = time.monotonic()
+
+    async def _relay(self, key: str, chunks: AsyncIterator[CompletionChunk]) -> None:
+        is_mirrored = True
+        end: Dict[str, str] = {"status": "completed"}
+
+        try:
+            async for batch in coalesce_chunks(chunks):
+                if not is_mirrored:
+                    continue
+
+                try:
+                    await add_to_stream(
+                        key,
+                        {"chunks": json.dumps([chunk.model_dump() for chunk in batch])},
+                        STREAM_EXPIRATION_SECONDS
+                    )
+                except Exception as e:
+                    # The response is still generated to the end, so it is saved to the session's history
+                    logger.error(f"Failed to mirror response to {key}, generating it without a stream: {e}")
+                    is_mirrored = False
+        except Exception as e:
+            logger.error(f"Failed to generate response for {key}: {e}")
+            end = {"status": "failed", "error": FAILED_RESPONSE_MESSAGE}
+
+        try:
+            await add_to_stream(key, end, STREAM_EXPIRATION_SECONDS)
+        except Exception as e:
+            logger.error(f"Failed to end stream {key}: {e}")
+
+def get_stream_key(session_id: uuid.UUID, turn_id: str) -> str:
+    return f"{STREAM_KEY_PREFIX}{session_id}:{turn_id}"
+
+def parse_event_id(event_id: str) -> Tuple[str, str]:
+    """
+    Splits an event ID into the turn and the stream entry it was sent for
+    """
+    match = _EVENT_ID_PATTERN.match(event_id)
+
+    if not match:
+        raise ValueError("Invalid Last-Event-ID")
+
+    return match.group(1), match.group(2)
@@ -3,11 +3,11 @@ from typing import Optional
 import uuid
 from fastapi import Depends
 from openai import OpenAI
+from ai.models.openai_clients import get_openai_api_client
 from app.services import UserService
 from app.repositories import CourseRepository
 from app.utilities.profile import get_user_profile_text
 from common.messaging.topics import Topic
-from config import get_openai_key
 from common.storage import StoragePurpose, import_from_url, get_public_object_url
 from common.messaging import KafkaProducer
 from domain.schema.courses import Course, Lesson
@@ -30,7 +30,7 @@ class CourseService:
     ) -> None:
         self.user_service = user_service
         self.course_repo = course_repo
-        self.openai = OpenAI(api_key=get_openai_key())
+        self.openai = get_openai_api_client()
     
     async def get_additional_inputs(
         self, 
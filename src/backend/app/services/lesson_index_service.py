@@ -0,0 +1,226 @@
+import json
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+from ai.util import Bm25Index, estimate_tokens
+from common.cache import get_key, set_key
+from config import get_lesson_retrieval_min_tokens, get_lesson_retrieval_top_k
+
+logger = logging.getLogger("LessonIndexService")
+
+INDEX_KEY_PREFIX = "lesson-index:"
+INDEX_EXPIRATION_SECONDS = 60 * 60 * 24 * 30
+
+# Sections are split into chunks of roughly this many tokens, along paragraph boundaries
+CHUNK_TOKENS = 250
+
+# Indexes loaded by this process, most recently used last
+MAX_LOADED_INDEXES = 256
+
+_loaded_indexes: "OrderedDict[uuid.UUID, LessonIndex]" = OrderedDict()
+_loaded_indexes_lock = threading.Lock()
+
+class LessonChunk:
+    """
+    A passage from one of a lesson's sections
+
+    Attributes:
+        section_index (int): The position of the section within the lesson
+        text (str): The passage
+    """
+    section_index: int
+    text: str
+
+    def __init__(self, section_index: int, text: str) -> None:
+        self.section_index = section_index
+        self.text = text
+
+class LessonIndex:
+    """
+    The chunks of a lesson's sections and a BM25 index over them
+
+    Attributes:
+        section_titles (List[str]): The title of each section, in order
+        chunks (List[LessonChunk]): Every chunk of the lesson, in order
+        total_tokens (int): Estimated tokens in the lesson's full content
+    """
+    section_titles: List[str]
+    chunks: List[LessonChunk]
+    total_tokens: int
+    index: Bm25Index
+
+    def __init__(self, section_titles: List[str], chunks: List[LessonChunk], total_tokens: int, index: Bm25Index) -> None:
+        self.section_titles = section_titles
+        self.chunks = chunks
+        self.total_tokens = total_tokens
+        self.index = index
+
+    @staticmethod
+    def build(sections: List[Tuple[str, str]]) -> "LessonIndex":
+        """
+        Chunks and indexes a lesson
+
+        Args:
+            sections (List[Tuple[str, str]]): The title and content of each section, in order
+        """
+        chunks = [
+            LessonChunk(section_index, text)
+            for section_index, (_, content) in enumerate(sections)
+            for text in _split_into_chunks(content or "")
+        ]
+
+        # Titles are indexed with each chunk since questions often name the topic rather than the detail
+        index = Bm25Index.build([f"{sections[chunk.section_index][0]}\n{chunk.text}" for chunk in chunks])
+        total_tokens = sum(estimate_tokens(f"{title}\n{content}") for title, content in sections)
+
+        return LessonIndex([title for title, _ in sections], chunks, total_tokens, index)
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "section_titles": self.section_titles,
+            "chunks": [{"section": chunk.section_index, "text": chunk.text} for chunk in self.chunks],
+            "term_counts": self.index.term_counts,
+            "total_tokens": self.total_tokens
+        })
+
+    @staticmethod
+    def from_json(value: str) -> "LessonIndex":
+        data = json.loads(value)
+
+        return LessonIndex(
+            section_titles=data["section_titles"],
+            chunks=[LessonChunk(chunk["section"], chunk["text"]) for chunk in data["chunks"]],
+            total_tokens=data["total_tokens"],
+            index=Bm25Index(data["term_counts"])
+        )
+
+class LessonContext:
+    """
+    The lesson content given to the model for a chat turn
+
+    Attributes:
+        outline (str): Content which is the same for every turn, either the whole lesson or its section titles
+        excerpts (Optional[str]): The passages most relevant to the question, when the lesson is too long to send whole
+    """
+    outline: str
+    excerpts: Optional[str]
+
+    def __init__(self, outline: str, excerpts: Optional[str] = None) -> None:
+        self.outline = outline
+        self.excerpts = excerpts
+
+class LessonIndexService:
+    def index_lesson(self, lesson_id: uuid.UUID, sections: List[Tuple[str, str]]) -> None:
+        """
+        Builds and stores the retrieval index for a lesson, so chat turns only need to score it
+
+        Args:
+            lesson_id (uuid.UUID): The lesson
+            sections (List[Tuple[str, str]]): The title and content of each section, in order
+        """
+        self._store(lesson_id, LessonIndex.build(sections))
+
+    def get_lesson_context(self, lesson_id: uuid.UUID, sections: List[Tuple[str, str]], question: str) -> LessonContext:
+        """
+        Gets the lesson content to answer a question with. Short lessons are sent whole, longer lessons are
+        reduced to their section titles and the passages most relevant to the question.
+
+        Args:
+            lesson_id (uuid.UUID): The lesson
+            sections (List[Tuple[str, str]]): The title and content of each section, used when the lesson has not been indexed yet
+            question (str): The student's message
+
+        Returns:
+            LessonContext: The content to include in the prompt
+        """
+        if sum(estimate_tokens(f"{title}\n{content}") for title, content in sections) <= get_lesson_retrieval_min_tokens():
+            return LessonContext("\n\n".join(f"{title}\n{content}" for title, content in sections))
+
+        lesson_index = self._load(lesson_id)
+
+        if lesson_index is None:
+            # Lessons stored before indexing was introduced are indexed on first use
+            lesson_index = LessonIndex.build(sections)
+            self._store(lesson_id, lesson_index)
+
+        top_k = get_lesson_retrieval_top_k()
+        matches = lesson_index.index.search(question, top_k)
+
+        # Questions which share no terms with the lesson, such as "can you explain that again", get its opening passages
+        chunk_indexes = sorted(index for index, _ in matches) if matches else list(range(min(top_k, len(lesson_index.chunks))))
+
+        outline = "Sections in this lesson:\n" + "\n".join(
+            f"{index + 1}. {title}"
+            for index, title in enumerate(lesson_index.section_titles)
+        )
+        excerpts = "\n\n".join(
+            f"From {lesson_index.section_titles[lesson_index.chunks[index].section_index]}:\n{lesson_index.chunks[index].text}"
+            for index in chunk_indexes
+        )
+
+        return LessonContext(outline, excerpts)
+
+    def _store(self, lesson_id: uuid.UUID, lesson_index: LessonIndex) -> None:
+        self._remember(lesson_id, lesson_index)
+
+        try:
+            set_key(f"{INDEX_KEY_PREFIX}{lesson_id}", lesson_index.to_json(), INDEX_EXPIRATION_SECONDS)
+        except Exception as e:
+            logger.warning(f"Failed to store index for lesson {lesson_id}: {e}")
+
+    def _load(self, lesson_id: uuid.UUID) -> Optional[LessonIndex]:
+        with _loaded_indexes_lock:
+            if lesson_id in _loaded_indexes:
+                _loaded_indexes.move_to_end(lesson_id)
+                return _loaded_indexes[lesson_id]
+
+        try:
+            value = get_key(f"{INDEX_KEY_PREFIX}{lesson_id}")
+        except Exception as e:
+            logger.warning(f"Failed to load index for lesson {lesson_id}: {e}")
+            return None
+
+        if value is None:
+            return None
+
+        lesson_index = LessonIndex.from_json(value)
+        self._remember(lesson_id, lesson_index)
+
+        return lesson_index
+
+    def _remember(self, lesson_id: uuid.UUID, lesson_index: LessonIndex) -> None:
+        with _loaded_indexes_lock:
+            _loaded_indexes[lesson_id] = lesson_index
+            _loaded_indexes.move_to_end(lesson_id)
+
+            while len(_loaded_indexes) > MAX_LOADED_INDEXES:
+                _loaded_indexes.popitem(last=False)
+
+def _split_into_chunks(content: str) -> List[str]:
+    """
+    Groups paragraphs into chunks of about CHUNK_TOKENS, keeping fenced code blocks whole
+    """
+    chunks: List[str] = []
+    paragraphs: List[str] = []
+    tokens = 0
+
+    for paragraph in content.split("\n\n"):
+        if not paragraph.strip():
+            continue
+
+        is_in_code_block = "\n\n".join(paragraphs).count("```") % 2 == 1
+
+        if paragraphs and not is_in_code_block and tokens + estimate_tokens(paragraph) > CHUNK_TOKENS:
+            chunks.append("\n\n".join(paragraphs))
+            paragraphs = []
+            tokens = 0
+
+        paragraphs.append(paragraph)
+        tokens += estimate_tokens(paragraph)
+
+    if paragraphs:
+        chunks.append("\n\n".join(paragraphs))
+
+    return chunks
@@ -0,0 +1,181 @@
+import asyncio
+import json
+import time
+from typing import AsyncIterator, List, Optional
+from domain.dto.ai import CompletionChunk
+from config import get_chat_stream_flush_ms, get_chat_stream_flush_bytes, is_chat_stream_compact
+
+# Sent to clients when a response fails, rather than the error itself
+FAILED_RESPONSE_MESSAGE = "The response could not be generated"
+
+class SseWriter:
+    """
+    Frames completion chunks as server-sent events. In compact framing, fields without a value are left
+    out, as is the message ID when it is the same as the previous event's.
+
+    Example:
+        writer = SseWriter()
+        return StreamingResponse(writer.write(stream), media_type="text/event-stream")
+    """
+    compact: bool
+
+    def __init__(self, compact: Optional[bool] = None) -> None:
+        self.compact = compact if compact is not None else is_chat_stream_compact()
+        self._last_message_id: Optional[str] = None
+
+    async def write(self, chunks: AsyncIterator[CompletionChunk]) -> AsyncIterator[str]:
+        """
+        Coalesces the chunks and yields the frames to send. The events have no ID, since a response sent
+        directly cannot be resumed. When the chunks fail, an error event is sent before the error is raised.
+        """
+        try:
+            async for batch in coalesce_chunks(chunks):
+                yield self.get_frame(batch)
+        except Exception:
+            yield self.get_error_frame(FAILED_RESPONSE_MESSAGE)
+            raise
+
+    def get_frame(self, chunks: List[CompletionChunk], event_id: Optional[str] = None) -> str:
+        """
+        Frames chunks as events written together. The ID goes on the last event, so a client which
+        resumes from it does not receive part of the frame twice. Without chunks, the frame only carries the ID.
+        """
+        if not chunks:
+            return f"id: {event_id}\n\n" if event_id else ""
+
+        return "".join(
+            self._get_event(chunk, event_id if index == len(chunks) - 1 else None)
+            for index, chunk in enumerate(chunks)
+        )
+
+    def get_error_frame(self, message: str) -> str:
+        """
+        Frames an error event, which tells the client the response ended without completing
+        """
+        return f"event: error\ndata: {json.dumps({'error': message})}\n\n"
+
+    def _get_event(self, chunk: CompletionChunk, event_id: Optional[str]) -> str:
+        id_line = f"id: {event_id}\n" if event_id else ""
+
+        if not self.compact:
+            return f"{id_line}data: {chunk.model_dump_json()}\n\n"
+
+        data = chunk.model_dump(exclude_none=True)
+
+        if chunk.message_id == self._last_message_id:
+            del data["message_id"]
+
+        self._last_message_id = chunk.message_id
+
+        return f"{id_line}data: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+async def coalesce_chunks(
+    chunks: AsyncIterator[CompletionChunk],
+    flush_ms: Optional[int] = None,
+    flush_bytes: Optional[int] = None
+) -> AsyncIterator[List[CompletionChunk]]:
+    """
+    Buffers completion chunks until the buffer reaches a size or has been open for a time window, then
+    yields them together, so a long answer is sent as a few dozen frames rather than one per token.
+    Adjacent text chunks of a message are merged into a single chunk.
+
+    At most one chunk is read ahead of the batch being consumed, so a slow consumer slows down reading
+    from the model instead of growing a buffer.
+
+    Args:
+        chunks (AsyncIterator[CompletionChunk]): The chunks of a response
+        flush_ms (Optional[int]): The longest a chunk is held, or None for the configured window
+        flush_bytes (Optional[int]): Buffered text which causes a flush before the window ends, or None for the configured size
+    """
+    flush_seconds = (flush_ms if flush_ms is not None else get_chat_stream_flush_ms()) / 1000
+    flush_bytes = flush_bytes if flush_bytes is not None else get_chat_stream_flush_bytes()
+
+    iterator = chunks.__aiter__()
+    pending: Optional[asyncio.Task] = None
+    buffered: List[CompletionChunk] = []
+    buffered_bytes = 0
+    window_ends_at = None
+
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+
+            timeout = None if window_ends_at is None else max(0, window_ends_at - time.monotonic())
+
+            # The read is not cancelled when the window closes first, it carries over to the next batch
+            done, _ = await asyncio.wait([pending], timeout=timeout)
+
+            if done:
+                try:
+                    chunk = pending.result()
+                except StopAsyncIteration:
+                    break
+                except Exception:
+                    # What was generated before the failure is still sent
+                    if buffered:
+                        pending = None
+                        yield buffered
+
+                    raise
+                finally:
+                    pending = None
+
+                if buffered and (merged := merge_chunks(buffered[-1], chunk)):
+                    buffered[-1] = merged
+                else:
+                    buffered.append(chunk)
+
+                buffered_bytes += len(chunk.text or "") + sum(len(tool.data or "") for tool in chunk.tools or [])
+
+                if window_ends_at is None:
+                    window_ends_at = time.monotonic() + flush_seconds
+
+                if buffered_bytes < flush_bytes and time.monotonic() < window_ends_at:
+                    continue
+
+            yield buffered
+
+            buffered = []
+            buffered_bytes = 0
+            window_ends_at = None
+    finally:
+        if pending is not None:
+            pending.cancel()
+
+    if buffered:
+        yield buffered
+
+def merge_chunks(previous: CompletionChunk, chunk: CompletionChunk) -> Optional[CompletionChunk]:
+    """
+    Merges a chunk into the one before it when the client would end up with the same result, otherwise None
+    """
+    if chunk.message_id != previous.message_id:
+        return None
+
+    if not previous.tools and not chunk.tools:
+        return CompletionChunk(
+            message_id=chunk.message_id,
+            text=(previous.text or "") + (chunk.text or "")
+        )
+
+    if previous.text or chunk.text or len(previous.tools or []) != 1 or len(chunk.tools or []) != 1:
+        return None
+
+    previous_tool, tool = previous.tools[0], chunk.tools[0]
+
+    # Argument deltas of a tool call can be joined when the second starts where the first ends
+    is_continuation = (
+        tool.name == previous_tool.name
+        and tool.index == previous_tool.index
+        and previous_tool.offset is not None
+        and tool.offset == previous_tool.offset + len(previous_tool.data or "")
+    )
+
+    if not is_continuation:
+        return None
+
+    return CompletionChunk(
+        message_id=chunk.message_id,
+        tools=[previous_tool.model_copy(update={"data": (previous_tool.data or "") + (tool.data or "")})]
+    )
@@ -0,0 +1,308 @@
+"""
+Measures throughput of the AI pipeline against the offline replay backend, so results are repeatable
+and do not spend OpenAI quota.
+
+Usage (from src/backend):
+    python -m benchmarks.ai_pipeline --scenario all --requests 50 --concurrency 10 --ttft-ms 300 --tokens-per-second 80
+
+Pass --recording to replay streams captured with LLM_BACKEND=record, otherwise synthetic streams are used.
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+LESSON_CONTENT = "\n\n".join(
+    f"Section {i}\n" + "Variables hold values that a program can read and change. " * 20
+    for i in range(5)
+)
+
+CHAT_ANSWER = "A variable is a named reference to a value stored in memory. " * 12
+
+SECTION_CONTENT = "## Overview\n\nThis section walks through the topic with examples.\n\n```python\nprint('hello')\n```\n" * 10
+
+class ScenarioResult:
+    def __init__(self, name: str, latencies: List[float], first_token_latencies: List[float], units: int, unit_name: str, elapsed: float) -> None:
+        self.name = name
+        self.latencies = latencies
+        self.first_token_latencies = first_token_latencies
+        self.units = units
+        self.unit_name = unit_name
+        self.elapsed = elapsed
+
+    def print(self) -> None:
+        print(f"== {self.name}")
+        print(f"  requests:       {len(self.latencies)} in {self.elapsed:.2f}s ({len(self.latencies) / self.elapsed:.2f} req/s)")
+        print(f"  throughput:     {self.units / self.elapsed:.2f} {self.unit_name}/s")
+        print(f"  latency:        p50 {_percentile(self.latencies, 50) * 1000:.0f}ms, p95 {_percentile(self.latencies, 95) * 1000:.0f}ms")
+
+        if self.first_token_latencies:
+            print(f"  first token:    p50 {_percentile(self.first_token_latencies, 50) * 1000:.0f}ms, p95 {_percentile(self.first_token_latencies, 95) * 1000:.0f}ms")
+
+def _percentile(values: List[float], percentile: int) -> float:
+    if not values:
+        return 0
+
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(percentile / 100 * (len(ordered) - 1))))
+
+    return ordered[index]
+
+def create_synthetic_recording(path: str) -> None:
+    """
+    Writes a recording which covers every prompt exercised by the benchmark
+    """
+    from ai.models.replay import (
+        Recording,
+        get_recording_key,
+        synthesize_text_exchange,
+        synthesize_tool_call_exchange
+    )
+    from ai.prompts import (
+        AutocompletePrompt,
+        LessonDiscussionPrompt,
+        GenerateCourseOutlinePrompt,
+        GenerateModuleContentPrompt
+    )
+
+    recording = Recording()
+
+    recording.add_exchange(
+        get_recording_key(system_prompt=LessonDiscussionPrompt().system_prompt),
+        synthesize_text_exchange(CHAT_ANSWER)
+    )
+
+    recording.add_exchange(
+        get_recording_key(tool_name="provide_options", system_prompt=AutocompletePrompt().system_prompt),
+        synthesize_tool_call_exchange("provide_options", json.dumps({
+            "options": ["Python", "PyTorch", "Pydantic", "PyPy", "Pyramid"]
+        }))
+    )
+
+    outline_system_prompt = GenerateCourseOutlinePrompt().system_prompt
+
+    recording.add_exchange(
+        get_recording_key(system_prompt=outline_system_prompt),
+        synthesize_text_exchange("Here is a proposed structure for the course. " * 20)
+    )
+
+    recording.add_exchange(
+        get_recording_key(tool_name="provide_course_outline", system_prompt=outline_system_prompt),
+        synthesize_tool_call_exchange("provide_course_outline", json.dumps(get_synthetic_outline()))
+    )
+
+    recording.add_exchange(
+        get_recording_key(system_prompt=GenerateModuleContentPrompt().system_prompt),
+        synthesize_text_exchange(SECTION_CONTENT)
+    )
+
+    recording.save(path)
+
+def get_synthetic_outline(module_count: int = 3, lesson_count: int = 3, section_count: int = 3) -> dict:
+    return {
+        "course_subject": "Python",
+        "course_title": "Python Fundamentals",
+        "description": "Learn the fundamentals of Python",
+        "key_outcomes": ["Write Python programs", "Understand data types"],
+        "modules": [
+            {
+                "internal_name": f"module_{m}",
+                "title": f"Module {m}",
+                "focus_area": "Fundamentals",
+                "description": "Core concepts",
+                "lessons": [
+                    {
+                        "internal_name": f"lesson_{m}_{l}",
+                        "focus_area": "Syntax",
+                        "title": f"Lesson {l}",
+                        "description": "Language syntax",
+                        "sections": [
+                            {"title": f"Section {s}", "description": "Details"}
+                            for s in range(section_count)
+                        ]
+                    }
+                    for l in range(lesson_count)
+                ]
+            }
+            for m in range(module_count)
+        ]
+    }
+
+def run_chat(requests: int, concurrency: int) -> ScenarioResult:
+    from ai.prompts import LessonDiscussionPrompt
+
+    latencies: List[float] = []
+    first_token_latencies: List[float] = []
+    chunk_count = [0]
+
+    async def single_chat(semaphore: asyncio.Semaphore):
+        async with semaphore:
+            started = time.perf_counter()
+            first_token = None
+
+            stream = LessonDiscussionPrompt().get_responses(
+                history=[],
+                lesson_content=LESSON_CONTENT,
+                message="What is a variable?"
+            )
+
+            async for _ in stream:
+                if first_token is None:
+                    first_token = time.perf_counter() - started
+
+                chunk_count[0] += 1
+
+            latencies.append(time.perf_counter() - started)
+            first_token_latencies.append(first_token or 0)
+
+    async def run_all():
+        semaphore = asyncio.Semaphore(concurrency)
+        await asyncio.gather(*[single_chat(semaphore) for _ in range(requests)])
+
+    started = time.perf_counter()
+    asyncio.run(run_all())
+
+    return ScenarioResult("chat", latencies, first_token_latencies, chunk_count[0], "chunks", time.perf_counter() - started)
+
+def run_autocomplete(requests: int, concurrency: int) -> ScenarioResult:
+    from ai.prompts import AutocompletePrompt
+    from config import get_autocomplete_max_options
+
+    def single_request():
+        AutocompletePrompt().with_input("Programming languages used for Backend development.\nQuery: py").get_options(
+            max_options=get_autocomplete_max_options()
+        )
+
+    return _run_threaded("autocomplete", single_request, requests, concurrency, "requests")
+
+def run_course_generation(requests: int, concurrency: int) -> ScenarioResult:
+    from ai.models.batch import run_batch
+    from ai.prompts import GenerateCourseOutlinePrompt, GenerateModuleContentPrompt
+    from config import get_course_generation_mode
+    from domain.dto.courses import CoursePlanDto
+    from domain.enums.course_enums import CourseMaterial, CourseMotivation, CurrentSubjectExperience
+
+    plan = CoursePlanDto(
+        subject="Python",
+        motivations=[CourseMotivation.CAREER],
+        experience=CurrentSubjectExperience.NEW,
+        materials=[CourseMaterial.READING],
+        desired_outcome="Build small programs"
+    )
+
+    section_count = [0]
+
+    def single_request():
+        outline = GenerateCourseOutlinePrompt().get_outline(plan=plan, profile_text="A software engineer")
+
+        if get_course_generation_mode() == "batch":
+            return generate_batch(outline)
+
+        for module in outline.modules:
+            GenerateModuleContentPrompt().generate_module_content(
+                course=outline,
+                module=module,
+                progress_cb=lambda _: section_count.__setitem__(0, section_count[0] + 1)
+            )
+
+    def generate_batch(outline):
+        prompts = [GenerateModuleContentPrompt() for _ in outline.modules]
+        requests = [
+            module_requests
+            for prompt, module in zip(prompts, outline.modules)
+            for module_requests in prompt.get_section_requests(course=outline, module=module)
+        ]
+        contents = run_batch(requests)
+        offset = 0
+
+        for prompt, module in zip(prompts, outline.modules):
+            module_dto = prompt.get_module(module, contents[offset:])
+            offset += sum(len(lesson.sections) for lesson in module_dto.lessons)
+
+        section_count[0] += offset
+
+    result = _run_threaded("course generation", single_request, requests, concurrency, "sections")
+    result.units = section_count[0]
+
+    return result
+
+def _run_threaded(name: str, fn: Callable[[], None], requests: int, concurrency: int, unit_name: str) -> ScenarioResult:
+    latencies: List[float] = []
+
+    def timed():
+        started = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(timed) for _ in range(requests)]:
+            future.result()
+
+    return ScenarioResult(name, latencies, [], requests, unit_name, time.perf_counter() - started)
+
+SCENARIOS = {
+    "chat": run_chat,
+    "autocomplete": run_autocomplete,
+    "course": run_course_generation
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the AI pipeline using the offline replay backend")
+    parser.add_argument("--scenario", choices=[*SCENARIOS.keys(), "all"], default="all")
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--ttft-ms", type=int, default=0, help="Simulated time to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=0, help="Simulated generation speed, 0 for unthrottled")
+    parser.add_argument("--recording", help="A recording captured with LLM_BACKEND=record")
+    parser.add_argument("--response-cache", action="store_true", help="Serve repeated requests from the Redis response cache")
+    parser.add_argument("--batch", action="store_true", help="Generate course sections as a batch through the local batch backend")
+    parser.add_argument("--metrics", action="store_true", help="Print the collected LLM metrics in the Prometheus text format")
+    args = parser.parse_args()
+
+    recording_path = args.recording
+
+    if not recording_path:
+        recording_path = os.path.join(tempfile.mkdtemp(), "synthetic_recording.json")
+        create_synthetic_recording(recording_path)
+
+    os.environ["LLM_BACKEND"] = "replay"
+    os.environ["LLM_RECORDING_PATH"] = recording_path
+    os.environ["LLM_REPLAY_TIME_TO_FIRST_TOKEN_MS"] = str(args.ttft_ms)
+    os.environ["LLM_REPLAY_TOKENS_PER_SECOND"] = str(args.tokens_per_second)
+    os.environ["LLM_RESPONSE_CACHE"] = "true" if args.response_cache else "false"
+
+    if args.batch:
+        os.environ["COURSE_GENERATION_MODE"] = "batch"
+        os.environ["LLM_BATCH_BACKEND"] = "local"
+        os.environ["LLM_BATCH_DIRECTORY"] = tempfile.mkdtemp()
+        os.environ["LLM_BATCH_POLL_SECONDS"] = "0"
+
+    scenarios = SCENARIOS.keys() if args.scenario == "all" else [args.scenario]
+
+    for scenario in scenarios:
+        SCENARIOS[scenario](args.requests, args.concurrency).print()
+
+    print_prompt_usage()
+
+    if args.metrics:
+        from ai.metrics import get_metrics_sink
+
+        print("== metrics")
+        print(get_metrics_sink().render())
+
+def print_prompt_usage() -> None:
+    from ai.models.prompt_usage import get_prompt_usage
+
+    print("== prompt usage")
+
+    for prompt_name, usage in sorted(get_prompt_usage().items()):
+        print(f"  {prompt_name:<28} {usage.requests} requests, {usage.prompt_tokens} prompt tokens, {usage.cache_hit_rate:.0%} cached")
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,9 @@
+import asyncio
 import redis
+import redis.asyncio
+import weakref
 from datetime import timedelta
-from typing import List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 from config import get_redis_host
 from time import time
 
@@ -12,9 +15,21 @@ else:
     host = redis_host
     port = 6379
     
+_async_clients = weakref.WeakKeyDictionary()
+
 def _get_client():
     return redis.Redis(host=host, port=port)
 
+def _get_async_client():
+    # Shared by every call on an event loop, since each async client holds its own connection pool and
+    # its connections belong to the loop they were opened on
+    loop = asyncio.get_running_loop()
+    
+    if loop not in _async_clients:
+        _async_clients[loop] = redis.asyncio.Redis(host=host, port=port)
+        
+    return _async_clients[loop]
+
 def set_key(
     key: str, 
     value: str, 
@@ -37,6 +52,96 @@ def set_key(
     else:
         client.set(key, value)
     
+def set_key_if_not_exists(
+    key: str, 
+    value: str, 
+    expiration: int
+) -> bool:
+    """
+    Sets a key in the Redis cache only if it does not already exist, such as when acquiring a lock
+
+    Args:
+        key (str): The key to set
+        value (str): The value to set
+        expiration (int): The expiration time in seconds
+
+    Returns:
+        bool: True if the key was set, False if it already existed
+    """
+    
+    client = _get_client()
+    
+    return bool(client.set(key, value, ex=expiration, nx=True))
+
+def run_script(
+    script: str,
+    keys: List[str],
+    args: List[Union[str, int, float]]
+) -> Any:
+    """
+    Runs a Lua script atomically in Redis. The script is sent by its hash, and only loaded when Redis has not seen it
+
+    Args:
+        script (str): The Lua source
+        keys (List[str]): The keys the script accesses, available as KEYS
+        args (List[Union[str, int, float]]): The script's arguments, available as ARGV
+
+    Returns:
+        Any: The value returned by the script
+    """
+    
+    client = _get_client()
+    
+    return client.register_script(script)(keys=keys, args=args, client=client)
+
+async def run_script_async(
+    script: str,
+    keys: List[str],
+    args: List[Union[str, int, float]]
+) -> Any:
+    """
+    Async counterpart of run_script, for callers on the event loop
+
+    Args:
+        script (str): The Lua source
+        keys (List[str]): The keys the script accesses, available as KEYS
+        args (List[Union[str, int, float]]): The script's arguments, available as ARGV
+
+    Returns:
+        Any: The value returned by the script
+    """
+    
+    client = _get_async_client()
+    
+    return await client.register_script(script)(keys=keys, args=args, client=client)
+
+def delete_key(key: str):
+    """
+    Deletes a key from the Redis cache
+
+    Args:
+        key (str): The key to delete
+    """
+    
+    client = _get_client()
+    
+    client.delete(key)
+    
+def key_exists(key: str) -> bool:
+    """
+    Checks if a key exists in the Redis cache
+
+    Args:
+        key (str): The key to check
+
+    Returns:
+        bool: True if the key exists, False otherwise
+    """
+    
+    client = _get_client()
+    
+    return bool(client.exists(key))
+    
 def get_key(key: str) -> Optional[str]:
     """
     Gets a key from the Redis cache
@@ -177,6 +282,61 @@ def is_in_set_with_expiration(
     
     return client.zrank(key, value) is not None
     
+def push_to_list(
+    key: str,
+    value: str,
+    max_length: int,
+    expiration: int
+):
+    """
+    Appends a value to a list in the Redis cache, dropping the oldest values beyond the maximum length
+
+    Args:
+        key (str): The key of the list
+        value (str): The value to append
+        max_length (int): The most values the list keeps
+        expiration (int): The expiration time of the list in seconds, renewed by every append
+    """
+    
+    client = _get_client()
+    
+    pipeline = client.pipeline()
+    pipeline.rpush(key, value)
+    pipeline.ltrim(key, -max_length, -1)
+    pipeline.expire(key, expiration)
+    pipeline.execute()
+    
+def get_list(key: str) -> List[str]:
+    """
+    Gets all values in a list from the Redis cache, oldest first
+
+    Args:
+        key (str): The key of the list
+
+    Returns:
+        List[str]: The values in the list
+    """
+    
+    client = _get_client()
+    
+    return client.lrange(key, 0, -1)
+
+def get_list_item(key: str, index: int) -> Optional[str]:
+    """
+    Gets a single value in a list from the Redis cache, without reading the rest of the list
+
+    Args:
+        key (str): The key of the list
+        index (int): The position of the value, negative positions counting back from the newest
+
+    Returns:
+        Optional[str]: The value, or None when the list is shorter or does not exist
+    """
+    
+    client = _get_client()
+    
+    return client.lindex(key, index)
+
 def get_set(key: str) -> List[str]:
     """
     Gets all values in a set from the Redis cache
@@ -208,4 +368,64 @@ def get_set_with_expiration(key: str) -> List[str]:
     
     client.zremrangebyscore(key, 0, int(time()))
     
-    return client.zrange(key, 0, -1)
\ No newline at end of file
+    return client.zrange(key, 0, -1)
+
+async def add_to_stream(
+    key: str,
+    fields: Dict[str, str],
+    expiration: int
+) -> str:
+    """
+    Appends an entry to a stream in the Redis cache
+
+    Args:
+        key (str): The key of the stream
+        fields (Dict[str, str]): The fields of the entry
+        expiration (int): The expiration time of the stream in seconds, renewed by every append
+
+    Returns:
+        str: The ID of the entry
+    """
+    
+    client = _get_async_client()
+    
+    pipeline = client.pipeline()
+    pipeline.xadd(key, fields)
+    pipeline.expire(key, expiration)
+    entry_id, _ = await pipeline.execute()
+    
+    return entry_id.decode("utf-8")
+
+async def read_stream(
+    key: str,
+    after_id: str,
+    block_ms: int
+) -> List[Tuple[str, Dict[str, str]]]:
+    """
+    Reads the entries of a stream in the Redis cache after a given entry, waiting for new entries when there are none
+
+    Args:
+        key (str): The key of the stream
+        after_id (str): The ID of the last entry already read, or "0" to read from the start
+        block_ms (int): The longest to wait for new entries in milliseconds
+
+    Returns:
+        List[Tuple[str, Dict[str, str]]]: The ID and fields of each entry, oldest first, or an empty list when the wait timed out
+    """
+    
+    client = _get_async_client()
+    
+    result = await client.xread({key: after_id}, block=block_ms)
+    
+    if not result:
+        return []
+    
+    _, entries = result[0]
+    
+    return [
+        (
+            entry_id.decode("utf-8"),
+            {field.decode("utf-8"): value.decode("utf-8") for field, value in fields.items()}
+        )
+        for entry_id, fields in entries
+    ]
\ No newline at end of file
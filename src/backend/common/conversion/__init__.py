@@ -1 +1,2 @@
-from .pdf_to_image import get_images_from_pdf_bytes
\ No newline at end of file
+from .pdf_to_image import get_images_from_pdf_bytes
+from .image_preparation import ImagePreparationOptions, prepare_images, get_image_mime_type
\ No newline at end of file
@@ -0,0 +1,129 @@
+import io
+import logging
+from typing import List, Literal, Optional, Union
+from PIL import Image
+
+logger = logging.getLogger("ImagePreparation")
+
+ImageFormat = Literal["JPEG", "PNG"]
+
+# Images are never shrunk below this long edge to fit the byte budget, past this point text is no longer legible
+MIN_LONG_EDGE = 512
+
+class ImagePreparationOptions:
+    """
+    Controls how images are reduced before they are sent to a vision model
+
+    Attributes:
+        max_long_edge (int): The longest side of an image in pixels, larger images are downscaled to fit
+        format (ImageFormat): The format images are encoded in
+        grayscale (bool): Whether colour is removed, which shrinks scanned documents considerably
+        jpeg_quality (int): The starting JPEG quality
+        min_jpeg_quality (int): The lowest JPEG quality used to fit the byte budget
+        max_total_bytes (Optional[int]): The combined size allowed for every image in a prompt
+    """
+    max_long_edge: int
+    format: ImageFormat
+    grayscale: bool
+    jpeg_quality: int
+    min_jpeg_quality: int
+    max_total_bytes: Optional[int]
+
+    def __init__(
+        self,
+        max_long_edge: int = 1568,
+        format: ImageFormat = "JPEG",
+        grayscale: bool = False,
+        jpeg_quality: int = 80,
+        min_jpeg_quality: int = 50,
+        max_total_bytes: Optional[int] = 2 * 1024 * 1024
+    ) -> None:
+        self.max_long_edge = max_long_edge
+        self.format = format
+        self.grayscale = grayscale
+        self.jpeg_quality = jpeg_quality
+        self.min_jpeg_quality = min_jpeg_quality
+        self.max_total_bytes = max_total_bytes
+
+def prepare_images(
+    images: List[Union[bytes, Image.Image]],
+    options: ImagePreparationOptions
+) -> List[bytes]:
+    """
+    Downscales and re-encodes images for a vision prompt. When the result exceeds the byte budget, the
+    JPEG quality is lowered first and then the images are shrunk further until they fit.
+
+    Args:
+        images (List[Union[bytes, Image.Image]]): Encoded images or decoded PIL images
+        options (ImagePreparationOptions): How the images should be reduced
+
+    Returns:
+        List[bytes]: The encoded images, in the same order
+    """
+    if not images:
+        return []
+
+    decoded = [_decode(image, options) for image in images]
+    long_edge = options.max_long_edge
+    quality = options.jpeg_quality
+
+    while True:
+        encoded = [_encode(image, long_edge, quality, options.format) for image in decoded]
+        total_bytes = sum(len(image) for image in encoded)
+
+        if options.max_total_bytes is None or total_bytes <= options.max_total_bytes:
+            break
+
+        if options.format == "JPEG" and quality > options.min_jpeg_quality:
+            quality = max(options.min_jpeg_quality, quality - 10)
+        elif long_edge > MIN_LONG_EDGE:
+            long_edge = max(MIN_LONG_EDGE, int(long_edge * 0.8))
+        else:
+            logger.warning(f"Images are {total_bytes} bytes at the smallest size, exceeding the {options.max_total_bytes} byte budget")
+            break
+
+    logger.info(f"Prepared {len(encoded)} images: {total_bytes} bytes, long edge {long_edge}px, quality {quality}")
+
+    return encoded
+
+def get_image_mime_type(image: bytes) -> str:
+    """
+    Detects the MIME type of an encoded image from its signature, defaulting to PNG
+    """
+    if image.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+
+    if image.startswith(b"GIF8"):
+        return "image/gif"
+
+    if image[:4] == b"RIFF" and image[8:12] == b"WEBP":
+        return "image/webp"
+
+    return "image/png"
+
+def _decode(image: Union[bytes, Image.Image], options: ImagePreparationOptions) -> Image.Image:
+    if isinstance(image, bytes):
+        image = Image.open(io.BytesIO(image))
+
+    if options.grayscale:
+        return image.convert("L")
+
+    # JPEG has no alpha channel, and palette images cannot be resampled smoothly
+    return image.convert("RGB") if image.mode not in ("RGB", "L") else image
+
+def _encode(image: Image.Image, long_edge: int, quality: int, format: ImageFormat) -> bytes:
+    scale = long_edge / max(image.size)
+
+    if scale < 1:
+        image = image.resize(
+            (max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+            Image.Resampling.LANCZOS
+        )
+
+    with io.BytesIO() as output:
+        if format == "JPEG":
+            image.save(output, format="JPEG", quality=quality, optimize=True)
+        else:
+            image.save(output, format="PNG", optimize=True)
+
+        return output.getvalue()
@@ -1,18 +1,39 @@
-from typing import List
+from typing import List, Optional
 import io
 from pdf2image import convert_from_bytes
+from .image_preparation import ImagePreparationOptions, prepare_images
 
-def get_images_from_pdf_bytes(pdf_bytes: bytes) -> List[bytes]:
+# pdf2image renders at 200 DPI by default, far more detail than a vision model is able to use
+DEFAULT_DPI = 100
+
+def get_images_from_pdf_bytes(
+    pdf_bytes: bytes,
+    dpi: int = DEFAULT_DPI,
+    max_pages: Optional[int] = None,
+    options: Optional[ImagePreparationOptions] = None
+) -> List[bytes]:
     """
     Convert a PDF file to a list of images in bytes format.
 
     Args:
         pdf_bytes (bytes): The PDF file in bytes format.
+        dpi (int): The resolution pages are rendered at.
+        max_pages (Optional[int]): The most pages to render, starting from the first.
+        options (Optional[ImagePreparationOptions]): When provided, pages are reduced and encoded for a vision prompt.
 
     Returns:
-        List[bytes]: A list of images in PNG bytes format.
+        List[bytes]: A list of images, in PNG bytes format unless options specify otherwise.
     """
-    images = convert_from_bytes(pdf_bytes)
+    images = convert_from_bytes(
+        pdf_bytes,
+        dpi=dpi,
+        last_page=max_pages,
+        grayscale=options.grayscale if options else False
+    )
+    
+    if options:
+        return prepare_images(images, options)
+    
     pngs = []
     
     for image in images:
@@ -1,5 +1,6 @@
+import json
 import os
-from typing import Optional
+from typing import List, Optional
 from dotenv import load_dotenv
 from sqlalchemy import Boolean
 
@@ -73,7 +74,7 @@ def get_s3_secret_key() -> str:
 
 # Redis / Cache
 def get_redis_host() -> str:
-    return os.getenv("REDIS_HOST")
+    return os.getenv("REDIS_HOST", "localhost:6379")
 
 # Email
 def get_mailgun_key() -> str:
@@ -86,6 +87,157 @@ def get_email_noreply_address() -> str:
 def get_openai_key() -> str:
     return os.getenv("OPENAI_KEY")
 
+# A JSON array of {"key", "base_url", "rpm", "tpm", "name"} objects to spread chat completions over, all but "key" optional
+def get_openai_credentials() -> List[dict]:
+    credentials = os.getenv("OPENAI_CREDENTIALS")
+
+    if credentials:
+        return json.loads(credentials)
+
+    return [{
+        "key": get_openai_key(),
+        "rpm": int(os.getenv("OPENAI_KEY_RPM_LIMIT", "0")),
+        "tpm": int(os.getenv("OPENAI_KEY_TPM_LIMIT", "0"))
+    }]
+
+# "openai", "replay" (serve recorded streams offline) or "record" (call OpenAI and record the streams)
+def get_llm_backend() -> str:
+    return os.getenv("LLM_BACKEND", "openai").lower()
+
+def get_llm_recording_path() -> str:
+    return os.getenv("LLM_RECORDING_PATH", "llm_recording.json")
+
+def get_llm_replay_time_to_first_token_ms() -> int:
+    return int(os.getenv("LLM_REPLAY_TIME_TO_FIRST_TOKEN_MS", "0"))
+
+def get_llm_replay_tokens_per_second() -> float:
+    return float(os.getenv("LLM_REPLAY_TOKENS_PER_SECOND", "0"))
+
+def is_llm_response_cache_enabled() -> bool:
+    return os.getenv("LLM_RESPONSE_CACHE", "true").lower() == "true"
+
+# Connection pool shared by every OpenAI request in the process
+def get_llm_max_connections() -> int:
+    return int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+
+def get_llm_max_keepalive_connections() -> int:
+    return int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+
+def get_llm_keepalive_expiry_seconds() -> float:
+    return float(os.getenv("LLM_KEEPALIVE_EXPIRY_SECONDS", "60"))
+
+def is_llm_http2_enabled() -> bool:
+    return os.getenv("LLM_HTTP2", "true").lower() == "true"
+
+# Prompt classes which are tried on the smaller model first and only escalated when its answer is unusable
+def get_llm_speculative_prompts() -> List[str]:
+    prompts = os.getenv("LLM_SPECULATIVE_PROMPTS", "GetAdditionalInputsPrompt,LessonDiscussionPrompt")
+
+    return [prompt.strip() for prompt in prompts.split(",") if prompt.strip()]
+
+# Limits shared by every process calling OpenAI, enforced through Redis. Defaults to the sum of the credentials'
+# own limits, and is disabled when 0
+def get_llm_global_rpm_limit() -> int:
+    default = sum(int(credential.get("rpm", 0)) for credential in get_openai_credentials())
+
+    return int(os.getenv("LLM_GLOBAL_RPM_LIMIT", str(default)))
+
+def get_llm_global_tpm_limit() -> int:
+    default = sum(int(credential.get("tpm", 0)) for credential in get_openai_credentials())
+
+    return int(os.getenv("LLM_GLOBAL_TPM_LIMIT", str(default)))
+
+# Lesson chat messages up to this length, following earlier turns, are tried on the smaller model first
+def get_llm_short_followup_chars() -> int:
+    return int(os.getenv("LLM_SHORT_FOLLOWUP_CHARS", "200"))
+
+# Tool calls from the same model turn which are marked as concurrent share a pool of this size
+def get_tool_executor_max_workers() -> int:
+    return int(os.getenv("TOOL_EXECUTOR_MAX_WORKERS", "8"))
+
+# Chat
+# Estimated tokens a lesson chat prompt may use before older turns are compacted into a summary
+def get_chat_context_token_budget() -> int:
+    return int(os.getenv("CHAT_CONTEXT_TOKEN_BUDGET", "12000"))
+
+def get_chat_history_message_limit() -> int:
+    return int(os.getenv("CHAT_HISTORY_MESSAGE_LIMIT", "50"))
+
+# Messages returned per page of a chat session's history when the client does not ask for a number
+def get_chat_history_page_size() -> int:
+    return int(os.getenv("CHAT_HISTORY_PAGE_SIZE", "50"))
+
+# Whether chat turns are written to the database after the response has closed rather than before
+def is_chat_write_behind_enabled() -> bool:
+    return os.getenv("CHAT_WRITE_BEHIND", "false").lower() == "true"
+
+# Whether the recent messages of each chat session are cached in Redis rather than queried on every message
+def is_chat_history_cache_enabled() -> bool:
+    return os.getenv("CHAT_HISTORY_CACHE", "true").lower() == "true"
+
+# Chat responses are streamed in frames sent once this many milliseconds have passed or bytes are buffered
+def get_chat_stream_flush_ms() -> int:
+    return int(os.getenv("CHAT_STREAM_FLUSH_MS", "20"))
+
+def get_chat_stream_flush_bytes() -> int:
+    return int(os.getenv("CHAT_STREAM_FLUSH_BYTES", "512"))
+
+# Whether chat responses are mirrored to Redis so a client can resume them after its connection drops
+def is_chat_stream_resumable() -> bool:
+    return os.getenv("CHAT_STREAM_RESUMABLE", "true").lower() == "true"
+
+# Whether chat stream events leave out empty fields and repeated message IDs
+def is_chat_stream_compact() -> bool:
+    return os.getenv("CHAT_STREAM_COMPACT", "false").lower() == "true"
+
+# Lessons longer than this many estimated tokens are reduced to the passages most relevant to each question
+def get_lesson_retrieval_min_tokens() -> int:
+    return int(os.getenv("LESSON_RETRIEVAL_MIN_TOKENS", "2000"))
+
+def get_lesson_retrieval_top_k() -> int:
+    return int(os.getenv("LESSON_RETRIEVAL_TOP_K", "4"))
+
+# Opening questions in lesson chat this similar to one already answered for the lesson get the same answer
+def is_lesson_answer_reuse_enabled() -> bool:
+    return os.getenv("LESSON_ANSWER_REUSE", "false").lower() == "true"
+
+def get_lesson_answer_reuse_threshold() -> float:
+    return float(os.getenv("LESSON_ANSWER_REUSE_THRESHOLD", "0.95"))
+
+# Autocomplete
+# When set, suggestions are streamed and returned as soon as this many have been generated, skipping the response cache
+def get_autocomplete_max_options() -> Optional[int]:
+    value = os.getenv("AUTOCOMPLETE_MAX_OPTIONS")
+
+    return int(value) if value else None
+
+# Course generation
+# "stream" generates sections one request at a time, "batch" submits every section of a course as a single batch
+def get_course_generation_mode() -> str:
+    return os.getenv("COURSE_GENERATION_MODE", "stream").lower()
+
+# "openai" uses the Batch API, "local" runs batches from files against the LLM backend. Defaults to "openai"
+# when the LLM backend calls OpenAI
+def get_llm_batch_backend() -> str:
+    default = "openai" if get_llm_backend() == "openai" else "local"
+
+    return os.getenv("LLM_BATCH_BACKEND", default).lower()
+
+def get_llm_batch_directory() -> str:
+    return os.getenv("LLM_BATCH_DIRECTORY", "llm_batches")
+
+def get_llm_batch_poll_seconds() -> float:
+    return float(os.getenv("LLM_BATCH_POLL_SECONDS", "30"))
+
+# Batches which have not finished after this long are cancelled, so their requests can be made another way
+def get_llm_batch_max_wait_seconds() -> float:
+    return float(os.getenv("LLM_BATCH_MAX_WAIT_SECONDS", "3600"))
+
+# Metrics
+# When set, scrapes of the metrics endpoint must send it as a bearer token
+def get_metrics_token() -> Optional[str]:
+    return os.getenv("METRICS_TOKEN")
+
 # GitHub
 def get_github_client_id() -> str:
     return os.getenv("GITHUB_CLIENT_ID")
@@ -5,6 +5,10 @@ class Tool(BaseModel):
     name: str
     is_public: bool
     data: Optional[str] = None
+    # Only set when streaming tool deltas: data then holds the new argument fragment,
+    # which belongs at this offset of the arguments for the tool call at this index
+    index: Optional[int] = None
+    offset: Optional[int] = None
 
 class CompletionChunk(BaseModel):
     message_id: str
@@ -1,2 +1,4 @@
 from .chat_session import ChatSessionDto
-from .chat_message import ChatMessageDto
\ No newline at end of file
+from .chat_message import ChatMessageDto
+from .chat_history_page import ChatHistoryPageDto
+from .chat_turn import ChatTurnMessageDto, ChatTurnToolCallDto
\ No newline at end of file
@@ -0,0 +1,7 @@
+from typing import Optional
+from pydantic import BaseModel
+from .chat_message import ChatMessageDto
+
+class ChatHistoryPageDto(BaseModel):
+    messages: list[ChatMessageDto]
+    next_cursor: Optional[str] = None
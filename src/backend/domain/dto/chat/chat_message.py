@@ -4,7 +4,7 @@ from datetime import datetime
 from typing import Annotated, Optional
 
 from pydantic import Field, field_serializer, field_validator
-from domain.schema.chat import ChatMessageBase, ChatToolCallBase
+from domain.schema.chat import ChatMessage, ChatMessageBase, ChatToolCallBase
 
 class ChatToolCallDto(ChatToolCallBase):
     tool_name: str
@@ -25,4 +25,24 @@ class ChatMessageDto(ChatMessageBase):
     is_user: bool
     content: Optional[str] = None
     tool_calls: list[ChatToolCallDto] = []
-    created_at_utc: datetime
\ No newline at end of file
+    created_at_utc: datetime
+
+    @staticmethod
+    def from_record(message: ChatMessage) -> "ChatMessageDto":
+        """
+        Builds the DTO for a message without validating it, since the record already came from the database
+        """
+        return ChatMessageDto.model_construct(
+            id=message.id,
+            session_id=message.session_id,
+            is_user=message.is_user,
+            content=message.content,
+            created_at_utc=message.created_at_utc,
+            tool_calls=[
+                ChatToolCallDto.model_construct(
+                    tool_name=tool_call.tool_name,
+                    json_arguments=json.loads(tool_call.json_arguments)
+                )
+                for tool_call in message.tool_calls
+            ]
+        )
\ No newline at end of file
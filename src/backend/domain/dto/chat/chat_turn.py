@@ -0,0 +1,13 @@
+from typing import Optional
+from pydantic import BaseModel
+
+class ChatTurnToolCallDto(BaseModel):
+    call_id: str
+    tool_name: str
+    arguments: str
+    result: str
+
+class ChatTurnMessageDto(BaseModel):
+    is_user: bool
+    content: Optional[str] = None
+    tool_calls: list[ChatTurnToolCallDto] = []
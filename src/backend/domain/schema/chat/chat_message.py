@@ -1,6 +1,7 @@
 import uuid
 from datetime import datetime
 from typing import Optional
+from sqlalchemy import Index
 from sqlmodel import Field, Relationship, SQLModel
 import domain.schema as schema
 
@@ -12,6 +13,9 @@ class ChatMessageBase(SQLModel):
 
 class ChatMessage(ChatMessageBase, table=True):
     __tablename__ = "chat_messages"
+    __table_args__ = (
+        Index("ix_chat_messages_session_id_created_at_utc", "session_id", "created_at_utc", "id"),
+    )
     
     id: uuid.UUID                                           = Field(default_factory=uuid.uuid4, primary_key=True)
     chat_session: "schema.chat.chat_session.ChatSession"    = Relationship(back_populates="messages")
@@ -23,6 +27,9 @@ class ChatToolCallBase(SQLModel):
 
 class ChatToolCall(ChatToolCallBase, table=True):
     __tablename__ = "chat_tool_calls"
+    __table_args__ = (
+        Index("ix_chat_tool_calls_message_id", "message_id"),
+    )
     
     id: uuid.UUID                   = Field(default_factory=uuid.uuid4, primary_key=True)
     message_id: uuid.UUID           = Field(default=None, foreign_key="chat_messages.id")
@@ -1,13 +1,17 @@
 import logging
+from ai.models.batch import BatchError, run_batch
 from ai.prompts import GenerateModuleContentPrompt
 from app.repositories import CourseRepository
+from app.services import LessonIndexService
 from common.messaging import Topic, KafkaConsumer
 from domain.topics import CourseGenerationTopic
 from domain.dto.courses import CourseDto
+from config import get_course_generation_mode
 
 logging.basicConfig(level=logging.INFO)
 
 repository = CourseRepository()
+lesson_index_service = LessonIndexService()
 
 consumer = KafkaConsumer(
     topic=Topic.GENERATE_NEW_COURSE,
@@ -24,6 +28,12 @@ def calculate_total_section_count(course_outline):
 
 def generate_course(data):
     """Generate the entire course content."""
+    if get_course_generation_mode() == "batch":
+        try:
+            return generate_course_batch(data)
+        except BatchError as e:
+            logging.error(f"Batch generation failed: {e}. Generating sections one at a time instead...")
+
     total_section_count = calculate_total_section_count(data.course_outline)
     current_section = [0]  # Use a list to make it mutable
 
@@ -40,10 +50,61 @@ def generate_course(data):
         course_dto.modules.append(module_dto)
 
     # Create the course content in the database
-    repository.create_course_content(
+    lesson_ids = repository.create_course_content(
+        course_id=data.course_id,
+        course_dto=course_dto
+    )
+    index_lessons(course_dto, lesson_ids)
+
+def generate_course_batch(data):
+    """Generate the entire course content with every section submitted as a single batch."""
+    prompts = []
+    requests = []
+    section_counts = []
+
+    for module in data.course_outline.modules:
+        module_prompt = GenerateModuleContentPrompt()
+        module_requests = module_prompt.get_section_requests(
+            course=data.course_outline,
+            module=module
+        )
+        prompts.append(module_prompt)
+        requests.extend(module_requests)
+        section_counts.append(len(module_requests))
+
+    contents = run_batch(
+        requests,
+        progress_cb=lambda finished, total: repository.set_generation_progress(
+            course_id=data.course_id,
+            progress=int((finished / total) * 100) if total else 0
+        )
+    )
+
+    # Map the batch results back to each module's sections, in the order the requests were made
+    course_dto = CourseDto.model_construct(modules=[])
+    offset = 0
+
+    for module_prompt, module, section_count in zip(prompts, data.course_outline.modules, section_counts):
+        module_dto = module_prompt.get_module(module, contents[offset:offset + section_count])
+        course_dto.modules.append(module_dto)
+        offset += section_count
+        logging.info(f"Generated module '{module_dto.title}'")
+
+    lesson_ids = repository.create_course_content(
         course_id=data.course_id,
         course_dto=course_dto
     )
+    index_lessons(course_dto, lesson_ids)
+
+def index_lessons(course_dto, lesson_ids):
+    """Build the retrieval index lesson chat uses for each lesson, in the order they were stored."""
+    lessons = [lesson for module in course_dto.modules for lesson in module.lessons]
+
+    for lesson_id, lesson in zip(lesson_ids, lessons):
+        lesson_index_service.index_lesson(
+            lesson_id=lesson_id,
+            sections=[(section.title, section.content) for section in lesson.sections]
+        )
 
 def generate_module(data, module, progress_callback):
     """Generate content for a single module."""
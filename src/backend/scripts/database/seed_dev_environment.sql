@@ -213,6 +213,9 @@ CREATE TABLE IF NOT EXISTS chat_messages (
     created_at_utc TIMESTAMP NOT NULL DEFAULT now()
 );
 
+-- History is read newest first a page at a time, keyed on (created_at_utc, id)
+CREATE INDEX IF NOT EXISTS ix_chat_messages_session_id_created_at_utc ON chat_messages (session_id, created_at_utc, id);
+
 -- Create table for Chat Tool Calls
 CREATE TABLE IF NOT EXISTS chat_tool_calls (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
@@ -223,6 +226,8 @@ CREATE TABLE IF NOT EXISTS chat_tool_calls (
     result TEXT NOT NULL
 );
 
+CREATE INDEX IF NOT EXISTS ix_chat_tool_calls_message_id ON chat_tool_calls (message_id);
+
 -- Create playground session table
 CREATE TABLE IF NOT EXISTS playground_sessions (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
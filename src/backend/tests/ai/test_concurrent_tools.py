@@ -0,0 +1,110 @@
+import asyncio
+import threading
+import unittest
+from pydantic import BaseModel
+from ai.common import BaseTool, concurrent_tool
+from ai.models.base_gpt import BaseGPT, ToolCallRecord
+from ai.prompts import BasePrompt
+
+# Each tool waits for the other to start, so the calls only finish when they run at the same time
+BARRIER_TIMEOUT_SECONDS = 5
+
+class ToolResult(BaseModel):
+    value: str
+
+@concurrent_tool()
+class FirstTool(BaseTool):
+    result: ToolResult
+    barrier: threading.Barrier = None
+
+    def __init__(self):
+        super().__init__("first", "The first tool")
+        self.use_schema(ToolResult.model_json_schema())
+
+    def process(self, arguments: dict) -> str:
+        self.barrier.wait(BARRIER_TIMEOUT_SECONDS)
+        self.result = arguments
+
+        return "Success"
+
+@concurrent_tool()
+class SecondTool(FirstTool):
+    def __init__(self):
+        super().__init__()
+        self.name = "second"
+        self.description = "The second tool"
+
+@concurrent_tool()
+class AsyncTool(BaseTool):
+    result: ToolResult
+    barrier: asyncio.Barrier = None
+
+    def __init__(self):
+        super().__init__("async", "A coroutine tool")
+        self.use_schema(ToolResult.model_json_schema())
+
+    async def process(self, arguments: dict) -> str:
+        if self.barrier is not None:
+            await asyncio.wait_for(self.barrier.wait(), BARRIER_TIMEOUT_SECONDS)
+
+        self.result = arguments
+
+        return "Success"
+
+class ToolsPrompt(BasePrompt):
+    def setup(self) -> None:
+        self.set_system_prompt("")
+        self.use_tool(FirstTool)
+        self.use_tool(SecondTool)
+        self.use_tool(AsyncTool)
+
+def get_records(*names: str) -> list[ToolCallRecord]:
+    return [
+        ToolCallRecord(index, f"call_{index}", name, f'{{"value": "{name}"}}')
+        for index, name in enumerate(names)
+    ]
+
+def get_results(prompt: BasePrompt, tool_type: type) -> list[str]:
+    return [inst.result.value for inst in prompt.tool_instances[tool_type.__name__]]
+
+class ConcurrentToolsTest(unittest.TestCase):
+    def setUp(self) -> None:
+        FirstTool.barrier = threading.Barrier(2)
+        AsyncTool.barrier = None
+
+    def test_tools_from_the_same_turn_run_concurrently(self):
+        prompt = ToolsPrompt()
+        records = get_records("first", "second")
+
+        BaseGPT("test")._process_tool_calls(prompt, records)
+
+        self.assertEqual([record.errors for record in records], [False, False])
+        self.assertEqual(get_results(prompt, FirstTool), ["first"])
+        self.assertEqual(get_results(prompt, SecondTool), ["second"])
+
+    def test_tools_from_the_same_turn_run_concurrently_async(self):
+        prompt = ToolsPrompt()
+        records = get_records("async", "async")
+
+        async def run() -> None:
+            AsyncTool.barrier = asyncio.Barrier(2)
+
+            await BaseGPT("test")._process_tool_calls_async(prompt, records)
+
+        asyncio.run(run())
+
+        self.assertEqual([record.errors for record in records], [False, False])
+        self.assertEqual(get_results(prompt, AsyncTool), ["async", "async"])
+
+    def test_coroutine_tool_runs_from_a_running_event_loop(self):
+        prompt = ToolsPrompt()
+
+        async def run() -> str:
+            _, response = prompt.execute_tool("async", {"value": "async"})
+
+            return response
+
+        self.assertEqual(asyncio.run(run()), "Success")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+from pydantic import BaseModel
+from ai.common import BaseTool
+from ai.models.base_gpt import BaseGPT, ToolCallRecord
+from ai.prompts import BasePrompt
+
+class ToolResult(BaseModel):
+    values: list[str]
+
+class ValuesTool(BaseTool):
+    result: ToolResult
+
+    def __init__(self):
+        super().__init__("values", "Provides values")
+        self.use_schema(ToolResult.model_json_schema())
+
+    def process(self, arguments: dict) -> str:
+        self.result = arguments
+
+        return "Success"
+
+class ValuesPrompt(BasePrompt):
+    def setup(self) -> None:
+        self.set_system_prompt("")
+        self.use_tool(ValuesTool)
+
+class ToolArgumentsTest(unittest.TestCase):
+    def test_malformed_arguments_are_repaired(self):
+        prompt = ValuesPrompt()
+        record = ToolCallRecord(0, "call_0", "values", '{"values": ["a", "b",]}')
+
+        BaseGPT("test")._process_tool_calls(prompt, [record])
+
+        self.assertFalse(record.errors)
+        self.assertEqual(prompt.get_tool_call(ValuesTool).result.values, ["a", "b"])
+
+    def test_truncated_arguments_are_sent_back_for_correction(self):
+        prompt = ValuesPrompt()
+        record = ToolCallRecord(0, "call_0", "values", '{"values": ["a", "b')
+        record.is_truncated = True
+
+        BaseGPT("test")._process_tool_calls(prompt, [record])
+
+        self.assertTrue(record.errors)
+        self.assertIn("output token limit", record.result)
+        self.assertIsNone(prompt.get_tool_call(ValuesTool))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,6 +2,14 @@ import { TokenResponse } from "@contracts";
 
 const apiEndpoint = import.meta.env.VITE_API_ENDPOINT;
 
+// Times a dropped event stream is resumed before giving up
+const MAX_RESUME_ATTEMPTS = 3;
+
+/**
+ * Raised when the server ends an event stream with an error event, such as when a response could not be generated
+ */
+export class EventStreamError extends Error {}
+
 abstract class BaseApi {
     private prefix: string;
 
@@ -28,17 +36,83 @@ abstract class BaseApi {
         ).then((r) => r.json());
     }
 
+    /**
+     * Posts a request and reads the server-sent events of the response. When the connection drops and
+     * resumeUrl is given, the stream is picked up from the last event received rather than requested again.
+     * Streams whose events have no ID were sent directly by the server and cannot be resumed.
+     * @param url The endpoint to post to
+     * @param data The request body
+     * @param onData Called with the data of each event
+     * @param onComplete Called once the stream has ended
+     * @param resumeUrl The endpoint which continues the stream after the Last-Event-ID header
+     */
     protected async postEventStream<T>(
         url: string,
         data: any,
         onData: (data: T) => void,
-        onComplete?: () => void
+        onComplete?: () => void,
+        resumeUrl?: string
     ) {
-        const response = await fetch(`${apiEndpoint}/${this.prefix}/${url}`, {
+        let response = await fetch(`${apiEndpoint}/${this.prefix}/${url}`, {
             method: "POST",
             headers: this.get_headers(),
             body: JSON.stringify(data),
         });
+        // Asserted rather than annotated, since it is only assigned in the callback below
+        let lastEventId = null as string | null;
+        let attempts = 0;
+
+        while (true) {
+            try {
+                await this.readEventStream(
+                    response,
+                    onData,
+                    (id) => (lastEventId = id)
+                );
+                break;
+            } catch (e) {
+                // The server ended the stream itself, so resuming would not get any further
+                if (
+                    e instanceof EventStreamError ||
+                    !resumeUrl ||
+                    !lastEventId ||
+                    attempts >= MAX_RESUME_ATTEMPTS
+                ) {
+                    throw e;
+                }
+
+                attempts++;
+
+                const headers = this.get_headers();
+                headers["Last-Event-ID"] = lastEventId;
+
+                response = await fetch(
+                    `${apiEndpoint}/${this.prefix}/${resumeUrl}`,
+                    { method: "GET", headers }
+                );
+            }
+        }
+
+        onComplete?.();
+    }
+
+    /**
+     * Reads server-sent events until the response ends, throwing an EventStreamError for an error event
+     * @param response The response to read
+     * @param onData Called with the data of each event
+     * @param onEventId Called with the ID of each event which has one, to resume after it
+     */
+    private async readEventStream<T>(
+        response: Response,
+        onData: (data: T) => void,
+        onEventId: (id: string) => void
+    ): Promise<void> {
+        // An error response is not an event stream, and reading it as one would end the answer early
+        if (!response.ok) {
+            throw new EventStreamError(
+                `Event stream request failed with status ${response.status}`
+            );
+        }
 
         const reader = response.body!.getReader();
         const decoder = new TextDecoder();
@@ -48,32 +122,80 @@ abstract class BaseApi {
             const { done, value } = await reader.read();
 
             if (done) {
-                onComplete?.();
-                break;
+                return;
             }
 
-            buffer += decoder.decode(value, { stream: true });
+            buffer += decoder
+                .decode(value, { stream: true })
+                .replace(/\r\n?/g, "\n");
 
-            let boundary = buffer.indexOf("\n");
+            // Events end with a blank line, and a frame may hold several of them
+            let boundary = buffer.indexOf("\n\n");
 
             while (boundary !== -1) {
-                const completeChunk = buffer.slice(0, boundary);
-                buffer = buffer.slice(boundary + 1);
+                const event = this.parseEvent(buffer.slice(0, boundary));
+                buffer = buffer.slice(boundary + 2);
+
+                if (event.event === "error") {
+                    let message = event.data ?? "";
 
-                if (completeChunk.trim()) {
                     try {
-                        const json = JSON.parse(completeChunk);
-                        onData(json);
+                        message = JSON.parse(message).error ?? message;
+                    } catch (e) {}
+
+                    throw new EventStreamError(message);
+                }
+
+                if (event.data !== null) {
+                    try {
+                        onData(JSON.parse(event.data));
                     } catch (e) {
-                        onData(completeChunk as any);
+                        onData(event.data as any);
                     }
                 }
 
-                boundary = buffer.indexOf("\n");
+                if (event.id !== null) {
+                    onEventId(event.id);
+                }
+
+                boundary = buffer.indexOf("\n\n");
             }
         }
     }
 
+    /**
+     * Gets the type, ID and data of a server-sent event, joining multiple data lines. Each is null when the
+     * event has none, such as for keepalive comments.
+     * @param event The lines of the event, without the blank line ending it
+     */
+    private parseEvent(event: string): {
+        event: string | null;
+        id: string | null;
+        data: string | null;
+    } {
+        const lines = event.split("\n");
+        const getValues = (field: string) =>
+            lines
+                .filter((line) => line.startsWith(`${field}:`))
+                .map((line) =>
+                    line.slice(
+                        line.startsWith(`${field}: `)
+                            ? field.length + 2
+                            : field.length + 1
+                    )
+                );
+
+        const types = getValues("event");
+        const ids = getValues("id");
+        const dataLines = getValues("data");
+
+        return {
+            event: types.length ? types[types.length - 1] : null,
+            id: ids.length ? ids[ids.length - 1] : null,
+            data: dataLines.length ? dataLines.join("\n") : null,
+        };
+    }
+
     protected postForm<T>(url: string, data: FormData): Promise<T> {
         return this.wrapAuthorization(() =>
             fetch(`${apiEndpoint}/${this.prefix}/${url}`, {
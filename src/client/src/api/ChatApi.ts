@@ -1,6 +1,6 @@
 import { ChatMessagePayload, CreateSessionResponse } from "@contracts";
 import BaseApi from "./BaseApi";
-import { ChatMessageDto, CompletionChunkDto } from "@models/dto";
+import { ChatHistoryPageDto, CompletionChunkDto } from "@models/dto";
 import { ChatPromptType } from "@models/enums";
 
 class ChatApi extends BaseApi {
@@ -27,11 +27,40 @@ class ChatApi extends BaseApi {
         onData: (chunk: CompletionChunkDto) => void,
         onComplete: () => void
     ) {
-        return this.postEventStream(sessionId, payload, onData, onComplete);
+        let messageId = "";
+
+        // Compact framing leaves out the message ID when it has not changed since the previous event
+        return this.postEventStream<CompletionChunkDto>(
+            sessionId,
+            payload,
+            (chunk) => {
+                messageId = chunk.message_id ?? messageId;
+                onData({
+                    ...chunk,
+                    message_id: messageId,
+                    text: chunk.text ?? null,
+                    tools: chunk.tools ?? null,
+                });
+            },
+            onComplete,
+            `${sessionId}/stream`
+        );
     }
 
-    getHistory(sessionId: string) {
-        return this.get<ChatMessageDto[]>(`${sessionId}/history`);
+    getHistory(sessionId: string, before?: string, limit?: number) {
+        const urlParams = new URLSearchParams();
+
+        if (before) {
+            urlParams.append("before", before);
+        }
+
+        if (limit) {
+            urlParams.append("limit", limit.toString());
+        }
+
+        return this.get<ChatHistoryPageDto>(
+            `${sessionId}/history?${urlParams.toString()}`
+        );
     }
 }
 
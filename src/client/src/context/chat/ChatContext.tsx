@@ -1,6 +1,7 @@
 import { ChatApi } from "@api";
 import { useCurrentUser } from "@context/user/hooks";
 import { Center, Loader } from "@mantine/core";
+import { notifications } from "@mantine/notifications";
 import { ChatMessageDto } from "@models/dto";
 import { ChatPromptType } from "@models/enums";
 import { ReactNode, useEffect, useState } from "react";
@@ -145,6 +146,7 @@ export const ChatProvider = ({
 
         let receivedText = "";
         let completedToolCalls: Record<string, any> = {};
+        let toolArguments: Record<string, string> = {};
 
         ChatApi.sendMessage(
             sessionId,
@@ -168,8 +170,19 @@ export const ChatProvider = ({
                             toolResults[tool.name] = null;
                         }
 
+                        if (tool.offset !== undefined && tool.offset !== null) {
+                            // Delta chunks only carry the new fragment of the arguments
+                            toolArguments[tool.name] =
+                                (toolArguments[tool.name] ?? "").slice(
+                                    0,
+                                    tool.offset
+                                ) + (tool.data ?? "");
+                        } else {
+                            toolArguments[tool.name] = tool.data;
+                        }
+
                         try {
-                            const data = JSON.parse(tool.data);
+                            const data = JSON.parse(toolArguments[tool.name]);
                             completedToolCalls[tool.name] = data;
                         } catch (e) {}
                     }
@@ -181,7 +194,18 @@ export const ChatProvider = ({
                 setToolResults(completedToolCalls);
                 setIsProcessing(false);
             }
-        );
+        ).catch(() => {
+            setPendingToolNames([]);
+            setIsProcessing(false);
+
+            notifications.show({
+                withCloseButton: true,
+                autoClose: 5000,
+                title: "Message failed",
+                message: "The response could not be generated, please try again",
+                color: "red",
+            });
+        });
     };
 
     if (!sessionId || !localUser) {
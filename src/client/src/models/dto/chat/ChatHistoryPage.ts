@@ -0,0 +1,7 @@
+import { ChatMessageDto } from "./ChatMessageDto";
+
+export interface ChatHistoryPageDto {
+    messages: ChatMessageDto[];
+    // Pass as `before` to load the previous page, null once the oldest message has been loaded
+    next_cursor: string | null;
+}
@@ -1,6 +1,10 @@
 interface Tool {
     name: string;
     data: any | null;
+    // Set when the server streams tool deltas: data is a fragment of the
+    // arguments which belongs at this offset
+    index?: number | null;
+    offset?: number | null;
 }
 
 export interface CompletionChunkDto {
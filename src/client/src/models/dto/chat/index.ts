@@ -1,2 +1,3 @@
 export * from "./ChatMessageDto";
+export * from "./ChatHistoryPage";
 export * from "./CompletionChunk";